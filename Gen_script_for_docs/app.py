@@ -1,104 +1,498 @@
 import re
-import pandas as pd
 import json
 import datetime
+import argparse
+import contextlib
+import glob
+import hashlib
+import os
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from openpyxl import load_workbook
-import datetime
-import json
-import re
-import pandas as pd
+from openpyxl.utils import column_index_from_string, coordinate_to_tuple, range_boundaries
+try:
+    # Private parser of openpyxl, only used by the fast read-only snapshot reader
+    from openpyxl.worksheet._reader import WorkSheetParser
+except ImportError:
+    WorkSheetParser = None
 
 def join_sql_values(values):
     """
-    Join SQL values, handling both tuples and strings.
-    Also checks for consecutive commas (,,) and replaces with ,'',
+    Join SQL literals into a VALUES list with a single join, handling both tuples and strings.
+    Missing values (None or empty) are written as ''; literals are never rewritten afterwards.
     """
-    result_values = []
-    for val in values:
-        if isinstance(val, tuple):
-            # If it's a tuple, take the first element (the value)
-            result_values.append(str(val[0]) if val[0] is not None else "''")
-        else:
-            # If it's a string, use it directly
-            result_values.append(str(val) if val is not None else "''")
-    
-    # Join values with commas
-    joined = ", ".join(result_values)
-    
-    # Check for consecutive commas and replace with ,'',
-    while ",," in joined:
-        joined = joined.replace(",,", ",'',")
-    
-    return joined
+    if not isinstance(values, list):
+        values = list(values)
+    # Literals from the encoders are non-empty strings and are joined as they are
+    if '' not in values:
+        try:
+            return ", ".join(values)
+        except TypeError:
+            pass
+    return ", ".join([
+        "''" if val is None or val == '' else str(val)
+        for val in (value[0] if isinstance(value, tuple) else value for value in values)
+    ])
+
+
+# SQL literal encoder: one formatter per DATA_TYPE, picked once per column by sql_literal_encoder.
+# Every formatter writes empty cells (None or '') as '', integer ones also text that is not a number.
+# The other numeric types reject '' (SQL Server converts '' to 0 only for integers): NULL instead
+INTEGER_DATA_TYPES = ('int', 'bigint', 'smallint', 'tinyint')
+NUMERIC_DATA_TYPES = INTEGER_DATA_TYPES + ('decimal', 'numeric', 'float', 'real', 'money', 'smallmoney')
+DATETIME_DATA_TYPES = ('date', 'datetime', 'smalldatetime', 'datetime2', 'datetimeoffset', 'time')
+
+def sql_string_literal(value, prefix=''):
+    """Quote value as a SQL string literal ('N' prefix for nvarchar), doubling embedded quotes"""
+    text = value if value.__class__ is str else str(value)
+    if "'" in text:
+        text = text.replace("'", "''")
+    return f"{prefix}'{text}'"
+
+def _encode_numeric(value, invalid="''"):
+    """Bare number; text is parsed without thousands separators and spaces, invalid if it is not a number"""
+    if value is None or value == '':
+        return invalid
+    if value.__class__ is int:
+        return str(value)
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    text = str(value).replace(',', '').replace(' ', '')
+    if text == 'NULL':
+        return 'NULL'
+    try:
+        return repr(float(text)) if '.' in text else str(int(text))
+    except ValueError:
+        return invalid
 
+def _encode_decimal(value):
+    """_encode_numeric for the non-integer types: empty cells and text that is not a number as NULL"""
+    return _encode_numeric(value, 'NULL')
 
-# Global variables for system id, date, and SEQ per sheet
+def _encode_datetime(value):
+    """Quoted date/time, datetimes as YYYY-MM-DD HH:MM:SS"""
+    if value is None or value == '':
+        return "''"
+    if isinstance(value, datetime.datetime):
+        return f"'{value.strftime('%Y-%m-%d %H:%M:%S')}'"
+    return sql_string_literal(value)
+
+def _encode_nvarchar(value):
+    if value is None or value == '':
+        return "''"
+    text = value if value.__class__ is str else str(value)
+    if "'" in text:
+        text = text.replace("'", "''")
+    return f"N'{text}'"
+
+def _encode_bit(value):
+    """Booleans as '1'/'0', anything else (e.g. 'True'/'False' text) quoted as is"""
+    if value is None or value == '':
+        return "''"
+    if isinstance(value, bool):
+        return "'1'" if value else "'0'"
+    return sql_string_literal(value)
+
+def _encode_string(value):
+    if value is None or value == '':
+        return "''"
+    text = value if value.__class__ is str else str(value)
+    if "'" in text:
+        text = text.replace("'", "''")
+    return f"'{text}'"
+
+SQL_LITERAL_ENCODERS = {
+    **{data_type: _encode_decimal for data_type in NUMERIC_DATA_TYPES},
+    **{data_type: _encode_numeric for data_type in INTEGER_DATA_TYPES},
+    **{data_type: _encode_datetime for data_type in DATETIME_DATA_TYPES},
+    'nvarchar': _encode_nvarchar,
+    'bit': _encode_bit,
+}
+
+def sql_literal_encoder(data_type, col_name=None):
+    """
+    Formatter turning a cell value into the SQL literal of data_type (default: quoted string).
+    For DASH_NULL_COLUMNS the '－' placeholder is written as NULL.
+    """
+    encode = SQL_LITERAL_ENCODERS.get(data_type, _encode_string)
+    if col_name not in DASH_NULL_COLUMNS:
+        return encode
+    def encode_dash_null(value):
+        return "NULL" if value == "－" else encode(value)
+    return encode_dash_null
+
+
+# Defaults for new conversion sessions (see ConversionSession)
 # Lấy systemid_value từ input, nếu không nhập thì lấy mặc định
 now = datetime.datetime.now()
 default_systemid_value = f"{now.hour:02d}{now.minute:02d}{now.second:02d}"
 systemid_value = default_systemid_value
 system_date_value = now.strftime('%Y-%m-%d')
 
-# seq_per_sheet_dict: {sheet_index: SEQ}
-seq_per_sheet_dict = {}
+# File holding the next USER_NAME id; None keeps the counter in memory only (batch workers)
+username_id_file = 'usernameID.txt'
+
+# USER_NAME ids reserved from username_id_file at once; unused ids are given back at session end
+USERNAME_ID_BLOCK_SIZE = 100
+
+# Seconds to wait for the USER_NAME id file lock held by another run, and between two attempts
+USERNAME_ID_LOCK_TIMEOUT = 60
+USERNAME_ID_LOCK_RETRY_DELAY = 0.05
+
+# Default maximum number of entries of each workbook-wide cache
+GLOBAL_CACHE_MAX_ENTRIES = 1024
+
+# Current maximum, set by configure_global_caches and passed on to pool workers
+global_cache_max_entries = GLOBAL_CACHE_MAX_ENTRIES
+
+_LRU_MISSING = object()
+
+def new_lru_cache(name, max_entries=GLOBAL_CACHE_MAX_ENTRIES):
+    """Size-bounded LRU cache with hit/miss/eviction statistics (see lru_get / lru_put)"""
+    return {'name': name, 'entries': OrderedDict(), 'max_entries': max_entries, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+def lru_get(session, cache, key, default=None):
+    """Return cached value of key (marking it most recently used), or default"""
+    value = cache['entries'].get(key, _LRU_MISSING)
+    if session.metrics is not None:
+        metrics_cache(session, cache['name'], value is not _LRU_MISSING)
+    if value is _LRU_MISSING:
+        cache['misses'] += 1
+        return default
+    cache['entries'].move_to_end(key)
+    cache['hits'] += 1
+    return value
+
+def lru_put(session, cache, key, value):
+    """Store value under key, evicting least recently used entries beyond max_entries"""
+    entries = cache['entries']
+    entries[key] = value
+    entries.move_to_end(key)
+    while len(entries) > cache['max_entries']:
+        entries.popitem(last=False)
+        cache['evictions'] += 1
+        if session.metrics is not None:
+            metrics_cache_evicted(session, cache['name'])
+
+def lru_clear(cache):
+    cache['entries'].clear()
+
+def lru_stats(cache):
+    """Size and hit/miss/eviction counters of an LRU cache"""
+    return {
+        'entries': len(cache['entries']),
+        'max_entries': cache['max_entries'],
+        'hits': cache['hits'],
+        'misses': cache['misses'],
+        'evictions': cache['evictions'],
+    }
 
-# Global workbook and sheetnames - will be initialized once
-wb = None
-sheetnames = None
 
-# Global table_info - will be initialized once
-table_info = None
+class ConversionSession:
+    """
+    State of one workbook conversion: SYSTEM_ID/date, workbook, table_info and its
+    compiled plans, sheet SEQs, the USER_NAME counter, every lookup cache and the metrics.
+    Sessions share nothing, so several conversions can run in one process; every
+    processor receives its session explicitly.
+    """
+    
+    def __init__(
+        self,
+        systemid_value=None,
+        system_date_value=None,
+        username_id_file=None,
+        global_cache_max_entries=GLOBAL_CACHE_MAX_ENTRIES,
+        metrics_enabled=False
+    ):
+        self.systemid_value = systemid_value or default_systemid_value
+        self.system_date_value = system_date_value or now.strftime('%Y-%m-%d')
+        # File holding the next USER_NAME id; None keeps the counter in memory only
+        self.username_id_file = username_id_file
+        self.username_id_counter = None
+        # Ids are reserved from username_id_file in blocks (see next_username_id)
+        self.username_id_block_size = USERNAME_ID_BLOCK_SIZE
+        self.username_id_reserved = 0  # Ids of the current block not handed out yet
+        self.username_id_file_next = None  # Counter value written to the file when the block was reserved
+        self.username_id_last = None
+        
+        self.wb = None
+        self.excel_file = None
+        self.sheetnames = None
+        # Fully loaded copy of a read-only workbook, only loaded if the public-API snapshot reader needs it
+        self.full_wb = None
+        # seq_per_sheet_dict: {sheet_index: SEQ}
+        self.seq_per_sheet_dict = {}
+        
+        self.table_info = None
+        # Compiled column plans: {table_name: plan} - compiled from table_info once
+        self.table_plans = {}
+        # SHA-256 of table_info, part of every sheet cache key
+        self.table_info_digest = None
+        
+        # Watch mode: rows of the sheets of this run and of the previous run, by sheet_cache_key
+        # (None: sheet rows are not kept in memory)
+        self.sheet_outputs = None
+        self.previous_sheet_outputs = {}
+        
+        # Sheet-scoped caches: {sheet_name: ...}, released by release_sheet_caches once the sheet is converted
+        self.merged_cell_cache = {}  # Cache for merged cell checks: {sheet_name: {(row, col_start, col_end): bool}}
+        self.cell_value_cache = {}  # Cache for cell values: {sheet_name: {cell_ref: value}}
+        self.merged_range_index_cache = {}  # Cache for merged range indexes: {sheet_name: (row_index, span_index)}
+        self.sheet_snapshot_cache = {}  # Cache for sheet snapshots: {sheet_name: snapshot}
+        self.section_index_cache = {}  # Cache for section indexes: {sheet_name: {marker: [start_row]}}
+        self.sheet_scoped_caches = (
+            self.merged_cell_cache, self.cell_value_cache, self.merged_range_index_cache,
+            self.sheet_snapshot_cache, self.section_index_cache
+        )
+        
+        # Workbook-wide caches: size-bounded LRU, see configure_global_caches
+        self.global_cache_max_entries = global_cache_max_entries
+        self.regex_pattern_cache = new_lru_cache('regex_pattern', global_cache_max_entries)  # Compiled regex patterns
+        self.sheet_b2_values_cache = new_lru_cache('sheet_b2_values', global_cache_max_entries)  # {sheet_name: b2_value}
+        self.font_aoji_cache = new_lru_cache('font_aoji', global_cache_max_entries)  # AOJI per workbook font: {font_id: bool}
+        self.global_caches = (self.regex_pattern_cache, self.sheet_b2_values_cache, self.font_aoji_cache)
+        
+        # Metrics of the run (see enable_metrics), None when disabled
+        self.metrics = new_metrics() if metrics_enabled else None
+
+
+def new_session(metrics_enabled=None):
+    """
+    Session configured from the module defaults (systemid_value, system_date_value, username_id_file, cache size).
+    metrics_enabled None: metrics are enabled by METRICS_ENV_VAR.
+    """
+    if metrics_enabled is None:
+        metrics_enabled = metrics_enabled_by_env()
+    return ConversionSession(
+        systemid_value, system_date_value, username_id_file, global_cache_max_entries, metrics_enabled
+    )
 
-# Performance optimization caches
-_merged_cell_cache = {}  # Cache for merged cell checks: {(sheet_name, row, col_start, col_end): bool}
-_cell_value_cache = {}  # Cache for cell values: {(sheet_name, cell_ref): value}
-_regex_pattern_cache = {}  # Cache for compiled regex patterns
-_sheet_b2_values_cache = {}  # Cache for B2 values: {sheet_name: b2_value}
-_username_id_counter = None  # Cache for username ID counter
+def configure_global_caches(max_entries):
+    """Set the maximum size of the workbook-wide caches of sessions created from now on"""
+    global global_cache_max_entries
+    if max_entries < 1:
+        raise ValueError(f"Global cache size must be at least 1, got {max_entries}")
+    global_cache_max_entries = max_entries
 
-def clear_performance_caches():
+def global_cache_stats(session):
+    """{cache_name: lru_stats} of the workbook-wide caches of a session"""
+    return {cache['name']: lru_stats(cache) for cache in session.global_caches}
+
+def release_sheet_caches(session, sheet_name):
+    """Drop everything cached for one sheet, so memory follows the sheet being converted"""
+    for cache in session.sheet_scoped_caches:
+        cache.pop(sheet_name, None)
+
+def clear_sheet_caches(session):
+    for cache in session.sheet_scoped_caches:
+        cache.clear()
+
+def clear_performance_caches(session):
     """Clear all performance caches to free memory"""
-    global _merged_cell_cache, _cell_value_cache, _regex_pattern_cache, _sheet_b2_values_cache, _username_id_counter
-    _merged_cell_cache.clear()
-    _cell_value_cache.clear()
-    _regex_pattern_cache.clear()
-    _sheet_b2_values_cache.clear()
-    _username_id_counter = None
-
-def create_insert_statement_batch(table_name, columns, values_list):
+    clear_sheet_caches(session)
+    for cache in session.global_caches:
+        lru_clear(cache)
+    session.username_id_counter = None
+    session.username_id_reserved = 0
+
+def end_session(session):
+    """Finish a conversion: write the USER_NAME counter back once, free caches, close a read-only workbook"""
+    release_username_ids(session)
+    # Clear caches after processing to free memory
+    clear_performance_caches(session)
+    if session.wb is not None and session.wb.read_only:
+        session.wb.close()
+    session.full_wb = None
+
+
+# Environment variable enabling metrics without --metrics (any non-empty value but '0')
+METRICS_ENV_VAR = 'APP_METRICS'
+
+# Metrics of a run live in session.metrics, None when disabled:
+# every hook is a single `session.metrics is not None` check
+_NO_METRICS_STAGE = contextlib.nullcontext()
+
+def metrics_enabled_by_env():
+    """True when METRICS_ENV_VAR enables metrics for sessions created without an explicit switch"""
+    return os.environ.get(METRICS_ENV_VAR, '') not in ('', '0')
+
+def new_metrics():
+    return {'stages': {}, 'rows_per_table': {}, 'counters': {}, 'caches': {}}
+
+def enable_metrics(session, enabled=True):
+    """Start collecting metrics of session with fresh counters, or stop collecting them"""
+    session.metrics = new_metrics() if enabled else None
+
+def metrics_add_time(session, stage, seconds, calls=1):
+    """Add seconds (and calls) to a stage timing"""
+    stage_metrics = session.metrics['stages'].setdefault(stage, {'seconds': 0.0, 'calls': 0})
+    stage_metrics['seconds'] += seconds
+    stage_metrics['calls'] += calls
+
+def metrics_count(session, counter, amount=1):
+    """Increase a named counter (cells read, ...)"""
+    counters = session.metrics['counters']
+    counters[counter] = counters.get(counter, 0) + amount
+
+def metrics_cache(session, cache_name, hit):
+    """Record a hit or miss of a named cache"""
+    cache_metrics = session.metrics['caches'].setdefault(cache_name, {'hits': 0, 'misses': 0})
+    cache_metrics['hits' if hit else 'misses'] += 1
+
+def metrics_cache_evicted(session, cache_name):
+    """Record an entry evicted from a size-bounded cache"""
+    cache_metrics = session.metrics['caches'].setdefault(cache_name, {'hits': 0, 'misses': 0})
+    cache_metrics['evictions'] = cache_metrics.get('evictions', 0) + 1
+
+@contextlib.contextmanager
+def _timed_stage(session, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics_add_time(session, stage, time.perf_counter() - start)
+
+def metrics_stage(session, stage):
+    """Context manager timing a stage; a shared no-op when metrics are disabled"""
+    if session.metrics is None:
+        return _NO_METRICS_STAGE
+    return _timed_stage(session, stage)
+
+def metrics_timed_iter(session, stage, rows):
+    """
+    Yield from a row generator, adding only the time spent producing rows to stage
+    (not the time the consumer spends on them). Returns the generator's return value.
+    """
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration as stop:
+                seconds += time.perf_counter() - start
+                return stop.value
+            seconds += time.perf_counter() - start
+            yield row
+    finally:
+        metrics_add_time(session, stage, seconds)
+
+def metrics_count_rows(session, rows):
+    """Pass row records through, counting them per table"""
+    rows_per_table = session.metrics['rows_per_table']
+    for row in rows:
+        rows_per_table[row[0]] = rows_per_table.get(row[0], 0) + 1
+        yield row
+
+def merge_metrics(session, other):
+    """Add metrics collected elsewhere (a pool worker) into the metrics of session"""
+    for stage, stage_metrics in other['stages'].items():
+        metrics_add_time(session, stage, stage_metrics['seconds'], stage_metrics['calls'])
+    for table_name, row_count in other['rows_per_table'].items():
+        session.metrics['rows_per_table'][table_name] = session.metrics['rows_per_table'].get(table_name, 0) + row_count
+    for counter, amount in other['counters'].items():
+        metrics_count(session, counter, amount)
+    for cache_name, cache_metrics in other['caches'].items():
+        merged = session.metrics['caches'].setdefault(cache_name, {'hits': 0, 'misses': 0})
+        for key, amount in cache_metrics.items():
+            merged[key] = merged.get(key, 0) + amount
+
+def metrics_report_file(output_file):
+    """Metrics report path next to output_file: insert_all.sql -> insert_all.metrics.json"""
+    return os.path.splitext(output_file)[0] + '.metrics.json'
+
+def write_metrics_report(session, report_file, **run_info):
+    """Write the metrics of session (plus run_info) as JSON; returns the report"""
+    caches = {}
+    for cache_name, cache_metrics in sorted(session.metrics['caches'].items()):
+        lookups = cache_metrics['hits'] + cache_metrics['misses']
+        caches[cache_name] = dict(cache_metrics, hit_rate=round(cache_metrics['hits'] / lookups, 4) if lookups else None)
+    report = dict(run_info)
+    report.update({
+        'stages': {
+            stage: {'seconds': round(stage_metrics['seconds'], 6), 'calls': stage_metrics['calls']}
+            for stage, stage_metrics in session.metrics['stages'].items()
+        },
+        'rows_per_table': session.metrics['rows_per_table'],
+        'counters': session.metrics['counters'],
+        'caches': caches,
+    })
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Metrics written to {report_file}")
+    return report
+
+def insert_row(table_name, columns_str, values, values_str=None):
+    """
+    Create an INSERT row record: (table_name, columns_str, values, values_str).
+    values are SQL literals; values_str defaults to join_sql_values(values).
+    """
+    values = list(values)
+    if values_str is None:
+        values_str = join_sql_values(values)
+    return (table_name, columns_str, values, values_str)
+
+def format_insert_row(row):
+    """Render one row record as a single-row INSERT statement"""
+    table_name, columns_str, _, values_str = row
+    return f"INSERT INTO {table_name} ({columns_str}) VALUES ({values_str});"
+
+def _format_insert_block(block_key, block_values):
+    """Render a multi-row INSERT statement"""
+    table_name, columns_str = block_key
+    values_sql = ",\n".join(f"({values_str})" for values_str in block_values)
+    return f"INSERT INTO {table_name} ({columns_str}) VALUES\n{values_sql};"
+
+def iter_insert_sql(rows, rows_per_insert=1, go_separator=False):
+    """
+    Render row records as SQL text. Consecutive rows of the same table and columns
+    are grouped into INSERT ... VALUES (...),(...) blocks of up to rows_per_insert rows.
+    With go_separator, a GO batch separator follows every statement.
+    """
+    if not 1 <= rows_per_insert <= MULTI_ROW_INSERT_LIMIT:
+        raise ValueError(f"rows_per_insert must be between 1 and {MULTI_ROW_INSERT_LIMIT}.")
+    
+    if rows_per_insert == 1:
+        for row in rows:
+            yield format_insert_row(row)
+            if go_separator:
+                yield 'GO'
+        return
+    
+    block_key = None
+    block_values = []
+    for table_name, columns_str, _, values_str in rows:
+        if (table_name, columns_str) != block_key or len(block_values) >= rows_per_insert:
+            if block_values:
+                yield _format_insert_block(block_key, block_values)
+                if go_separator:
+                    yield 'GO'
+            block_key = (table_name, columns_str)
+            block_values = []
+        block_values.append(values_str)
+    if block_values:
+        yield _format_insert_block(block_key, block_values)
+        if go_separator:
+            yield 'GO'
+
+def create_insert_statement_batch(table_name, columns, values_list, rows_per_insert=1):
     """Create INSERT statements in batch for better performance"""
     if not values_list:
         return []
     
     columns_str = ", ".join(columns)
-    insert_statements = []
-    
-    for values in values_list:
-        values_str = ", ".join(str(v) for v in values)
-        sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({values_str});"
-        insert_statements.append(sql)
-    
-    return insert_statements
-
-def preload_sheet_cell_values(ws, start_row, end_row, columns):
-    """Pre-load cell values for a range to improve performance"""
-    for row in range(start_row, min(end_row + 1, ws.max_row + 1)):
-        # Pre-load B column values (commonly used)
-        cache_key = (ws.title, f"B{row}")
-        if cache_key not in _cell_value_cache:
-            try:
-                _cell_value_cache[cache_key] = ws[f"B{row}"].value
-            except:
-                _cell_value_cache[cache_key] = None
-        
-        # Pre-load other commonly used cell references
-        for col in ['C', 'D', 'E']:
-            cache_key = (ws.title, f"{col}{row}")
-            if cache_key not in _cell_value_cache:
-                try:
-                    _cell_value_cache[cache_key] = get_cell_value_with_merged(ws, f"{col}{row}")
-                except:
-                    _cell_value_cache[cache_key] = None
+    rows = (
+        insert_row(table_name, columns_str, values, ", ".join(str(v) for v in values))
+        for values in values_list
+    )
+    return list(iter_insert_sql(rows, rows_per_insert))
 
 # Mapping for MAPPING value (Excel cell value -> mapped number)
 MAPPING_VALUE_DICT = {
@@ -150,6 +544,15 @@ STOP_VALUES = {
     '【表示位置定義】'
 }
 
+# Column B markers recorded by the per-sheet section index
+SECTION_MARKERS = STOP_VALUES | {
+    '【抽出データ定義】',
+    '【帳票データ】',
+    '【CSVデータ】',
+    '【メニュー定義】',
+    '入力画面'
+}
+
 # Global excluded sheet names
 EXCLUDED_SHEETNAMES = {'カスタマイズ設計書(鑑)', 'カスタマイズ設計書', 'はじめに', '変更履歴'}
 
@@ -166,6 +569,36 @@ MERGED_CELL_RANGES = {
     'D_TO_N': (4, 14)
 }
 
+# Column range (B..BN) loaded into sheet snapshots, widened to cover table_info CELL_LOGIC columns
+SNAPSHOT_COL_RANGE = MERGED_CELL_RANGES['B_TO_BN']
+
+# Columns where the '－' (not applicable) cell value is written as NULL
+DASH_NULL_COLUMNS = {'ZENKAKU_MOJI_SU', 'HANKAKU_MOJI_SU', 'SEISU_KETA', 'SYOUSU_KETA'}
+
+# Columns set to NULL when MIDASHI is 'True' (IPO heading rows)
+MIDASHI_NULL_COLUMNS = {'IN_GAMEN_ID', 'IN_GAMEN_NAME', 'IN_BUHIN_CD', 'IN_BUHIN_NAME', 'OUT_BUHIN_CD', 'OUT_BUHIN_NAME', 'BIKOU'}
+
+# Write buffer size (bytes) of the streaming SQL output file
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# SQL Server limit of row value expressions in one INSERT ... VALUES statement
+MULTI_ROW_INSERT_LIMIT = 1000
+
+# Rows per table sent with one executemany call when loading straight into a database
+DB_LOAD_BATCH_SIZE = 5000
+
+# Bump to invalidate every per-sheet cache entry (see sheet_cache_key)
+SHEET_CACHE_VERSION = 1
+
+# Watch mode: seconds between checks of the watched files, and how long they must stay
+# unchanged before a run starts (Excel writes a save in several steps)
+WATCH_POLL_INTERVAL = 0.25
+WATCH_DEBOUNCE_SECONDS = 0.75
+
+# Connection string file used by --load-db; 'sqlite:///path' selects the SQLite stand-in
+CONNECT_STRING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'connect_string.txt')
+SQLITE_URL_PREFIX = 'sqlite:///'
+
 # Constants for specific cell values that should be skipped
 SKIP_CELL_VALUES = {
     'SCREEN_NUMBER': ['画面', '番号'],
@@ -275,41 +708,65 @@ LOGIC_PROCESSOR_CONFIG = {
     }
 }
 
-def initialize_workbook(excel_file):
+def initialize_workbook(session, excel_file, read_only=False):
     """
-    Initialize global workbook and sheetnames from Excel file.
+    Initialize the session workbook and sheetnames from Excel file.
     Should be called once at the beginning of processing.
+    With read_only=True sheets are parsed on demand into snapshots instead of loaded up front.
     """
-    global wb, sheetnames, _merged_cell_cache, _cell_value_cache, _sheet_b2_values_cache
-    wb = load_workbook(excel_file, data_only=True)
-    sheetnames = wb.sheetnames
-    
-    # Clear caches
-    _merged_cell_cache.clear()
-    _cell_value_cache.clear()
-    _sheet_b2_values_cache.clear()
+    with metrics_stage(session, 'load_workbook'):
+        session.wb = load_workbook(excel_file, read_only=read_only, data_only=True)
+    session.excel_file = excel_file
+    session.full_wb = None
+    session.sheetnames = session.wb.sheetnames
+    
+    # Clear caches and SEQ state of any previous workbook
+    session.seq_per_sheet_dict.clear()
+    clear_sheet_caches(session)
+    lru_clear(session.sheet_b2_values_cache)
+    lru_clear(session.font_aoji_cache)
     
     # Pre-cache B2 values for all sheets
-    for sheet_name in sheetnames:
+    for sheet_name in session.sheetnames:
         if sheet_name not in EXCLUDED_SHEETNAMES:
-            try:
-                ws = wb[sheet_name]
-                b2_value = ws["B2"].value
-                _sheet_b2_values_cache[sheet_name] = b2_value
-            except Exception:
-                _sheet_b2_values_cache[sheet_name] = None
-    
-    print(f"Initialized workbook with {len(sheetnames)} sheets and cached B2 values")
+            lru_put(session, session.sheet_b2_values_cache, sheet_name, _read_sheet_b2_value(session, sheet_name))
+
+    print(f"Initialized workbook with {len(session.sheetnames)} sheets and cached B2 values")
+
+
+def _read_sheet_b2_value(session, sheet_name):
+    try:
+        return session.wb[sheet_name]["B2"].value
+    except Exception:
+        return None
 
 
-def initialize_table_info(table_info_file):
+def get_sheet_b2_value(session, sheet_name):
+    """B2 value (sheet type) of a sheet, read again from the workbook if evicted from the cache"""
+    b2_value = lru_get(session, session.sheet_b2_values_cache, sheet_name, _LRU_MISSING)
+    if b2_value is _LRU_MISSING:
+        b2_value = _read_sheet_b2_value(session, sheet_name)
+        lru_put(session, session.sheet_b2_values_cache, sheet_name, b2_value)
+    return b2_value
+
+
+def initialize_table_info(session, table_info_file):
     """
-    Initialize global table_info from JSON file.
+    Initialize the session table_info from JSON file.
     Should be called once at the beginning of processing.
     """
-    global table_info
-    table_info = read_table_info(table_info_file)
-    print(f"Initialized table_info with {len(table_info)} tables")
+    with metrics_stage(session, 'load_table_info'):
+        set_table_info(session, read_table_info(table_info_file))
+
+
+def set_table_info(session, data):
+    """Install already parsed table_info and compile its column plans for the session SYSTEM_ID"""
+    session.table_info = data
+    session.table_plans = compile_table_plans(data, session.systemid_value)
+    session.table_info_digest = hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+    print(f"Initialized table_info with {len(data)} tables and compiled {len(session.table_plans)} table plans")
 
 
 def read_table_info(filename):
@@ -321,58 +778,387 @@ def read_table_info(filename):
     return data
 
 
-def get_cell_value_with_merged(ws, cell_ref):
+def _build_merged_range_index(session, ws):
+    """
+    Build merged range index for a worksheet in one pass over its merged ranges.
+    row_index: {row: (min_cols, entries)} with entries (min_col, max_col, anchor_row, anchor_col)
+               sorted by min_col, so the range covering (row, col) is found by bisect.
+    span_index: {(min_col, max_col): set of rows covered by a range with exactly those columns}
+    """
+    row_entries = {}
+    span_index = {}
+    for min_row, min_col, max_row, max_col in get_sheet_snapshot(session, ws)['merged_bounds']:
+        span_rows = span_index.setdefault((min_col, max_col), set())
+        for row in range(min_row, max_row + 1):
+            row_entries.setdefault(row, []).append((min_col, max_col, min_row, min_col))
+            span_rows.add(row)
+    
+    row_index = {}
+    for row, entries in row_entries.items():
+        entries.sort()
+        row_index[row] = ([entry[0] for entry in entries], entries)
+    return row_index, span_index
+
+def get_merged_range_index(session, ws):
+    """Get merged range index for worksheet, building it once on first access"""
+    index = session.merged_range_index_cache.get(ws.title)
+    if session.metrics is not None:
+        metrics_cache(session, 'merged_range_index', index is not None)
+    if index is None:
+        index = _build_merged_range_index(session, ws)
+        session.merged_range_index_cache[ws.title] = index
+    return index
+
+def get_merged_anchor(session, ws, row, col):
+    """Return (anchor_row, anchor_col) of merged range covering (row, col), or None"""
+    row_index = get_merged_range_index(session, ws)[0]
+    row_ranges = row_index.get(row)
+    if not row_ranges:
+        return None
+    min_cols, entries = row_ranges
+    pos = bisect_right(min_cols, col) - 1
+    if pos < 0:
+        return None
+    min_col, max_col, anchor_row, anchor_col = entries[pos]
+    if col > max_col:
+        return None
+    return anchor_row, anchor_col
+
+def get_cell_value_with_merged(session, ws, cell_ref):
     """Helper function to get cell value considering merged cells with caching"""
-    cache_key = (ws.title, cell_ref)
+    sheet_cache = session.cell_value_cache.get(ws.title)
+    if sheet_cache is None:
+        sheet_cache = session.cell_value_cache[ws.title] = {}
     
     # Check cache first
-    if cache_key in _cell_value_cache:
-        return _cell_value_cache[cache_key]
-    
-    cell = ws[cell_ref]
-    if cell.value is not None:
-        _cell_value_cache[cache_key] = cell.value
-        return cell.value
-    
-    # If cell is empty, check merged cells
-    for merged_range in ws.merged_cells.ranges:
-        if cell.coordinate in merged_range:
-            value = ws[merged_range.start_cell.coordinate].value
-            _cell_value_cache[cache_key] = value
-            return value
-    
-    _cell_value_cache[cache_key] = None
-    return None
+    if session.metrics is not None:
+        metrics_cache(session, 'cell_value', cell_ref in sheet_cache)
+    if cell_ref in sheet_cache:
+        return sheet_cache[cell_ref]
+    
+    row, col = coordinate_to_tuple(cell_ref)
+    value = snapshot_value_with_merged(session, ws, row, col)
+    sheet_cache[cell_ref] = value
+    return value
 
-def is_merged_from_to(ws, row, col_start, col_end):
+def is_merged_from_to(session, ws, row, col_start, col_end):
     """Check if cells in a row are merged from col_start to col_end with caching"""
-    cache_key = (ws.title, row, col_start, col_end)
+    sheet_cache = session.merged_cell_cache.get(ws.title)
+    if sheet_cache is None:
+        sheet_cache = session.merged_cell_cache[ws.title] = {}
+    cache_key = (row, col_start, col_end)
     
     # Check cache first
-    if cache_key in _merged_cell_cache:
-        return _merged_cell_cache[cache_key]
+    if session.metrics is not None:
+        metrics_cache(session, 'merged_cell', cache_key in sheet_cache)
+    if cache_key in sheet_cache:
+        return sheet_cache[cache_key]
     
-    result = any(
-        merged_range.min_col == col_start
-        and merged_range.max_col == col_end
-        and merged_range.min_row <= row <= merged_range.max_row
-        for merged_range in ws.merged_cells.ranges
-    )
+    span_rows = get_merged_range_index(session, ws)[1].get((col_start, col_end))
+    result = span_rows is not None and row in span_rows
     
-    _merged_cell_cache[cache_key] = result
+    sheet_cache[cache_key] = result
     return result
 
 
-def should_stop_logic_row(ws, check_row, stop_values, cell_b_value=''):
+def _font_rgb(font):
+    """Return upper-case RGB hex of font colour, or None if font has no explicit RGB colour"""
+    # openpyxl >= 2.5: font.color is a Color object, .rgb is a string or None
+    if font and font.color:
+        rgb = getattr(font.color, 'rgb', None)
+        # Only accept if rgb is a string of length 6 or 8 (hex color)
+        if isinstance(rgb, str) and (len(rgb) == 6 or len(rgb) == 8):
+            return rgb.upper()
+    return None
+
+def get_font_rgb(cell):
+    """Return upper-case font RGB hex of cell, or None if font has no explicit RGB colour"""
+    return _font_rgb(cell.font)
+
+def is_aoji(font_rgb):
+    """Return True if font colour is not black"""
+    # Nếu font_rgb là None (mặc định, không tô màu), coi là đen (aoji=False)
+    black_colors = {None, '000000', 'FF000000'}
+    if font_rgb is None:
+        return False
+    return font_rgb not in black_colors
+
+def resolve_font_aoji(session, workbook, font_id):
+    """
+    Return AOJI (non-black font) for a workbook font id. Cells share style objects,
+    so the font colour is resolved once per distinct font and then looked up by id.
+    """
+    aoji = lru_get(session, session.font_aoji_cache, font_id)
+    if aoji is None:
+        fonts = getattr(workbook, '_fonts', None) or ()
+        aoji = is_aoji(_font_rgb(fonts[font_id])) if font_id < len(fonts) else False
+        lru_put(session, session.font_aoji_cache, font_id, aoji)
+    return aoji
+
+def cell_aoji(session, cell):
+    """Return AOJI of a cell, resolved through its font id when the cell carries a style array"""
+    style = getattr(cell, '_style', None)
+    if style is not None:
+        return resolve_font_aoji(session, cell.parent.parent, style.fontId)
+    return is_aoji(get_font_rgb(cell))
+
+def _snapshot_col_range(session):
+    """Snapshot columns: B..BN, widened to the rightmost CELL_LOGIC column in table_info"""
+    min_col, max_col = SNAPSHOT_COL_RANGE
+    for columns_info in (session.table_info or {}).values():
+        for col_info in columns_info:
+            col_logic = col_info.get('CELL_LOGIC', '').strip()
+            if col_logic.isalpha():
+                max_col = max(max_col, column_index_from_string(col_logic.upper()))
+    return min_col, max_col
+
+def _read_worksheet_cells(ws, min_col, max_col):
+    """Read existing cells of a fully loaded worksheet: (max_row, [(row, col, value, font_id)], merged_bounds)"""
+    cells = [
+        (row, col, cell.value, cell._style.fontId)
+        for (row, col), cell in ws._cells.items()
+        if min_col <= col <= max_col
+    ]
+    merged_bounds = [
+        (merged_range.min_row, merged_range.min_col, merged_range.max_row, merged_range.max_col)
+        for merged_range in ws.merged_cells.ranges
+    ]
+    return ws.max_row, cells, merged_bounds
+
+def _read_read_only_worksheet_cells(ws, min_col, max_col):
+    """
+    Parse the XML of a read-only worksheet once: (max_row, [(row, col, value, font_id)], merged_bounds).
+    Mirrors load_workbook without read_only: non-anchor cells of merged ranges are emptied,
+    and max_row also counts cells created for merged ranges and hyperlinks.
+    """
+    workbook = ws.parent
+    cell_styles = workbook._cell_styles
+    max_row = 1
+    cells = {}
+    with ws._get_source() as src:
+        parser = WorkSheetParser(
+            src,
+            ws._shared_strings,
+            data_only=workbook.data_only,
+            epoch=workbook.epoch,
+            date_formats=workbook._date_formats,
+            timedelta_formats=getattr(workbook, '_timedelta_formats', set()),
+            rich_text=getattr(workbook, 'rich_text', False)
+        )
+        for _, row_cells in parser.parse():
+            for cell in row_cells:
+                row, col = cell['row'], cell['column']
+                max_row = max(max_row, row)
+                if min_col <= col <= max_col:
+                    cells[(row, col)] = (cell['value'], cell_styles[cell['style_id']].fontId)
+    
+    merged_bounds = []
+    if parser.merged_cells:
+        for merged in parser.merged_cells.mergeCell:
+            range_min_col, range_min_row, range_max_col, range_max_row = range_boundaries(merged.ref)
+            merged_bounds.append((range_min_row, range_min_col, range_max_row, range_max_col))
+            max_row = max(max_row, range_max_row)
+            for row in range(range_min_row, range_max_row + 1):
+                for col in range(max(range_min_col, min_col), min(range_max_col, max_col) + 1):
+                    if row != range_min_row or col != range_min_col:
+                        cells.pop((row, col), None)
+    for link in parser.hyperlinks.hyperlink:
+        max_row = max(max_row, range_boundaries(link.ref)[3])
+    
+    return max_row, [(row, col, value, font_id) for (row, col), (value, font_id) in cells.items()], merged_bounds
+
+# AOJI of the font ids written by the public-API reader
+PUBLIC_READER_FONT_AOJI = (False, True)
+
+def _read_worksheet_cells_public(ws, min_col, max_col):
+    """
+    Read a fully loaded worksheet through the public iter_rows()/cell.font API only:
+    (max_row, [(row, col, value, font_id)], merged_bounds) with font_id 1 for AOJI cells, else 0
+    (see PUBLIC_READER_FONT_AOJI). Slower than the readers above, but independent of openpyxl internals.
+    """
+    cells = [
+        (cell.row, cell.column, cell.value, 1 if is_aoji(get_font_rgb(cell)) else 0)
+        for row_cells in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=min_col, max_col=max_col)
+        for cell in row_cells
+    ]
+    merged_bounds = [
+        (merged_range.min_row, merged_range.min_col, merged_range.max_row, merged_range.max_col)
+        for merged_range in ws.merged_cells.ranges
+    ]
+    return ws.max_row, cells, merged_bounds
+
+# What a changed openpyxl internal raises in the fast readers
+FAST_READER_ERRORS = (AttributeError, KeyError, IndexError, TypeError)
+
+def build_sheet_snapshot(ws, min_col, max_col, public_api=False):
+    """
+    Load worksheet once into a row-major value grid for columns min_col..max_col,
+    with a parallel grid of workbook font ids (0 for cells without a stored style).
+    Grids are indexed as values[row][col - min_col]; row 0 is unused.
+    Works for both fully loaded and read-only worksheets.
+    public_api=True reads a fully loaded worksheet through the public API instead; its font ids
+    then index snapshot['font_aoji'] rather than the workbook fonts.
+    """
+    font_aoji = None
+    if public_api:
+        max_row, cells, merged_bounds = _read_worksheet_cells_public(ws, min_col, max_col)
+        font_aoji = PUBLIC_READER_FONT_AOJI
+    elif hasattr(ws, '_cells'):
+        max_row, cells, merged_bounds = _read_worksheet_cells(ws, min_col, max_col)
+    else:
+        if WorkSheetParser is None:
+            raise AttributeError("openpyxl has no WorkSheetParser")
+        max_row, cells, merged_bounds = _read_read_only_worksheet_cells(ws, min_col, max_col)
+    
+    width = max_col - min_col + 1
+    values = [[None] * width for _ in range(max_row + 1)]
+    font_ids = [array('H', [0]) * width for _ in range(max_row + 1)]
+    for row, col, value, font_id in cells:
+        if row > max_row:
+            continue
+        values[row][col - min_col] = value
+        font_ids[row][col - min_col] = font_id
+    return {
+        'min_col': min_col,
+        'max_col': max_col,
+        'max_row': max_row,
+        'values': values,
+        'font_ids': font_ids,
+        'font_aoji': font_aoji,
+        'merged_bounds': merged_bounds,
+        'cell_count': len(cells)
+    }
+
+def get_sheet_snapshot(session, ws):
+    """Get snapshot for worksheet, loading it once on first access"""
+    snapshot = session.sheet_snapshot_cache.get(ws.title)
+    if snapshot is None:
+        if session.metrics is not None:
+            metrics_cache(session, 'sheet_snapshot', False)
+        with metrics_stage(session, 'sheet_snapshot'):
+            min_col, max_col = _snapshot_col_range(session)
+            try:
+                snapshot = build_sheet_snapshot(ws, min_col, max_col)
+            except FAST_READER_ERRORS as e:
+                # openpyxl internals changed: fall back to the public API, which needs a fully
+                # loaded worksheet (read-only ones do not expose merged ranges)
+                print(f"Fast sheet reader unavailable ({type(e).__name__}: {e}), reading {ws.title} through the public openpyxl API")
+                snapshot = build_sheet_snapshot(_full_worksheet(session, ws), min_col, max_col, public_api=True)
+        if session.metrics is not None:
+            metrics_count(session, 'cells_loaded', snapshot['cell_count'])
+        session.sheet_snapshot_cache[ws.title] = snapshot
+    elif session.metrics is not None:
+        metrics_cache(session, 'sheet_snapshot', True)
+    return snapshot
+
+def _full_worksheet(session, ws):
+    """ws itself if fully loaded, else the same sheet of a fully loaded copy of the workbook"""
+    if not getattr(ws.parent, 'read_only', False):
+        return ws
+    if session.full_wb is None:
+        session.full_wb = load_workbook(session.excel_file, data_only=True)
+    return session.full_wb[ws.title]
+
+def snapshot_font_aoji(session, ws, snapshot, font_id):
+    """AOJI of a snapshot font id: a workbook font id, or an index of snapshot['font_aoji']"""
+    if snapshot['font_aoji'] is not None:
+        return snapshot['font_aoji'][font_id]
+    return resolve_font_aoji(session, ws.parent, font_id)
+
+def get_sheet_max_row(session, ws):
+    """Get max row of worksheet as seen by its snapshot"""
+    return get_sheet_snapshot(session, ws)['max_row']
+
+def snapshot_value(session, ws, row, col):
+    """Get raw cell value by integer row/column from sheet snapshot"""
+    if session.metrics is not None:
+        metrics_count(session, 'cells_read')
+    snapshot = get_sheet_snapshot(session, ws)
+    if row > snapshot['max_row'] or row < 1:
+        return None
+    if snapshot['min_col'] <= col <= snapshot['max_col']:
+        return snapshot['values'][row][col - snapshot['min_col']]
+    return ws.cell(row=row, column=col).value
+
+def snapshot_value_with_merged(session, ws, row, col):
+    """Get cell value by integer row/column from sheet snapshot considering merged cells"""
+    value = snapshot_value(session, ws, row, col)
+    if value is not None:
+        return value
+    anchor = get_merged_anchor(session, ws, row, col)
+    if anchor is not None:
+        return snapshot_value(session, ws, anchor[0], anchor[1])
+    return None
+
+def snapshot_aoji(session, ws, row, col):
+    """Get AOJI (non-black font) of cell by integer row/column from sheet snapshot"""
+    if session.metrics is not None:
+        metrics_count(session, 'cell_fonts_read')
+    snapshot = get_sheet_snapshot(session, ws)
+    if row > snapshot['max_row'] or row < 1:
+        return snapshot_font_aoji(session, ws, snapshot, 0)
+    if snapshot['min_col'] <= col <= snapshot['max_col']:
+        return snapshot_font_aoji(session, ws, snapshot, snapshot['font_ids'][row][col - snapshot['min_col']])
+    return cell_aoji(session, ws.cell(row=row, column=col))
+
+
+def build_section_index(session, ws):
+    """
+    Scan column B once and record the rows of every SECTION_MARKERS occurrence:
+    {marker: [start_row, ...]} in sheet order. Section ends follow from the start rows
+    of the markers that stop a section (see get_section_stop_rows).
+    """
+    sections = {}
+    for row_num in range(1, get_sheet_max_row(session, ws) + 1):
+        cell_b_value = snapshot_value(session, ws, row_num, 2)
+        if cell_b_value in SECTION_MARKERS:
+            sections.setdefault(cell_b_value, []).append(row_num)
+    return sections
+
+def get_section_index(session, ws):
+    """Get section index for worksheet, building it once on first access"""
+    sections = session.section_index_cache.get(ws.title)
+    if session.metrics is not None:
+        metrics_cache(session, 'section_index', sections is not None)
+    if sections is None:
+        sections = build_section_index(session, ws)
+        session.section_index_cache[ws.title] = sections
+    return sections
+
+def get_section_rows(session, ws, marker):
+    """Get rows where column B equals marker, in sheet order"""
+    if marker in SECTION_MARKERS:
+        return get_section_index(session, ws).get(marker, [])
+    # Values outside SECTION_MARKERS are not indexed, scan column B for them
+    return [
+        row_num for row_num in range(1, get_sheet_max_row(session, ws) + 1)
+        if snapshot_value(session, ws, row_num, 2) == marker
+    ]
+
+def get_section_stop_rows(session, ws, stop_values, cell_b_value=None):
+    """
+    Sorted rows where column B holds one of stop_values other than cell_b_value, i.e. the rows
+    where should_stop_row ends a section
+    """
+    stop_markers = [marker for marker in stop_values if marker != cell_b_value]
+    return sorted(row_num for marker in stop_markers for row_num in get_section_rows(session, ws, marker))
+
+def get_section_end(stop_rows, row_num, max_row):
+    """Last row of the section holding row_num: the row before the next stop row, or the last row of the sheet"""
+    stop_idx = bisect_left(stop_rows, row_num)
+    return stop_rows[stop_idx] - 1 if stop_idx < len(stop_rows) else max_row
+
+
+def should_stop_logic_row(session, ws, check_row, stop_values, cell_b_value=''):
     """Determine action for logic row processing - Simplified and more permissive"""
-    if check_row > ws.max_row:
+    if check_row > get_sheet_max_row(session, ws):
         return 'stop'
     else:
-        cell_b_check = ws[f"B{check_row}"].value
+        cell_b_check = snapshot_value(session, ws, check_row, 2)
         if cell_b_check is None:
             cell_b_check = ''
-        merged_b_to_bn = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_BN'])
-        merged_bc = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
+        merged_b_to_bn = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_BN'])
+        merged_bc = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
         
         if merged_bc:
             # Check for specific skip values
@@ -394,10 +1180,10 @@ def should_stop_logic_row(ws, check_row, stop_values, cell_b_value=''):
                     # If not merged and not in stop values, continue processing
                     return 'skip'
    
-def _handle_item_definition_check(ws, check_row, cell_b_check):
+def _handle_item_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for 【項目定義】 and 【ファンクション定義】"""
-    merged_b_to_bn = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_BN'])
-    merged_bc = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
+    merged_b_to_bn = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_BN'])
+    merged_bc = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
     
     if merged_bc:
         if cell_b_check in SKIP_CELL_VALUES['SCREEN_NUMBER']:
@@ -412,10 +1198,10 @@ def _handle_item_definition_check(ws, check_row, cell_b_check):
             return 'skip'
     return 'skip'
 
-def _handle_message_definition_check(ws, check_row, cell_b_check):
+def _handle_message_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for 【メッセージ定義】"""
-    merged_e_to_az = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['E_TO_AZ'])
-    merged_bd = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_D'])
+    merged_e_to_az = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['E_TO_AZ'])
+    merged_bd = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_D'])
 
     if merged_bd:
         if cell_b_check in SKIP_CELL_VALUES['MESSAGE_CODE']:
@@ -423,10 +1209,10 @@ def _handle_message_definition_check(ws, check_row, cell_b_check):
         return 'continue' if merged_e_to_az else 'skip'
     return 'skip'
 
-def _handle_tab_definition_check(ws, check_row, cell_b_check):
+def _handle_tab_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for 【タブインデックス定義】"""
-    merged_e_to_bn = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['E_TO_BN'])
-    merged_bd = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_D'])
+    merged_e_to_bn = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['E_TO_BN'])
+    merged_bd = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_D'])
 
     if merged_bd:
         if cell_b_check in SKIP_CELL_VALUES['DEFINITION_LOCATION']:
@@ -434,10 +1220,10 @@ def _handle_tab_definition_check(ws, check_row, cell_b_check):
         return 'continue' if merged_e_to_bn else 'skip'
     return 'skip'
 
-def _handle_position_definition_check(ws, check_row, cell_b_check):
+def _handle_position_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for 【表示位置定義】"""
-    merged_e_to_bk = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['E_TO_BK'])
-    merged_bd = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_D'])
+    merged_e_to_bk = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['E_TO_BK'])
+    merged_bd = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_D'])
 
     if merged_bd:
         if cell_b_check in SKIP_CELL_VALUES['DEFINITION_CATEGORY']:
@@ -445,10 +1231,10 @@ def _handle_position_definition_check(ws, check_row, cell_b_check):
         return 'continue' if merged_e_to_bk else 'skip'
     return 'skip'
 
-def _handle_list_definition_check(ws, check_row, cell_b_check):
+def _handle_list_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for 【一覧定義】"""
-    merged_d_to_o = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['D_TO_O'])
-    merged_bc = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
+    merged_d_to_o = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['D_TO_O'])
+    merged_bc = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
 
     if merged_bc:
         if cell_b_check in SKIP_CELL_VALUES['SCREEN_NUMBER']:
@@ -456,10 +1242,10 @@ def _handle_list_definition_check(ws, check_row, cell_b_check):
         return 'continue' if merged_d_to_o else 'skip'
     return 'skip'
 
-def _handle_menu_definition_check(ws, check_row, cell_b_check):
+def _handle_menu_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for 【メニュー定義】"""
-    merged_d_to_n = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['D_TO_N'])
-    merged_bc = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
+    merged_d_to_n = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['D_TO_N'])
+    merged_bc = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_C'])
 
     if merged_bc:
         if cell_b_check in SKIP_CELL_VALUES['SCREEN_NUMBER']:
@@ -467,10 +1253,10 @@ def _handle_menu_definition_check(ws, check_row, cell_b_check):
         return 'continue' if merged_d_to_n else 'skip'
     return 'skip'
 
-def _handle_ipo_definition_check(ws, check_row, cell_b_check):
+def _handle_ipo_definition_check(session, ws, check_row, cell_b_check):
     """Handle logic for IPO"""
-    merged_b_to_bn = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_BN'])
-    merged_b_to_k = is_merged_from_to(ws, check_row, *MERGED_CELL_RANGES['B_TO_K'])
+    merged_b_to_bn = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_BN'])
+    merged_b_to_k = is_merged_from_to(session, ws, check_row, *MERGED_CELL_RANGES['B_TO_K'])
     
     if merged_b_to_k or merged_b_to_bn:
         if '入力画面' in SKIP_CELL_VALUES['SCREEN_NUMBER']:
@@ -478,16 +1264,16 @@ def _handle_ipo_definition_check(ws, check_row, cell_b_check):
         return 'continue'
     return 'skip'
 
-def should_stop_row(ws, check_row, stop_values, cell_b_value=None):
+def should_stop_row(session, ws, check_row, stop_values, cell_b_value=None):
     """
     Returns action for row processing for T_KIHON_PJ_KOUMOKU_RE (and similar tables):
     1. If cell B is in stop_values (excluding cell_b_value if provided)
     2. End of sheet is handled by the caller
     """
-    if check_row > ws.max_row:
+    if check_row > get_sheet_max_row(session, ws):
         return 'stop'
     
-    cell_b_check = ws[f"B{check_row}"].value
+    cell_b_check = snapshot_value(session, ws, check_row, 2)
     
     # Check stop conditions
     if cell_b_value is not None:
@@ -520,11 +1306,12 @@ def should_stop_row(ws, check_row, stop_values, cell_b_value=None):
     
     handler = handlers.get(cell_b_value)
     if handler:
-        return handler(ws, check_row, cell_b_check)
+        return handler(session, ws, check_row, cell_b_check)
     
     return 'skip'
 
 def set_value_generic(
+    session,
     col_info,
     ws,
     row_num,
@@ -563,48 +1350,22 @@ def set_value_generic(
         nonlocal aoji
         mapped_val = ''
         if cell_fix:
-            cell_ref = f"{cell_fix}{row_num}"
-            cell_value = ws[cell_ref].value if ws[cell_ref].value else None
+            col = column_index_from_string(cell_fix)
+            cell_value = snapshot_value(session, ws, row_num, col) or None
             # Extract font color for aoji
-            try:
-                cell = ws[cell_ref]
-                font_rgb = get_font_rgb(cell)
-                aoji = is_aoji(font_rgb)
-            except Exception:
-                pass
+            aoji = snapshot_aoji(session, ws, row_num, col)
         else:
-            cell_ref = f"{col_logic}{row_num}"
-            cell_value = get_cell_value_with_merged(ws, cell_ref)
+            col = column_index_from_string(col_logic)
+            cell_value = snapshot_value_with_merged(session, ws, row_num, col)
             # Extract font color for aoji
-            try:
-                cell = ws[cell_ref]
-                font_rgb = get_font_rgb(cell)
-                aoji = is_aoji(font_rgb)
-            except Exception:
-                pass
+            aoji = snapshot_aoji(session, ws, row_num, col)
             if col_name == 'KOUMOKU_SYURUI_CD' and isinstance(cell_value, str):
                 if table_name == 'T_KIHON_PJ_KOUMOKU':
                     mapped_val = KOUMOKU_TYPE_MAPPING.get(cell_value, '')
                 elif table_name == 'T_KIHON_PJ_KOUMOKU_RE':
                     mapped_val = KOUMOKU_TYPE_MAPPING_RE.get(cell_value, '')
 
-        return f"'{mapped_val}'" if mapped_val else "''"
-
-    def get_font_rgb(cell):
-        # openpyxl >= 2.5: cell.font.color is a Color object, .rgb is a string or None
-        if cell.font and cell.font.color:
-            rgb = getattr(cell.font.color, 'rgb', None)
-            # Only accept if rgb is a string of length 6 or 8 (hex color)
-            if isinstance(rgb, str) and (len(rgb) == 6 or len(rgb) == 8):
-                return rgb.upper()
-        return None
-
-    def is_aoji(font_rgb):
-        # Nếu font_rgb là None (mặc định, không tô màu), coi là đen (aoji=False)
-        black_colors = {None, '000000', 'FF000000'}
-        if font_rgb is None:
-            return False
-        return font_rgb not in black_colors
+        return sql_string_literal(mapped_val) if mapped_val else "''"
 
     # Handle AUTO_ID cases with sequence mappings
     if val_rule == 'AUTO_ID':
@@ -625,27 +1386,23 @@ def set_value_generic(
     if val_rule == '':
         try:
             if cell_fix:
-                cell_ref = f"{cell_fix}{row_num}"
-                cell = ws[cell_ref]
-                cell_value = get_cell_value_with_merged(ws, cell_ref)
-                font_rgb = get_font_rgb(cell)
-                aoji = is_aoji(font_rgb)
+                col = column_index_from_string(cell_fix)
+                cell_value = snapshot_value_with_merged(session, ws, row_num, col)
+                aoji = snapshot_aoji(session, ws, row_num, col)
             elif col_logic:
-                cell_ref = f"{col_logic}{row_num}"
-                cell = ws[cell_ref]
-                cell_value = get_cell_value_with_merged(ws, cell_ref)
-                font_rgb = get_font_rgb(cell)
-                aoji = is_aoji(font_rgb)
+                col = column_index_from_string(col_logic)
+                cell_value = snapshot_value_with_merged(session, ws, row_num, col)
+                aoji = snapshot_aoji(session, ws, row_num, col)
                 # Special case for YOUKEN_NO pattern extraction
                 if col_name == 'YOUKEN_NO':
-                    extracted_value = _extract_youken_no(cell_value)
+                    extracted_value = _extract_youken_no(session, cell_value)
                     if extracted_value:
                         cell_value = extracted_value
                     else:
                         return "''", aoji
                 # Special case for MIDASHI: if B~BN is merged at this row, set cell_value = 'True'
                 if col_name == 'MIDASHI':
-                    if is_merged_from_to(ws, row_num, 2, 66):  # B=2, BN=66
+                    if is_merged_from_to(session, ws, row_num, 2, 66):  # B=2, BN=66
                         cell_value = 'True'
                     else:
                         cell_value = 'False'
@@ -665,51 +1422,25 @@ def set_value_generic(
     elif val_rule == 'NULL':
         val = "NULL"
     elif val_rule == 'SYSTEMID':
-        val = f"'{systemid_value}'"
+        val = f"'{session.systemid_value}'"
     elif val_rule == 'T_KIHON_PJ.SYSTEM_ID':
-        val = f"'{systemid_value}'"
+        val = f"'{session.systemid_value}'"
     return val if val else "''", aoji
 
 def _format_cell_value_by_type(cell_value, data_type, col_name=None, table_name=None):
     """Format cell value based on data type"""
-    if cell_value is None or cell_value == '':
-        return "''"
-    
-    # Additional handling for specific columns in T_KIHON_PJ_KOUMOKU
-    if (
-        col_name in ['ZENKAKU_MOJI_SU', 'HANKAKU_MOJI_SU', 'SEISU_KETA', 'SYOUSU_KETA'] and
-        cell_value == "－"
-    ):
-        return "NULL"
-   
-    # Numeric types: do not quote, return as int/float
-    if data_type in ['int'] and cell_value != "NULL":
-        return int(cell_value)
-
-    # Date/time types: quote and format
-    elif data_type in ['date', 'datetime', 'smalldatetime', 'datetime2', 'datetimeoffset', 'time']:
-        if isinstance(cell_value, datetime.datetime):
-            return f"'{cell_value.strftime('%Y-%m-%d %H:%M:%S')}'"
-        elif isinstance(cell_value, str):
-            return f"'{cell_value}'"
-        else:
-            return f"'{str(cell_value)}'"
-    # NVARCHAR: N'...'
-    elif data_type == 'nvarchar':
-        return f"N'{cell_value}'"
-    # Default: quote as string
-    else:
-        return f"'{cell_value}'"
+    return sql_literal_encoder(data_type, col_name)(cell_value)
 
-def _extract_youken_no(cell_value):
+def _extract_youken_no(session, cell_value):
     """Extract YOUKEN_NO pattern from cell value with caching"""
     if isinstance(cell_value, str):
         # Use cached regex pattern
         pattern_key = 'youken_pattern'
-        if pattern_key not in _regex_pattern_cache:
-            _regex_pattern_cache[pattern_key] = re.compile(r'^\(要件№([\d\-]+)\)要件ﾛｼﾞｯｸ：')
+        pattern = lru_get(session, session.regex_pattern_cache, pattern_key)
+        if pattern is None:
+            pattern = re.compile(r'^\(要件№([\d\-]+)\)要件ﾛｼﾞｯｸ：')
+            lru_put(session, session.regex_pattern_cache, pattern_key, pattern)
         
-        pattern = _regex_pattern_cache[pattern_key]
         m = pattern.match(cell_value)
         if m:
             return m.group(1)
@@ -718,7 +1449,7 @@ def _extract_youken_no(cell_value):
 
 
 
-def koumoku_set_value(col_info, ws, row_num, sheet_seq, seq_k_value, seq_k_l_value=None):
+def koumoku_set_value(session, col_info, ws, row_num, sheet_seq, seq_k_value, seq_k_l_value=None):
     """Process column value for T_KIHON_PJ_KOUMOKU table"""
     seq_mappings = {
         'SEQ_K': seq_k_value,
@@ -730,6 +1461,7 @@ def koumoku_set_value(col_info, ws, row_num, sheet_seq, seq_k_value, seq_k_l_val
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -742,7 +1474,7 @@ def koumoku_set_value(col_info, ws, row_num, sheet_seq, seq_k_value, seq_k_l_val
     )
 
 
-def func_set_value(col_info, ws, row_num, sheet_seq, seq_f_value, seq_f_l_value=None):
+def func_set_value(session, col_info, ws, row_num, sheet_seq, seq_f_value, seq_f_l_value=None):
     """Process column value for T_KIHON_PJ_FUNC table"""
     seq_mappings = {
         'SEQ_F': seq_f_value,
@@ -754,6 +1486,7 @@ def func_set_value(col_info, ws, row_num, sheet_seq, seq_f_value, seq_f_l_value=
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -765,7 +1498,7 @@ def func_set_value(col_info, ws, row_num, sheet_seq, seq_f_value, seq_f_l_value=
     )
 
 
-def csv_set_value(col_info, ws, row_num, sheet_seq, seq_csv_value, seq_csv_l_value=None):
+def csv_set_value(session, col_info, ws, row_num, sheet_seq, seq_csv_value, seq_csv_l_value=None):
     """Process column value for T_KIHON_PJ_KOUMOKU_CSV table"""
     seq_mappings = {
         'SEQ_CSV': seq_csv_value,
@@ -777,6 +1510,7 @@ def csv_set_value(col_info, ws, row_num, sheet_seq, seq_csv_value, seq_csv_l_val
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -788,7 +1522,7 @@ def csv_set_value(col_info, ws, row_num, sheet_seq, seq_csv_value, seq_csv_l_val
     )
 
 
-def re_set_value(col_info, ws, row_num, sheet_seq, seq_re_value, seq_re_l_value=None):
+def re_set_value(session, col_info, ws, row_num, sheet_seq, seq_re_value, seq_re_l_value=None):
     """Process column value for T_KIHON_PJ_KOUMOKU_RE table"""
     seq_mappings = {
         'SEQ_RE': seq_re_value,
@@ -800,6 +1534,7 @@ def re_set_value(col_info, ws, row_num, sheet_seq, seq_re_value, seq_re_l_value=
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -812,7 +1547,7 @@ def re_set_value(col_info, ws, row_num, sheet_seq, seq_re_value, seq_re_l_value=
     )
 
 
-def message_set_value(col_info, ws, row_num, sheet_seq, seq_ms_value):
+def message_set_value(session, col_info, ws, row_num, sheet_seq, seq_ms_value):
     """Process column value for T_KIHON_PJ_MESSAGE table"""
     seq_mappings = {
         'SEQ_MS': seq_ms_value,
@@ -820,6 +1555,7 @@ def message_set_value(col_info, ws, row_num, sheet_seq, seq_ms_value):
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -828,7 +1564,7 @@ def message_set_value(col_info, ws, row_num, sheet_seq, seq_ms_value):
         seq_mappings=seq_mappings
     )
 
-def hyouji_set_value(col_info, ws, row_num, sheet_seq, seq_hj_value):
+def hyouji_set_value(session, col_info, ws, row_num, sheet_seq, seq_hj_value):
     """Process column value for T_KIHON_PJ_HYOUJI table"""
     seq_mappings = {
         'SEQ_H': seq_hj_value,
@@ -836,6 +1572,7 @@ def hyouji_set_value(col_info, ws, row_num, sheet_seq, seq_hj_value):
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -844,7 +1581,7 @@ def hyouji_set_value(col_info, ws, row_num, sheet_seq, seq_hj_value):
         seq_mappings=seq_mappings
     )
     
-def tab_set_value(col_info, ws, row_num, sheet_seq, seq_t_value):
+def tab_set_value(session, col_info, ws, row_num, sheet_seq, seq_t_value):
     """Process column value for T_KIHON_PJ_TAB table"""
     seq_mappings = {
         'SEQ_T': seq_t_value,
@@ -852,6 +1589,7 @@ def tab_set_value(col_info, ws, row_num, sheet_seq, seq_t_value):
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -861,7 +1599,7 @@ def tab_set_value(col_info, ws, row_num, sheet_seq, seq_t_value):
     )
 
 
-def ichiran_set_value(col_info, ws, row_num, sheet_seq, seq_i_value):
+def ichiran_set_value(session, col_info, ws, row_num, sheet_seq, seq_i_value):
     """Process column value for T_KIHON_PJ_ICHIRAN table"""
     seq_mappings = {
         'SEQ_I': seq_i_value,
@@ -869,6 +1607,7 @@ def ichiran_set_value(col_info, ws, row_num, sheet_seq, seq_i_value):
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -878,7 +1617,7 @@ def ichiran_set_value(col_info, ws, row_num, sheet_seq, seq_i_value):
     )
 
 
-def menu_set_value(col_info, ws, row_num, sheet_seq, seq_m_value):
+def menu_set_value(session, col_info, ws, row_num, sheet_seq, seq_m_value):
     """Process column value for T_KIHON_PJ_MENU table"""
     seq_mappings = {
         'SEQ_M': seq_m_value,
@@ -886,6 +1625,7 @@ def menu_set_value(col_info, ws, row_num, sheet_seq, seq_m_value):
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -895,7 +1635,7 @@ def menu_set_value(col_info, ws, row_num, sheet_seq, seq_m_value):
     )
 
 
-def ipo_set_value(col_info, ws, row_num, sheet_seq, seq_ipo_value):
+def ipo_set_value(session, col_info, ws, row_num, sheet_seq, seq_ipo_value):
     """Process column value for T_KIHON_PJ_IPO table"""
     seq_mappings = {
         'SEQ_IPO': seq_ipo_value,
@@ -903,6 +1643,7 @@ def ipo_set_value(col_info, ws, row_num, sheet_seq, seq_ipo_value):
     }
     
     return set_value_generic(
+        session,
         col_info=col_info,
         ws=ws,
         row_num=row_num,
@@ -912,70 +1653,355 @@ def ipo_set_value(col_info, ws, row_num, sheet_seq, seq_ipo_value):
     )
 
 
-def _handle_username_id(cell_value):
-    """Handle USER_NAME ID generation from usernameID.txt file with caching"""
-    global _username_id_counter
-    
-    # Initialize counter if not cached
-    if _username_id_counter is None:
+def _seq_text(seq_val):
+    """Render SEQ value as SQL text"""
+    return str(seq_val) if seq_val is not None else "''"
+
+def _column_index_or_none(col_letter):
+    """Convert column letter to index, or None if it is not a valid column letter"""
+    try:
+        return column_index_from_string(col_letter)
+    except ValueError:
+        return None
+
+def _constant_evaluator(val):
+    """Evaluator returning a value folded at compile time"""
+    result = (val, False)
+    def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+        return result
+    return evaluate
+
+def _compile_column_evaluator(col_info, seq_slots, reference_value, table_name, systemid_value):
+    """
+    Compile col_info into evaluator(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value)
+    returning (value, aoji), resolving the VALUE rule of set_value_generic once per column.
+    """
+    val_rule = col_info.get('VALUE', '')
+    cell_fix = col_info.get('CELL_FIX', '').strip()
+    col_logic = col_info.get('CELL_LOGIC', '').strip()
+    col_name = col_info.get('COLUMN_NAME', '')
+    data_type = col_info.get('DATA_TYPE', '').lower()
+
+    # Seq slot: AUTO_ID columns listed in the processor seq mappings
+    if val_rule == 'AUTO_ID' and col_name in seq_slots:
+        if seq_slots[col_name] == 'primary':
+            def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+                return _seq_text(primary_seq_value), False
+        else:
+            def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+                return _seq_text(secondary_seq_value), False
+        return evaluate
+
+    # Reference to parent table SEQ (e.g. T_KIHON_PJ_KOUMOKU.SEQ_K)
+    if reference_value is not None and val_rule == reference_value:
+        def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+            return _seq_text(primary_seq_value), False
+        return evaluate
+
+    # Mapping: font colour of the cell, plus KOUMOKU type code for CELL_LOGIC columns
+    if val_rule == 'MAPPING':
+        col = _column_index_or_none(cell_fix or col_logic)
+        if col is None:
+            return _interpreted_evaluator(col_info, seq_slots, reference_value, table_name)
+        type_mapping = None
+        if not cell_fix and col_name == 'KOUMOKU_SYURUI_CD':
+            type_mapping = {
+                'T_KIHON_PJ_KOUMOKU': KOUMOKU_TYPE_MAPPING,
+                'T_KIHON_PJ_KOUMOKU_RE': KOUMOKU_TYPE_MAPPING_RE
+            }.get(table_name)
+        def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+            aoji = snapshot_aoji(session, ws, row_num, col)
+            if type_mapping is not None:
+                cell_value = snapshot_value_with_merged(session, ws, row_num, col)
+                if isinstance(cell_value, str):
+                    mapped_val = type_mapping.get(cell_value, '')
+                    if mapped_val:
+                        return sql_string_literal(mapped_val), aoji
+            return "''", aoji
+        return evaluate
+
+    # Direct cell read at a fixed column
+    if val_rule == '':
+        if not cell_fix and not col_logic:
+            return _constant_evaluator("''")
+        col = _column_index_or_none(cell_fix or col_logic)
+        if col is None:
+            return _constant_evaluator("''")
+        is_youken_no = not cell_fix and col_name == 'YOUKEN_NO'
+        is_midashi = not cell_fix and col_name == 'MIDASHI'
+        encode = sql_literal_encoder(data_type, col_name)
+        def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+            aoji = False
+            try:
+                cell_value = snapshot_value_with_merged(session, ws, row_num, col)
+                aoji = snapshot_aoji(session, ws, row_num, col)
+                if is_youken_no:
+                    cell_value = _extract_youken_no(session, cell_value)
+                    if not cell_value:
+                        return "''", aoji
+                if is_midashi:
+                    cell_value = 'True' if is_merged_from_to(session, ws, row_num, *MERGED_CELL_RANGES['B_TO_BN']) else 'False'
+                return encode(cell_value), aoji
+            except Exception:
+                return "''", aoji
+        return evaluate
+
+    if val_rule == 'T_KIHON_PJ_GAMEN.SEQ':
+        def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+            return _seq_text(sheet_seq), False
+        return evaluate
+
+    # Constants: BLANK, NULL, SYSTEMID and any other literal rule
+    if val_rule == 'NULL':
+        return _constant_evaluator("NULL")
+    if val_rule in ('SYSTEMID', 'T_KIHON_PJ.SYSTEM_ID'):
+        return _constant_evaluator(f"'{systemid_value}'")
+    return _constant_evaluator("''")
+
+def _interpreted_evaluator(col_info, seq_slots, reference_value, table_name):
+    """Evaluator falling back to set_value_generic for rules that cannot be compiled"""
+    def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+        seq_mappings = {
+            col_name: primary_seq_value if slot == 'primary' else secondary_seq_value
+            for col_name, slot in seq_slots.items()
+        }
+        reference_mappings = {reference_value: primary_seq_value} if reference_value else None
+        return set_value_generic(
+            session,
+            col_info, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value,
+            seq_mappings=seq_mappings, reference_mappings=reference_mappings, table_name=table_name
+        )
+    return evaluate
+
+def _processor_evaluator(col_info, column_value_processor):
+    """Evaluator calling a column value processor such as koumoku_set_value"""
+    def evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value):
+        return column_value_processor(session, col_info, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value)
+    return evaluate
+
+def _build_table_plan(table_name, columns_info, evaluators):
+    """Build plan dict with column names and pre-computed special column indices"""
+    column_names = [col_info.get('COLUMN_NAME', '') for col_info in columns_info]
+    column_positions = {col_name: i for i, col_name in enumerate(column_names)}
+    return {
+        'table_name': table_name,
+        'column_names': column_names,
+        'columns_str': ", ".join(column_names),
+        'evaluators': evaluators,
+        'aoji_idx': column_names.index('AOJI') if 'AOJI' in column_positions else None,
+        'midashi_idx': column_positions.get('MIDASHI'),
+        'midashi_null_indices': [i for i, col_name in enumerate(column_names) if col_name in MIDASHI_NULL_COLUMNS],
+        'youken_no_idx': column_positions.get('YOUKEN_NO'),
+        'youken_logic_idx': column_positions.get('YOUKEN_LOGIC')
+    }
+
+def compile_table_plan(table_name, columns_info, seq_slots, reference_value=None, mapping_table_name=None, systemid_value=''):
+    """Compile columns_info of a table into a plan with one evaluator per column; SYSTEM_ID is folded in"""
+    evaluators = [
+        _compile_column_evaluator(col_info, seq_slots, reference_value, mapping_table_name, systemid_value)
+        for col_info in columns_info
+    ]
+    return _build_table_plan(table_name, columns_info, evaluators)
+
+def compile_processor_plan(table_name, columns_info, column_value_processor):
+    """Build a plan that evaluates each column through column_value_processor"""
+    evaluators = [_processor_evaluator(col_info, column_value_processor) for col_info in columns_info]
+    return _build_table_plan(table_name, columns_info, evaluators)
+
+def compile_table_plans(table_info, systemid_value):
+    """
+    Compile plans for every table handled by ROW_PROCESSOR_CONFIG (main and logic tables).
+    Seq slots and reference values mirror the mappings built by the *_set_value wrappers.
+    Plans fold in systemid_value, so they belong to one session.
+    """
+    plans = {}
+    for config in ROW_PROCESSOR_CONFIG.values():
+        table_name = config['table_name']
+        logic_table_name = config.get('logic_table_name')
+        seq_slots = {config['seq_prefix']: 'primary', 'ROW_NO': 'primary'}
+        reference_value = None
+        if logic_table_name:
+            logic_config = LOGIC_PROCESSOR_CONFIG[config['logic_processor']]
+            seq_slots[logic_config['seq_counter_name']] = 'secondary'
+            reference_value = f"{table_name}.{config['seq_prefix']}"
+        for plan_table_name in (table_name, logic_table_name):
+            if plan_table_name and plan_table_name in table_info:
+                plans[plan_table_name] = compile_table_plan(
+                    plan_table_name, table_info[plan_table_name], seq_slots, reference_value, table_name, systemid_value
+                )
+    return plans
+
+def evaluate_plan_row(session, plan, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value=None):
+    """Evaluate all columns of plan for one row, setting AOJI from collected font colours"""
+    row_values = []
+    final_aoji = False  # True if any column has non-black font
+    for evaluate in plan['evaluators']:
+        val, aoji = evaluate(session, ws, row_num, sheet_seq, primary_seq_value, secondary_seq_value)
+        row_values.append(val)
+        if aoji:
+            final_aoji = True
+    if plan['aoji_idx'] is not None:
+        row_values[plan['aoji_idx']] = "'1'" if final_aoji else "'0'"
+    return row_values
+
+
+def _wait_for_lock(try_lock, lock_path, timeout):
+    """Call try_lock() (raises OSError while the lock is held elsewhere) until it succeeds or timeout expires"""
+    deadline = time.monotonic() + timeout
+    while True:
         try:
-            with open('usernameID.txt', 'r', encoding='utf-8') as f:
-                current_id = f.read().strip()
-                if not current_id.isdigit():
-                    current_id = '1'
-                _username_id_counter = int(current_id)
-        except Exception:
-            _username_id_counter = 1
-    
-    # Use current counter, then decrease by 1
-    current_id = _username_id_counter
-    _username_id_counter -= 1
-    if _username_id_counter < 1:
-        _username_id_counter = 1
-    
-    # Write new value to file only when changed
+            try_lock()
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Could not lock {lock_path} within {timeout}s; is another run holding it?")
+            time.sleep(USERNAME_ID_LOCK_RETRY_DELAY)
+
+@contextlib.contextmanager
+def username_id_file_lock(username_id_file, timeout=USERNAME_ID_LOCK_TIMEOUT):
+    """
+    Hold an exclusive OS lock on username_id_file's .lock companion, so runs and pool
+    workers sharing the counter read and update it one at a time.
+    The counter file itself is replaced by rename, so it cannot carry the lock.
+    Raises TimeoutError when another run holds the lock for more than timeout seconds.
+    """
+    lock_path = f'{username_id_file}.lock'
+    with open(lock_path, 'a+b') as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # Windows: non-blocking attempts, since LK_LOCK spins on its own and gives up after 10 tries
+            import msvcrt
+            def try_lock():
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            _wait_for_lock(try_lock, lock_path, timeout)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            _wait_for_lock(lambda: fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB), lock_path, timeout)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def read_username_id_counter(username_id_file):
+    """Read the next USER_NAME id from username_id_file (1 if missing or invalid)"""
     try:
-        new_id = str(_username_id_counter).zfill(len(str(current_id)))
-        with open('usernameID.txt', 'w', encoding='utf-8') as f:
-            f.write(new_id)
+        with open(username_id_file, 'r', encoding='utf-8') as f:
+            current_id = f.read().strip()
+            if not current_id.isdigit():
+                current_id = '1'
+            return int(current_id)
     except Exception:
-        pass
-    
-    return str(cell_value) + str(current_id)
+        return 1
 
-def _parse_ref_pattern(ref_value):
+def write_username_id_counter(username_id_file, next_id, last_id):
+    """
+    Write the next USER_NAME id to username_id_file, padded to the width of the last id used.
+    Written to a temp file and renamed, so readers never see a partial counter.
+    Errors propagate: ids whose reservation is not on disk must not be handed out.
+    """
+    new_id = str(next_id).zfill(len(str(last_id)))
+    temp_file = f'{username_id_file}.{os.getpid()}.tmp'
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(new_id)
+        os.replace(temp_file, username_id_file)
+    except OSError:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+def reserve_username_ids(username_id_file, count):
+    """
+    Reserve count USER_NAME ids under the file lock by moving the counter past them
+    (ids count down and stop at 1), so concurrent runs never hand out the same ids.
+    Returns (first id of the block, next id written to the file); raises if the counter
+    cannot be written, so no id of an unrecorded block is used.
+    """
+    with username_id_file_lock(username_id_file):
+        first_id = read_username_id_counter(username_id_file)
+        next_id = max(first_id - count, 1)
+        write_username_id_counter(username_id_file, next_id, max(first_id - count + 1, 1))
+    return first_id, next_id
+
+def release_username_ids(session):
+    """
+    End of session: give the unused part of the reserved block back by writing the
+    session's next id, unless another run reserved ids from the file meanwhile.
+    Best effort: ids that cannot be given back are only skipped, never handed out twice.
+    """
+    if session.username_id_file and session.username_id_reserved:
+        try:
+            with username_id_file_lock(session.username_id_file):
+                if read_username_id_counter(session.username_id_file) == session.username_id_file_next:
+                    write_username_id_counter(
+                        session.username_id_file, session.username_id_counter, session.username_id_last
+                    )
+        except OSError as e:
+            print(f"Unused USER_NAME ids were not given back to {session.username_id_file}: {e}")
+    session.username_id_reserved = 0
+
+def next_username_id(session):
+    """Hand out the session's next USER_NAME id, reserving a new block from the file when needed"""
+    if session.username_id_file and not session.username_id_reserved:
+        session.username_id_counter, session.username_id_file_next = reserve_username_ids(
+            session.username_id_file, session.username_id_block_size
+        )
+        session.username_id_reserved = session.username_id_block_size
+    elif session.username_id_counter is None:
+        session.username_id_counter = 1
+    
+    # Use current counter, then decrease by 1
+    current_id = session.username_id_counter
+    session.username_id_counter = max(current_id - 1, 1)
+    session.username_id_last = current_id
+    if session.username_id_file:
+        session.username_id_reserved -= 1
+    return current_id
+
+def _handle_username_id(session, cell_value):
+    """Handle USER_NAME ID generation from the session's block of usernameID.txt ids"""
+    return str(cell_value) + str(next_username_id(session))
+
+def _parse_ref_pattern(session, ref_value):
     """Parse REF pattern like 'G2' into column letter and row number with caching"""
     if not ref_value or not isinstance(ref_value, str):
         return None, None
     
     # Use cached regex pattern
     pattern_key = 'ref_pattern'
-    if pattern_key not in _regex_pattern_cache:
-        _regex_pattern_cache[pattern_key] = re.compile(r'^([A-Z]+)(\d+)$')
+    pattern = lru_get(session, session.regex_pattern_cache, pattern_key)
+    if pattern is None:
+        pattern = re.compile(r'^([A-Z]+)(\d+)$')
+        lru_put(session, session.regex_pattern_cache, pattern_key, pattern)
     
-    pattern = _regex_pattern_cache[pattern_key]
     match = pattern.match(ref_value.strip().upper())
     if match:
         return match.group(1), int(match.group(2))
     return None, None
 
-def _find_ref_data_row(ws, target_value, stop_values=None):
+def _find_ref_data_row(session, ws, target_value, stop_values=None):
     """Find row where column B contains target_value, stop at stop_values"""
     if stop_values is None:
         stop_values = ['【備考】', '【運用上の注意点】']
     
-    for row_num in range(1, ws.max_row + 1):
-        cell_b_value = ws[f"B{row_num}"].value
-        if cell_b_value == target_value:
-            return row_num
-        if cell_b_value in stop_values:
-            break
-    return None
+    target_rows = get_section_rows(session, ws, target_value)
+    if not target_rows:
+        return None
+    stop_rows = [rows[0] for rows in (get_section_rows(session, ws, value) for value in stop_values) if rows]
+    if stop_rows and min(stop_rows) < target_rows[0]:
+        return None
+    return target_rows[0]
 
-def _get_ref_cell_value(ws, sheet_check_value, ref_value, col_name):
+def _get_ref_cell_value(session, ws, sheet_check_value, ref_value, col_name):
     """Get cell value based on REF pattern and sheet type"""
     # Parse REF pattern
-    col_letter, row_offset = _parse_ref_pattern(ref_value)
+    col_letter, row_offset = _parse_ref_pattern(session, ref_value)
     if not col_letter or row_offset is None:
         return 'NULL'
     
@@ -991,16 +2017,15 @@ def _get_ref_cell_value(ws, sheet_check_value, ref_value, col_name):
         return 'NULL'
     
     # Find the target row
-    target_row = _find_ref_data_row(ws, target_value)
+    target_row = _find_ref_data_row(session, ws, target_value)
     if not target_row:
         return 'NULL'
     
     # Calculate final cell position: [X][target_row + 1 + Y*2]
     final_row = target_row + 1 + (row_offset * 2)
-    cell_ref = f"{col_letter}{final_row}"
     
     try:
-        cell_value = get_cell_value_with_merged(ws, cell_ref)
+        cell_value = snapshot_value_with_merged(session, ws, final_row, column_index_from_string(col_letter))
         if col_name == 'KUGIRI_MOJI_KB_CSV' and cell_value is not None:
             if cell_value == 'カンマ':
                 return 'カンマ'
@@ -1013,44 +2038,13 @@ def _get_ref_cell_value(ws, sheet_check_value, ref_value, col_name):
     except Exception:
         return 'NULL'
 
-def _format_value_by_data_type(cell_value, data_type, col_name):
+def _format_value_by_data_type(session, cell_value, data_type, col_name):
     """Format value based on data type"""
-    # Numeric types: do not quote
-    if data_type in ['int', 'bigint', 'smallint', 'tinyint', 'decimal', 'numeric', 'float', 'real', 'money', 'smallmoney']:
-        try:
-            if isinstance(cell_value, (int, float)):
-                return str(cell_value)
-            else:
-                cell_str = str(cell_value).replace(',', '').replace(' ', '')
-                if '.' in cell_str:
-                    return str(float(cell_str))
-                else:
-                    return str(int(cell_str))
-        except Exception:
-            return '0'
-    
-    # Date/time types: quote and format
-    elif data_type in ['date', 'datetime', 'smalldatetime', 'datetime2', 'datetimeoffset', 'time']:
-        if isinstance(cell_value, datetime.datetime):
-            return f"'{cell_value.strftime('%Y-%m-%d %H:%M:%S')}'"
-        elif isinstance(cell_value, str):
-            return f"'{cell_value}'"
-        else:
-            return f"'{str(cell_value)}'"
-    
-    # NVARCHAR: N'...'
-    elif data_type == 'nvarchar':
-        if col_name == 'USER_NAME':
-            username_with_id = _handle_username_id(cell_value)
-            return f"N'{username_with_id}'"
-        else:
-            return f"N'{cell_value}'"
-    
-    # Default: quote as string
-    else:
-        return f"'{cell_value}'"
+    if data_type == 'nvarchar' and col_name == 'USER_NAME':
+        cell_value = _handle_username_id(session, cell_value)
+    return sql_literal_encoder(data_type)(cell_value)
 
-def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None, jyun_value=None, sheet_check_value=None):
+def column_value(session, col_info, ws, seq_value=None, jyun_value=None, sheet_check_value=None):
     """Process column value based on VALUE rules"""
     val_rule = col_info.get('VALUE', '')
     cell_fix = col_info.get('CELL_FIX', '').strip()
@@ -1060,12 +2054,7 @@ def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None
     # Extract font color if cell_fix is available
     if cell_fix:
         try:
-            cell = ws[cell_fix]
-            if cell.font and cell.font.color:
-                rgb = getattr(cell.font.color, 'rgb', None)
-                if isinstance(rgb, str) and (len(rgb) == 6 or len(rgb) == 8):
-                    black_colors = {None, '000000', 'FF000000'}
-                    aoji = rgb.upper() not in black_colors
+            aoji = snapshot_aoji(session, ws, *coordinate_to_tuple(cell_fix))
         except Exception:
             pass
     
@@ -1074,17 +2063,17 @@ def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None
     elif val_rule == 'NULL':
         val = "NULL"
     elif val_rule == 'SYSTEMID':
-        val = f"'{systemid_value}'"
+        val = f"'{session.systemid_value}'"
     elif val_rule == 'T_KIHON_PJ.SYSTEM_ID':
-        val = f"'{systemid_value}'"
+        val = f"'{session.systemid_value}'"
     elif val_rule == 'AUTO_ID' and col_name == 'SEQ':
         val = str(seq_value) if seq_value is not None else "''"
     elif val_rule == 'AUTO_ID' and col_name == 'JYUN':
         val = str(jyun_value) if jyun_value is not None else "''"
     elif val_rule in ('SYSTEM DATE', 'AUTO_TIME'):
-        val = f"'{system_date_value}'"
+        val = f"'{session.system_date_value}'"
     elif val_rule == 'MAPPING':
-        cell_value = ws[cell_fix].value if cell_fix else None
+        cell_value = snapshot_value(session, ws, *coordinate_to_tuple(cell_fix)) if cell_fix else None
         val = MAPPING_VALUE_DICT.get(cell_value, "''")
     elif val_rule == 'REF':
         # Handle REF case based on sheet_check_value
@@ -1101,12 +2090,12 @@ def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None
                 cell_ref = col_info.get(ref_column, '').strip()
                 try:
                     if cell_ref:
-                        cell_value = _get_ref_cell_value(ws, sheet_check_value, cell_ref, col_name)
+                        cell_value = _get_ref_cell_value(session, ws, sheet_check_value, cell_ref, col_name)
                         if cell_value == 'NULL':
                             val = "NULL"
                         else:
                             data_type = col_info.get('DATA_TYPE', '').lower()
-                            val = _format_value_by_data_type(cell_value, data_type, col_name)
+                            val = _format_value_by_data_type(session, cell_value, data_type, col_name)
                     else:
                         val = "NULL"
                 except Exception:
@@ -1121,7 +2110,7 @@ def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None
                 # Add logic for SHEET_NAME
                 if col_name == 'SHEET_NAME':
                     # Try to get sheet_idx from ws
-                    global sheetnames
+                    sheetnames = session.sheetnames
                     sheet_idx = None
                     for idx, name in enumerate(sheetnames):
                         if ws.title == name:
@@ -1132,12 +2121,12 @@ def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None
                     else:
                         cell_value = ws.title
                 else:
-                    cell_value = get_cell_value_with_merged(ws, cell_fix)
+                    cell_value = get_cell_value_with_merged(session, ws, cell_fix)
                 if cell_value is None:
                     val = "''"
                 else:
                     data_type = col_info.get('DATA_TYPE', '').lower()
-                    val = _format_value_by_data_type(cell_value, data_type, col_name)
+                    val = _format_value_by_data_type(session, cell_value, data_type, col_name)
             except Exception:
                 val = "''"
         else:
@@ -1146,21 +2135,26 @@ def column_value(col_info, ws, systemid_value, system_date_value, seq_value=None
         # Other values, treat as string literal
         # Add N prefix for nvarchar columns
         if col_info.get('DATA_TYPE', '').lower() == 'nvarchar':
-            val = f"N'{val_rule}'"
+            val = sql_string_literal(val_rule, 'N')
         else:
-            val = f"'{val_rule}'"
+            val = sql_string_literal(val_rule)
     
     return val, aoji
   
 
 
-def generate_insert_statements_from_excel(sheet_index, table_key):
+def generate_insert_statements_from_excel(session, sheet_index, table_key):
     """
     Unified function to generate INSERT statements for all table types
-    Uses global wb, sheetnames, and table_info instead of loading files each time
+    Uses the session's wb, sheetnames, and table_info instead of loading files each time
     """
-    # Use global table_info instead of reading file
-    global table_info, wb, sheetnames, systemid_value, system_date_value
+    return [format_insert_row(row) for row in generate_insert_rows_from_excel(session, sheet_index, table_key)]
+
+
+def generate_insert_rows_from_excel(session, sheet_index, table_key):
+    """Create the INSERT row records behind generate_insert_statements_from_excel"""
+    # Use the session's table_info instead of reading file
+    table_info, wb, sheetnames = session.table_info, session.wb, session.sheetnames
     
     if table_key not in table_info:
         raise ValueError(f"Table key '{table_key}' not found in table info.")
@@ -1170,7 +2164,7 @@ def generate_insert_statements_from_excel(sheet_index, table_key):
     
     if table_key == 'T_KIHON_PJ_GAMEN':
         # Special handling for T_KIHON_PJ_GAMEN: process multiple sheets
-        global seq_per_sheet_dict
+        seq_per_sheet_dict = session.seq_per_sheet_dict
         seq_per_sheet = 1
         allowed_b2_values = set(MAPPING_VALUE_DICT.keys())
         for sheet_idx, sheet_name in enumerate(sheetnames):
@@ -1190,7 +2184,7 @@ def generate_insert_statements_from_excel(sheet_index, table_key):
             aoji_values = []
             for col_info in columns_info:
                 col_name = col_info.get('COLUMN_NAME', '')
-                val, aoji = column_value(col_info, ws, systemid_value, system_date_value, seq_value, jyun_value)
+                val, aoji = column_value(session, col_info, ws, seq_value, jyun_value)
                 row_data[col_name] = val
                 aoji_values.append(aoji)
             
@@ -1200,9 +2194,7 @@ def generate_insert_statements_from_excel(sheet_index, table_key):
                 row_data['AOJI'] = f"'{final_aoji}'"
             
             columns_str = ", ".join(row_data.keys())
-            values_str = join_sql_values(row_data.values())
-            sql = f"INSERT INTO {table_key} ({columns_str}) VALUES ({values_str});"
-            insert_statements.append(sql)
+            insert_statements.append(insert_row(table_key, columns_str, row_data.values()))
             seq_per_sheet += 1
     
     elif table_key == 'T_KIHON_PJ':
@@ -1217,7 +2209,7 @@ def generate_insert_statements_from_excel(sheet_index, table_key):
         for col_info in columns_info:
             col_name = col_info['COLUMN_NAME']
             cols.append(col_name)
-            val, aoji = column_value(col_info, ws, systemid_value, system_date_value)
+            val, aoji = column_value(session, col_info, ws)
             vals.append(val)
             aoji_values.append(aoji)
 
@@ -1228,177 +2220,819 @@ def generate_insert_statements_from_excel(sheet_index, table_key):
             vals[aoji_index] = f"'{final_aoji}'"
 
         columns_str = ", ".join(cols)
-        values_str = join_sql_values(vals)
-        sql = f"INSERT INTO {table_key} ({columns_str}) VALUES ({values_str});"
-        insert_statements.append(sql)
+        insert_statements.append(insert_row(table_key, columns_str, vals))
     
     else:
-        # Default handling for other tables: process each row in the sheet
-        df = pd.read_excel(wb, sheet_name=sheet_index, engine='openpyxl')
+        # Default handling for other tables: one row per data row of the sheet
         if sheet_index >= len(sheetnames):
             raise ValueError(f"Sheet index {sheet_index} out of range.")
         ws = wb[sheetnames[sheet_index]]
+        row_count = read_excel_row_count(ws)
+        if row_count == 0:
+            return insert_statements
         
-        for _, row in df.iterrows():
-            cols = []
-            vals = []
-            aoji_values = []
-            for col_info in columns_info:
-                col_name = col_info['COLUMN_NAME']
-                cols.append(col_name)
-                val, aoji = column_value(col_info, ws, systemid_value, system_date_value)
+        # Column values do not depend on the data row: evaluate each column once and
+        # broadcast it, except columns that draw a new value per call (USER_NAME id)
+        cols = []
+        vals = []
+        per_row_columns = []
+        aoji_values = []
+        for col_idx, col_info in enumerate(columns_info):
+            cols.append(col_info['COLUMN_NAME'])
+            if _is_per_row_column(col_info):
+                per_row_columns.append((col_idx, col_info))
+                vals.append(None)
+                aoji_values.append(False)
+            else:
+                val, aoji = column_value(session, col_info, ws)
                 vals.append(val)
                 aoji_values.append(aoji)
-            
+        
+        columns_str = ", ".join(cols)
+        aoji_index = cols.index('AOJI') if 'AOJI' in cols else None
+        
+        if not per_row_columns:
             # Set AOJI column based on collected aoji values
-            final_aoji = '1' if any(aoji_values) else '0'
-            if 'AOJI' in cols:
-                aoji_index = cols.index('AOJI')
-                vals[aoji_index] = f"'{final_aoji}'"
-            
-            columns_str = ", ".join(cols)
-            values_str = join_sql_values(vals)
-            sql = f"INSERT INTO {table_key} ({columns_str}) VALUES ({values_str});"
-            insert_statements.append(sql)
+            if aoji_index is not None:
+                vals[aoji_index] = f"'{'1' if any(aoji_values) else '0'}'"
+            row = insert_row(table_key, columns_str, vals)
+            insert_statements.extend([row] * row_count)
+            return insert_statements
+        
+        # Per-row columns are evaluated row by row as whole vectors
+        per_row_vectors = []
+        for col_idx, col_info in per_row_columns:
+            vector = [column_value(session, col_info, ws) for _ in range(row_count)]
+            per_row_vectors.append((col_idx, vector))
+        for row_idx in range(row_count):
+            row_vals = list(vals)
+            row_aoji = list(aoji_values)
+            for col_idx, vector in per_row_vectors:
+                row_vals[col_idx], row_aoji[col_idx] = vector[row_idx]
+            # Set AOJI column based on collected aoji values
+            if aoji_index is not None:
+                row_vals[aoji_index] = f"'{'1' if any(row_aoji) else '0'}'"
+            insert_statements.append(insert_row(table_key, columns_str, row_vals))
     
     return insert_statements
 
 
-def all_tables_in_sequence(excel_file, table_info_file, output_file='insert_all.sql'):
+def read_excel_row_count(ws):
     """
-    Process all tables in the correct sequence:
-    1. Initialize workbook and table_info once
-    2. Create INSERT for T_KIHON_PJ
-    3. Iterate through sheets (from sheet 3) to create INSERT for T_KIHON_PJ_GAMEN
-    4. For each new SEQ, process T_KIHON_PJ_KOUMOKU
-    5. For each new SEQ_K, process T_KIHON_PJ_KOUMOKU_LOGIC
+    Number of data rows pd.read_excel(header=0) returns for the sheet, computed from the
+    already loaded worksheet: the last row holding a non-empty value, minus the header row.
     """
-    global seq_per_sheet_dict, wb, sheetnames, table_info
-    
-    # Initialize workbook and table_info once at the beginning
-    initialize_workbook(excel_file)
-    initialize_table_info(table_info_file)
-    
-    all_insert_statements = []
-    
-    pj_inserted = False
-    
-    gamen_columns_info = table_info.get('T_KIHON_PJ_GAMEN', [])
-    
+    if hasattr(ws, '_cells'):
+        cells = ((row, cell.value) for (row, _), cell in ws._cells.items())
+    else:
+        cells = (
+            (row, value)
+            for row, row_values in enumerate(ws.iter_rows(values_only=True), 1)
+            for value in row_values
+        )
+    last_row = 0
+    for row, value in cells:
+        if row > last_row and value is not None and value != '':
+            last_row = row
+    return max(last_row - 1, 0)
+
+
+def _is_per_row_column(col_info):
+    """True for columns whose column_value changes on every call (USER_NAME draws a new id)"""
+    return (
+        col_info.get('COLUMN_NAME') == 'USER_NAME'
+        and col_info.get('VALUE', '') == ''
+        and bool(col_info.get('CELL_FIX', '').strip())
+        and col_info.get('DATA_TYPE', '').lower() == 'nvarchar'
+    )
+
+
+def assign_sheet_seqs(session):
+    """
+    Pre-pass over sheetnames assigning the sheet SEQ of every sheet to convert.
+    Returns list of (sheet_idx, seq_value) and records them in session.seq_per_sheet_dict.
+    """
+    sheet_tasks = []
     seq_per_sheet = 1
     allowed_b2_values = set(MAPPING_VALUE_DICT.keys())
     
-    for sheet_idx, sheet_name in enumerate(sheetnames):
+    for sheet_idx, sheet_name in enumerate(session.sheetnames):
         if sheet_name in EXCLUDED_SHEETNAMES:
             continue
         
         # Use cached B2 value instead of reading from sheet
-        sheet_check_value = _sheet_b2_values_cache.get(sheet_name)
-
-        if sheet_check_value not in allowed_b2_values:
+        if get_sheet_b2_value(session, sheet_name) not in allowed_b2_values:
             continue
-
-        # Lồng logic tạo INSERT cho T_KIHON_PJ, chỉ thực hiện 1 lần cho sheet hợp lệ đầu tiên
-        if not pj_inserted:
-            print("Processing T_KIHON_PJ...")
-            pj_inserts = generate_insert_statements_from_excel(sheet_idx, 'T_KIHON_PJ')
-            all_insert_statements.extend(pj_inserts)
-            pj_inserted = True
-
-        # Always process T_KIHON_PJ_GAMEN
-        ws = wb[sheet_name]  # Get worksheet reference
-        row_data = {}
-        seq_value = seq_per_sheet
-        jyun_value = seq_value
-        seq_per_sheet_dict[sheet_idx] = seq_value
-        aoji_values = []
-        for col_info in gamen_columns_info:
-            col_name = col_info.get('COLUMN_NAME', '')
-            val, aoji = column_value(col_info, ws, systemid_value, system_date_value, seq_value, jyun_value, sheet_check_value)
-            row_data[col_name] = val
-            aoji_values.append(aoji)
-        
-        # Set AOJI column based on collected aoji values
-        final_aoji = '1' if any(aoji_values) else '0'
-        if 'AOJI' in row_data:
-            row_data['AOJI'] = f"'{final_aoji}'"
         
-        columns_str = ", ".join(row_data.keys())
-        values_str = join_sql_values(row_data.values())
-        sql = f"INSERT INTO T_KIHON_PJ_GAMEN ({columns_str}) VALUES ({values_str});"
-        all_insert_statements.append(sql)
-        print(f"Processing sheet {sheet_idx}: {sheet_name} with SEQ {seq_value}")
-
-        # Xử lý theo từng loại sheet_check_value
-        if sheet_check_value == '項目定義書_帳票':
-            # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_KOUMOKU_RE, T_KIHON_PJ_KOUMOKU_RE_LOGIC
-            re_inserts = re_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(re_inserts)
-        elif sheet_check_value == '項目定義書_CSV':
-            # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_KOUMOKU_CSV, T_KIHON_PJ_KOUMOKU_CSV_LOGIC
-            csv_inserts = csv_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(csv_inserts)
-        elif sheet_check_value == '項目定義書_IPO図':
-            # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_IPO
-            ipo_inserts = ipo_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(ipo_inserts)
-        elif sheet_check_value == '項目定義書_ﾒﾆｭｰ':
-            # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_MENU
-            menu_inserts = menu_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(menu_inserts)
-        elif sheet_check_value == '項目定義書_画面':
-            # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_FUNC, T_KIHON_PJ_FUNC_LOGIC, T_KIHON_PJ_KOUMOKU, T_KIHON_PJ_KOUMOKU_LOGIC, T_KIHON_PJ_MESSAGE, T_KIHON_PJ_TAB, T_KIHON_PJ_ICHIRAN, T_KIHON_PJ_HYOUJI
-            koumoku_inserts = koumoku_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(koumoku_inserts)
-            
-            func_inserts = func_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(func_inserts)
-            
-            message_inserts = message_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(message_inserts)
-            tab_inserts = tab_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(tab_inserts)
-            ichiran_inserts = ichiran_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(ichiran_inserts)
-            hyouji_inserts = hyouji_row(
-                sheet_idx, seq_value
-            )
-            all_insert_statements.extend(hyouji_inserts)
+        session.seq_per_sheet_dict[sheet_idx] = seq_per_sheet
+        sheet_tasks.append((sheet_idx, seq_per_sheet))
         seq_per_sheet += 1
+    return sheet_tasks
+
+
+def iter_sheet_rows(session, sheet_idx, seq_value):
+    """
+    Yield INSERT row records of one sheet: T_KIHON_PJ_GAMEN followed by the tables
+    of its sheet type. Depends on other sheets only through seq_value.
+    """
+    sheet_name = session.sheetnames[sheet_idx]
+    sheet_check_value = get_sheet_b2_value(session, sheet_name)
+    
+    # Always process T_KIHON_PJ_GAMEN
+    gamen_start = time.perf_counter() if session.metrics is not None else None
+    ws = session.wb[sheet_name]  # Get worksheet reference
+    row_data = {}
+    jyun_value = seq_value
+    aoji_values = []
+    for col_info in session.table_info.get('T_KIHON_PJ_GAMEN', []):
+        col_name = col_info.get('COLUMN_NAME', '')
+        val, aoji = column_value(session, col_info, ws, seq_value, jyun_value, sheet_check_value)
+        row_data[col_name] = val
+        aoji_values.append(aoji)
+    
+    # Set AOJI column based on collected aoji values
+    final_aoji = '1' if any(aoji_values) else '0'
+    if 'AOJI' in row_data:
+        row_data['AOJI'] = f"'{final_aoji}'"
+    
+    columns_str = ", ".join(row_data.keys())
+    gamen_row = insert_row('T_KIHON_PJ_GAMEN', columns_str, row_data.values())
+    if session.metrics is not None:
+        metrics_add_time(session, 'T_KIHON_PJ_GAMEN', time.perf_counter() - gamen_start)
+    yield gamen_row
+    print(f"Processing sheet {sheet_idx}: {sheet_name} with SEQ {seq_value}")
+
+    # Xử lý theo từng loại sheet_check_value
+    if sheet_check_value == '項目定義書_帳票':
+        # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_KOUMOKU_RE, T_KIHON_PJ_KOUMOKU_RE_LOGIC
+        yield from re_row(session, sheet_idx, seq_value)
+    elif sheet_check_value == '項目定義書_CSV':
+        # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_KOUMOKU_CSV, T_KIHON_PJ_KOUMOKU_CSV_LOGIC
+        yield from csv_row(session, sheet_idx, seq_value)
+    elif sheet_check_value == '項目定義書_IPO図':
+        # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_IPO
+        yield from ipo_row(session, sheet_idx, seq_value)
+    elif sheet_check_value == '項目定義書_ﾒﾆｭｰ':
+        # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_MENU
+        yield from menu_row(session, sheet_idx, seq_value)
+    elif sheet_check_value == '項目定義書_画面':
+        # Chỉ xử lý T_KIHON_PJ_GAMEN, T_KIHON_PJ_FUNC, T_KIHON_PJ_FUNC_LOGIC, T_KIHON_PJ_KOUMOKU, T_KIHON_PJ_KOUMOKU_LOGIC, T_KIHON_PJ_MESSAGE, T_KIHON_PJ_TAB, T_KIHON_PJ_ICHIRAN, T_KIHON_PJ_HYOUJI
+        yield from koumoku_row(session, sheet_idx, seq_value)
+        yield from func_row(session, sheet_idx, seq_value)
+        yield from message_row(session, sheet_idx, seq_value)
+        yield from tab_row(session, sheet_idx, seq_value)
+        yield from ichiran_row(session, sheet_idx, seq_value)
+        yield from hyouji_row(session, sheet_idx, seq_value)
+
+
+def convert_sheet(session, sheet_idx, seq_value):
+    """Create the list of INSERT row records of one sheet"""
+    return list(iter_sheet_rows(session, sheet_idx, seq_value))
+
+
+def _app_source_digest():
+    """SHA-256 of this module's source, so cached sheets are rebuilt after code changes"""
+    global _app_source_digest_value
+    if _app_source_digest_value is None:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            _app_source_digest_value = hashlib.sha256(f.read()).hexdigest()
+    return _app_source_digest_value
+
+_app_source_digest_value = None
+
+
+def sheet_cache_key(session, sheet_idx, seq_value):
+    """
+    Content hash of everything the rows of one sheet depend on: the snapshot's cell values,
+    merged ranges and AOJI cells, plus table_info, SYSTEM_ID/date, the sheet SEQ and this code.
+    The sheet name is not part of the key.
+    """
+    ws = session.wb[session.sheetnames[sheet_idx]]
+    snapshot = get_sheet_snapshot(session, ws)
+    if snapshot['font_aoji'] is not None:
+        aoji_font_ids = {font_id for font_id, aoji in enumerate(snapshot['font_aoji']) if aoji}
+    else:
+        fonts = getattr(ws.parent, '_fonts', None) or ()
+        aoji_font_ids = {font_id for font_id in range(len(fonts)) if resolve_font_aoji(session, ws.parent, font_id)}
+    
+    hasher = hashlib.sha256()
+    header = [
+        SHEET_CACHE_VERSION, _app_source_digest(), session.table_info_digest, session.systemid_value, session.system_date_value,
+        seq_value, snapshot['min_col'], snapshot['max_col'], snapshot['max_row'], sorted(snapshot['merged_bounds'])
+    ]
+    hasher.update(json.dumps(header, ensure_ascii=False).encode('utf-8'))
+    for row_values, row_font_ids in zip(snapshot['values'], snapshot['font_ids']):
+        hasher.update(b'\n')
+        hasher.update(repr(row_values).encode('utf-8'))
+        # Only the positions of AOJI cells matter, not the workbook-wide font ids
+        if aoji_font_ids and not aoji_font_ids.isdisjoint(row_font_ids):
+            aoji_cols = [i for i, font_id in enumerate(row_font_ids) if font_id in aoji_font_ids]
+            hasher.update(repr(aoji_cols).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def load_sheet_cache(cache_dir, cache_key):
+    """Return cached row records for cache_key, or None if absent or unreadable"""
+    cache_file = os.path.join(cache_dir, f'{cache_key}.json')
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return [tuple(row) for row in json.load(f)]
+    except (OSError, ValueError):
+        return None
+
+
+def save_sheet_cache(cache_dir, cache_key, rows):
+    """Write row records for cache_key atomically (temp file + rename)"""
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = os.path.join(cache_dir, f'{cache_key}.json')
+    temp_file = f'{cache_file}.{os.getpid()}.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False)
+    os.replace(temp_file, cache_file)
+
+
+def convert_sheet_cached(session, sheet_idx, seq_value, cache_dir=None):
+    """
+    Convert one sheet, reusing its rows when the sheet content is unchanged: from the
+    previous run kept in memory (session.sheet_outputs, watch mode) or from cache_dir.
+    """
+    if cache_dir is None and session.sheet_outputs is None:
+        return convert_sheet(session, sheet_idx, seq_value)
+    
+    cache_key = sheet_cache_key(session, sheet_idx, seq_value)
+    rows = None
+    if session.sheet_outputs is not None:
+        rows = session.previous_sheet_outputs.get(cache_key)
+    if rows is None and cache_dir is not None:
+        rows = load_sheet_cache(cache_dir, cache_key)
+    if session.metrics is not None:
+        metrics_cache(session, 'sheet_output', rows is not None)
+    if rows is not None:
+        print(f"Reusing cached sheet {sheet_idx}: {session.sheetnames[sheet_idx]} with SEQ {seq_value}")
+    else:
+        rows = convert_sheet(session, sheet_idx, seq_value)
+        if cache_dir is not None:
+            save_sheet_cache(cache_dir, cache_key, rows)
+    if session.sheet_outputs is not None:
+        session.sheet_outputs[cache_key] = rows
+    return rows
+
+
+def _init_sheet_worker(
+    excel_file,
+    shared_table_info,
+    parent_systemid_value,
+    parent_system_date_value,
+    metrics_enabled=False,
+    global_cache_max_entries=GLOBAL_CACHE_MAX_ENTRIES,
+    parent_username_id_file=None
+):
+    """
+    Process pool initializer: build the worker's session on a read-only view of the workbook.
+    table_info (as parsed or set by the parent), SYSTEM_ID, date, the metrics switch, cache sizes
+    and the USER_NAME id file come from the parent so every worker behaves the same.
+    """
+    global _worker_session
+    _worker_session = ConversionSession(
+        parent_systemid_value, parent_system_date_value, parent_username_id_file, global_cache_max_entries,
+        metrics_enabled
+    )
+    initialize_workbook(_worker_session, excel_file, read_only=True)
+    set_table_info(_worker_session, shared_table_info)
+
+_worker_session = None
+
+
+def _convert_sheet_task(sheet_task, cache_dir=None):
+    """
+    Process pool task: convert one (sheet_idx, seq_value) pair.
+    With metrics enabled returns (rows, metrics collected since the previous task).
+    """
+    sheet_idx, seq_value = sheet_task
+    session = _worker_session
+    rows = convert_sheet_cached(session, sheet_idx, seq_value, cache_dir)
+    release_sheet_caches(session, session.sheetnames[sheet_idx])
+    # Workers have no end of session: give unused USER_NAME ids back after every sheet
+    release_username_ids(session)
+    if session.metrics is None:
+        return rows
+    worker_metrics = session.metrics
+    enable_metrics(session)
+    return rows, worker_metrics
+
+
+def iter_all_rows(excel_file, table_info_file, workers=1, cache_dir=None, session=None):
+    """
+    Yield all INSERT row records in the correct sequence:
+    1. Initialize workbook and table_info once
+    2. Create INSERT for T_KIHON_PJ
+    3. Iterate through sheets (from sheet 3) to create INSERT for T_KIHON_PJ_GAMEN
+    4. For each new SEQ, process T_KIHON_PJ_KOUMOKU
+    5. For each new SEQ_K, process T_KIHON_PJ_KOUMOKU_LOGIC
     
-    # Write all statements to file in batches for better I/O performance
-    batch_size = 1000
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for i in range(0, len(all_insert_statements), batch_size):
-            batch = all_insert_statements[i:i + batch_size]
-            f.write('\n'.join(batch) + '\n')
+    With workers > 1, sheet SEQs are assigned in a pre-pass and sheets are converted
+    in a process pool, each worker using its own read-only view of the workbook.
+    Results are merged back in SEQ order, so the output matches the serial run.
     
-    # Clear caches after processing to free memory
-    clear_performance_caches()
+    With cache_dir (or session.sheet_outputs, see watch_tables), rows of sheets whose
+    content is unchanged are reused; the workbook is then opened read-only since cached
+    sheets only need their snapshot.
+    
+    Sheet-scoped caches (snapshot, indexes, cell lookups) are released as soon as a
+    sheet is converted, so they only ever hold the sheet in progress.
+    
+    All state lives in session (a new one from the module defaults when None).
+    """
+    if session is None:
+        session = new_session()
+    # Initialize workbook and table_info once at the beginning (table_info_file None: already set)
+    reuse_sheets = cache_dir is not None or session.sheet_outputs is not None
+    initialize_workbook(session, excel_file, read_only=workers > 1 or reuse_sheets)
+    if table_info_file is not None:
+        initialize_table_info(session, table_info_file)
+
+    sheet_tasks = assign_sheet_seqs(session)
+    
+    # Lồng logic tạo INSERT cho T_KIHON_PJ, chỉ thực hiện 1 lần cho sheet hợp lệ đầu tiên
+    if sheet_tasks:
+        print("Processing T_KIHON_PJ...")
+        with metrics_stage(session, 'T_KIHON_PJ'):
+            kihon_pj_rows = generate_insert_rows_from_excel(session, sheet_tasks[0][0], 'T_KIHON_PJ')
+        yield from kihon_pj_rows
+    
+    if workers > 1 and len(sheet_tasks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_sheet_worker,
+            initargs=(
+                excel_file, session.table_info, session.systemid_value, session.system_date_value,
+                session.metrics is not None, session.global_cache_max_entries, session.username_id_file
+            )
+        ) as executor:
+            # executor.map yields results in submission (SEQ) order
+            for sheet_inserts in executor.map(partial(_convert_sheet_task, cache_dir=cache_dir), sheet_tasks):
+                if session.metrics is not None:
+                    sheet_inserts, worker_metrics = sheet_inserts
+                    merge_metrics(session, worker_metrics)
+                yield from sheet_inserts
+    elif reuse_sheets:
+        for sheet_idx, seq_value in sheet_tasks:
+            yield from convert_sheet_cached(session, sheet_idx, seq_value, cache_dir)
+            release_sheet_caches(session, session.sheetnames[sheet_idx])
+    else:
+        for sheet_idx, seq_value in sheet_tasks:
+            yield from iter_sheet_rows(session, sheet_idx, seq_value)
+            release_sheet_caches(session, session.sheetnames[sheet_idx])
+
+
+def write_statements(statements, output_file, buffer_size=OUTPUT_BUFFER_SIZE, collect=None, session=None):
+    """
+    Write statements to output_file through a buffered writer as they are produced.
+    Appends each statement to collect if given. Returns number of statements written.
+    The write time is added to the metrics of session, if it collects any.
+    """
+    timed = session is not None and session.metrics is not None
+    statement_count = 0
+    write_seconds = 0.0
+    with open(output_file, 'w', encoding='utf-8', buffering=buffer_size) as f:
+        for sql in statements:
+            if timed:
+                start = time.perf_counter()
+                f.write(sql)
+                f.write('\n')
+                write_seconds += time.perf_counter() - start
+            else:
+                f.write(sql)
+                f.write('\n')
+            if collect is not None:
+                collect.append(sql)
+            statement_count += 1
+        if timed:
+            # Closing flushes the last buffer
+            start = time.perf_counter()
+            f.flush()
+            write_seconds += time.perf_counter() - start
+    if timed:
+        metrics_add_time(session, 'output_write', write_seconds, statement_count)
+    return statement_count
+
+
+def decode_sql_literal(literal):
+    """
+    Convert a SQL literal produced by the column processors into a typed parameter:
+    NULL -> None, '...' / N'...' -> str (with '' unescaped), bare numbers -> int/float.
+    """
+    if isinstance(literal, tuple):
+        literal = literal[0]
+    if literal is None:
+        return ''
+    text = str(literal)
+    if text == 'NULL':
+        return None
+    if text.startswith("N'") and text.endswith("'") and len(text) >= 3:
+        text = text[1:]
+    if len(text) >= 2 and text[0] == "'" and text[-1] == "'":
+        return text[1:-1].replace("''", "'")
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def read_connect_string(filepath=CONNECT_STRING_FILE):
+    """Read the database connection string from connect_string.txt"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def connect_database(connect_string):
+    """
+    Open a DB-API connection: SQLite for 'sqlite:///path', otherwise SQL Server through pyodbc.
+    pyodbc is only imported when a SQL Server connection is requested.
+    """
+    if connect_string.startswith(SQLITE_URL_PREFIX):
+        return sqlite3.connect(connect_string[len(SQLITE_URL_PREFIX):])
+    import pyodbc
+    return pyodbc.connect(connect_string, autocommit=False)
+
+
+def _flush_table_batches(conn, table_batches, session=None):
+    """Insert all buffered rows with one executemany per table and commit them as one transaction"""
+    timed = session is not None and session.metrics is not None
+    start = time.perf_counter() if timed else None
+    cursor = conn.cursor()
+    if hasattr(cursor, 'fast_executemany'):
+        cursor.fast_executemany = True
+    try:
+        for (table_name, columns_str), params in table_batches.items():
+            if not params:
+                continue
+            placeholders = ", ".join('?' * len(params[0]))
+            cursor.executemany(f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})", params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    for params in table_batches.values():
+        params.clear()
+    if timed:
+        metrics_add_time(session, 'database_load', time.perf_counter() - start)
+
+
+def load_rows_to_database(rows, conn, batch_size=DB_LOAD_BATCH_SIZE, session=None):
+    """
+    Insert row records through parameterized executemany instead of SQL text.
+    Rows are buffered per table in first-seen table order; when a table reaches batch_size
+    all buffers are flushed and committed as one transaction.
+    The load time is added to the metrics of session, if it collects any.
+    Returns {table_name: row_count}.
+    """
+    table_batches = {}
+    row_counts = {}
+    for table_name, columns_str, values, _ in rows:
+        params = table_batches.setdefault((table_name, columns_str), [])
+        params.append(tuple(decode_sql_literal(val) for val in values))
+        row_counts[table_name] = row_counts.get(table_name, 0) + 1
+        if len(params) >= batch_size:
+            _flush_table_batches(conn, table_batches, session)
+    _flush_table_batches(conn, table_batches, session)
+    return row_counts
+
+
+def load_tables_in_sequence(
+    excel_file,
+    table_info_file,
+    connect_string,
+    workers=1,
+    batch_size=DB_LOAD_BATCH_SIZE,
+    cache_dir=None,
+    metrics_file='load_db.metrics.json',
+    session=None,
+    conn=None
+):
+    """
+    Load all rows (see iter_all_rows) straight into the database of connect_string
+    without rendering SQL text. Returns {table_name: row_count}.
+    With metrics enabled the report is written to metrics_file.
+    conn: open DB-API connection to load into instead of connecting to connect_string; it is left open.
+    """
+    if session is None:
+        session = new_session()
+    if session.metrics is not None:
+        # Fresh counters for this run
+        enable_metrics(session)
+    start = time.perf_counter()
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_database(connect_string)
+    try:
+        rows = iter_all_rows(excel_file, table_info_file, workers, cache_dir, session)
+        if session.metrics is not None:
+            rows = metrics_count_rows(session, rows)
+        row_counts = load_rows_to_database(rows, conn, batch_size, session)
+    finally:
+        if own_conn:
+            conn.close()
+        end_session(session)
+    
+    print(f"All rows loaded into database: {sum(row_counts.values())} rows in {len(row_counts)} tables")
+    if session.metrics is not None:
+        write_metrics_report(session, 
+            metrics_file, workbook=excel_file, workers=workers,
+            total_seconds=round(time.perf_counter() - start, 6), rows=sum(row_counts.values())
+        )
+    return row_counts
+
+
+def all_tables_in_sequence(
+    excel_file,
+    table_info_file,
+    output_file='insert_all.sql',
+    workers=1,
+    collect=True,
+    rows_per_insert=1,
+    go_separator=False,
+    cache_dir=None,
+    session=None
+):
+    """
+    Stream all INSERT statements (see iter_all_rows) into output_file.
+    rows_per_insert > 1 groups consecutive rows of a table into multi-row INSERTs.
+    cache_dir enables the per-sheet cache; the output is identical to a full run.
+    Returns the list of statements, or only their count when collect is False
+    so memory stays flat regardless of workbook size.
+    With metrics enabled a report is written next to output_file (see metrics_report_file).
+    session carries the conversion state; None converts with a new session from the module defaults.
+    """
+    if session is None:
+        session = new_session()
+    if session.metrics is not None:
+        # Fresh counters for this run
+        enable_metrics(session)
+    start = time.perf_counter()
+    all_insert_statements = [] if collect else None
+    try:
+        rows = iter_all_rows(excel_file, table_info_file, workers, cache_dir, session)
+        if session.metrics is not None:
+            rows = metrics_count_rows(session, rows)
+        statement_count = write_statements(
+            iter_insert_sql(rows, rows_per_insert, go_separator),
+            output_file,
+            collect=all_insert_statements,
+            session=session
+        )
+    finally:
+        end_session(session)
     
     print(f"All INSERT statements written to {output_file}")
-    return all_insert_statements
+    if session.metrics is not None:
+        write_metrics_report(session, 
+            metrics_report_file(output_file), workbook=excel_file, output=output_file, workers=workers,
+            total_seconds=round(time.perf_counter() - start, 6), statements=statement_count
+        )
+    return all_insert_statements if collect else statement_count
+
+
+def watched_file_signature(path):
+    """(mtime, size) of path, or None while it is missing or unreadable (e.g. during a save)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def wait_for_change(paths, signatures, poll_interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE_SECONDS):
+    """
+    Block until one of paths differs from signatures and every path has then kept the
+    same signature for debounce seconds, so a burst of saves triggers a single run.
+    Returns the new signatures.
+    """
+    pending = None
+    stable_since = None
+    while True:
+        current = [watched_file_signature(path) for path in paths]
+        if None in current or current == signatures:
+            pending = None
+        elif current != pending:
+            pending = current
+            stable_since = time.monotonic()
+        elif time.monotonic() - stable_since >= debounce:
+            return current
+        time.sleep(poll_interval)
+
+
+def watch_tables(
+    excel_file,
+    table_info_file,
+    output_file='insert_all.sql',
+    rows_per_insert=1,
+    go_separator=False,
+    cache_dir=None,
+    poll_interval=WATCH_POLL_INTERVAL,
+    debounce=WATCH_DEBOUNCE_SECONDS,
+    max_runs=None,
+    metrics_enabled=None
+):
+    """
+    Regenerate output_file whenever excel_file or table_info_file is saved, until interrupted
+    (or after max_runs runs). The rows of every sheet are kept in memory between runs and
+    reused while the sheet content is unchanged, so a save only reconverts the edited sheets.
+    table_info is parsed again only when its file changes. The output is written to a
+    temporary file and renamed, so a failed run (e.g. a half-saved workbook) keeps the
+    previous output. Returns the list of per-run reports.
+    metrics_enabled: see new_session.
+    """
+    paths = [excel_file, table_info_file]
+    signatures = [watched_file_signature(path) for path in paths]
+    table_info = None
+    table_info_signature = None
+    sheet_outputs = {}
+    reports = []
+    print(f"Watching {excel_file} and {table_info_file} (Ctrl+C to stop)")
+    try:
+        while max_runs is None or len(reports) < max_runs:
+            if None in signatures:
+                signatures = wait_for_change(paths, signatures, poll_interval, debounce)
+            start = time.perf_counter()
+            report = {'run': len(reports) + 1}
+            session = new_session(metrics_enabled)
+            session.previous_sheet_outputs = sheet_outputs
+            session.sheet_outputs = {}
+            temp_file = f'{output_file}.{os.getpid()}.tmp'
+            try:
+                if table_info is None or signatures[1] != table_info_signature:
+                    table_info = read_table_info(table_info_file)
+                    table_info_signature = signatures[1]
+                set_table_info(session, table_info)
+                report['statements'] = all_tables_in_sequence(
+                    excel_file, None, temp_file, collect=False, rows_per_insert=rows_per_insert,
+                    go_separator=go_separator, cache_dir=cache_dir, session=session
+                )
+                os.replace(temp_file, output_file)
+            except Exception as e:
+                report['error'] = f"{type(e).__name__}: {e}"
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            else:
+                # Keep only the sheets of this run, so memory follows the current workbook
+                reused = len(session.sheet_outputs.keys() & sheet_outputs.keys())
+                report['sheets_reused'] = reused
+                report['sheets_converted'] = len(session.sheet_outputs) - reused
+                sheet_outputs = session.sheet_outputs
+            report['seconds'] = round(time.perf_counter() - start, 3)
+            reports.append(report)
+            if 'error' in report:
+                print(f"[watch] run {report['run']} failed after {report['seconds']}s: {report['error']}")
+            else:
+                print(
+                    f"[watch] run {report['run']}: {report['statements']} statements written to {output_file} "
+                    f"in {report['seconds']}s ({report['sheets_converted']} sheets converted, "
+                    f"{report['sheets_reused']} reused)"
+                )
+            if max_runs is None or len(reports) < max_runs:
+                signatures = wait_for_change(paths, signatures, poll_interval, debounce)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    return reports
+
+
+def find_workbooks(source):
+    """Workbooks of a batch: *.xlsx files of a directory, or the files matching a glob, sorted"""
+    if os.path.isdir(source):
+        source = os.path.join(source, '*.xlsx')
+    return sorted(
+        path for path in glob.glob(source)
+        if os.path.isfile(path) and not os.path.basename(path).startswith('~$')
+    )
+
+
+def _init_book_worker(
+    shared_table_info,
+    parent_system_date_value,
+    metrics_enabled=False,
+    global_cache_max_entries=GLOBAL_CACHE_MAX_ENTRIES
+):
+    """
+    Batch pool initializer: keep the table_info parsed by the parent and the settings
+    every book session of this worker is built with.
+    With metrics enabled every book gets its own report next to its SQL file.
+    """
+    global _book_worker_settings
+    _book_worker_settings = (shared_table_info, parent_system_date_value, global_cache_max_entries, metrics_enabled)
+
+_book_worker_settings = None
+
+
+def _convert_book_task(book_task):
+    """
+    Batch pool task: convert one workbook in its own session (SYSTEM_ID, USER_NAME id kept
+    in memory since ids are allocated per book by the parent); returns its manifest entry.
+    """
+    excel_file, output_file, book_systemid_value, username_id, options = book_task
+    shared_table_info, book_system_date_value, book_cache_max_entries, metrics_enabled = _book_worker_settings
+    session = ConversionSession(
+        book_systemid_value, book_system_date_value, username_id_file=None,
+        global_cache_max_entries=book_cache_max_entries, metrics_enabled=metrics_enabled
+    )
+    session.username_id_counter = username_id
+    entry = {
+        'workbook': excel_file,
+        'output': output_file,
+        'systemid': book_systemid_value,
+        'username_id': username_id,
+    }
+    start = time.perf_counter()
+    try:
+        set_table_info(session, shared_table_info)
+        entry['statements'] = all_tables_in_sequence(
+            excel_file, None, output_file, collect=False, session=session, **options
+        )
+        entry['status'] = 'ok'
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['error'] = f"{type(e).__name__}: {e}"
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def batch_tables_in_sequence(
+    source,
+    table_info_file,
+    output_dir,
+    jobs=1,
+    manifest_file='manifest.json',
+    rows_per_insert=1,
+    go_separator=False,
+    cache_dir=None,
+    metrics_enabled=None
+):
+    """
+    Convert every workbook of a directory or glob into output_dir/<book>.sql.
+    table_info is parsed once and shared; books are converted by a pool of at most
+    jobs processes, each book with its own SYSTEM_ID, USER_NAME id and SEQ state.
+    Book i (0-based, in sorted file order) gets SYSTEM_ID systemid_value + i, zero-padded to
+    the width of systemid_value, so a batch of n books uses the range [systemid_value, +n).
+    Writes a manifest with per-book timings and SYSTEM_IDs and returns it.
+    metrics_enabled: see new_session.
+    """
+    if not systemid_value.isdigit():
+        raise ValueError(f"SYSTEM_ID must be a number to number the books of a batch, got {systemid_value!r}")
+    if metrics_enabled is None:
+        metrics_enabled = metrics_enabled_by_env()
+    workbooks = find_workbooks(source)
+    shared_table_info = read_table_info(table_info_file)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # One USER_NAME id per book (T_KIHON_PJ), reserved up front and allocated in book order
+    # so results do not depend on scheduling
+    first_username_id = reserve_username_ids(username_id_file, len(workbooks))[0] if workbooks else 1
+    options = {'rows_per_insert': rows_per_insert, 'go_separator': go_separator, 'cache_dir': cache_dir}
+    book_tasks = []
+    for book_idx, excel_file in enumerate(workbooks):
+        book_name = os.path.splitext(os.path.basename(excel_file))[0]
+        book_systemid_value = str(int(systemid_value) + book_idx).zfill(len(systemid_value))
+        username_id = max(first_username_id - book_idx, 1)
+        book_tasks.append((excel_file, os.path.join(output_dir, f'{book_name}.sql'), book_systemid_value, username_id, options))
+    
+    start = time.perf_counter()
+    books = []
+    if book_tasks:
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(jobs, len(book_tasks))),
+            initializer=_init_book_worker,
+            initargs=(shared_table_info, system_date_value, metrics_enabled, global_cache_max_entries)
+        ) as executor:
+            for entry in executor.map(_convert_book_task, book_tasks):
+                print(f"[{entry['status']}] {entry['workbook']} -> {entry['output']} ({entry['seconds']}s)")
+                books.append(entry)
+
+    manifest = {
+        'source': source,
+        'table_info': table_info_file,
+        'system_date': system_date_value,
+        'jobs': jobs,
+        'total_seconds': round(time.perf_counter() - start, 3),
+        'books': books,
+    }
+    with open(os.path.join(output_dir, manifest_file), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    
+    failed = sum(1 for entry in books if entry['status'] != 'ok')
+    print(f"Converted {len(books) - failed}/{len(books)} workbooks into {output_dir} in {manifest['total_seconds']}s")
+    return manifest
 
 
 def gen_row_single_sheet(
+    session,
     sheet_idx,
     sheet_seq,
     table_name,
@@ -1411,119 +3045,94 @@ def gen_row_single_sheet(
 ):
     """
     Generic function to process table data for a single sheet
-    Returns list of INSERT statements for main table and optional logic table
-    Uses global wb, sheetnames, and table_info instead of loading files
+    Yields INSERT row records for main table and optional logic table as they are created
+    Uses the session's wb, sheetnames, and table_info instead of loading files
     """
     if stop_values is None:
         stop_values = STOP_VALUES
-
-    global wb, sheetnames, table_info
+    
+    wb, sheetnames, table_info = session.wb, session.sheetnames, session.table_info
     columns_info = table_info.get(table_name, [])
     logic_columns_info = table_info.get(logic_table_name, []) if logic_table_name else []
 
     if sheet_idx >= len(sheetnames):
-        return []
+        return
 
     ws = wb[sheetnames[sheet_idx]]
-    insert_statements = []
     seq_counter = 1
 
     print(f"  Processing {table_name} data for sheet {sheet_idx}: {sheetnames[sheet_idx]}")
     
-    # Pre-calculate column names for better performance
-    column_names = [col_info.get('COLUMN_NAME', '') for col_info in columns_info]
-    columns_str = ", ".join(column_names)
+    # Use compiled column plan, falling back to per-column processor calls for unplanned tables
+    plan = session.table_plans.get(table_name)
+    if plan is None:
+        plan = compile_processor_plan(table_name, columns_info, column_value_processor or set_value_generic)
+    columns_str = plan['columns_str']
+    midashi_idx = plan['midashi_idx']
     
-    # Batch data collection
+    # Main rows are held until the section ends so logic rows keep being written first
     batch_data = []
     
-    # Scan from top to bottom for cell_b_value
     logic_processed = False  # Flag to track if logic has been processed for current main entry
     
-    for row_num in range(1, ws.max_row + 1):
-        cell_b = ws[f"B{row_num}"]
-        if cell_b.value == cell_b_value:
-            check_row = row_num + 1
-            logic_processed = False
-            while check_row <= ws.max_row:
-                should_stop = should_stop_row(ws, check_row, stop_values, cell_b_value)
-                if should_stop == 'stop':
-                    # Create INSERT statements from batch
-                    if batch_data:
-                        for values in batch_data:
-                            values_str = ", ".join(str(v) for v in values)
-                            sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({values_str});"
-                            insert_statements.append(sql)
-                    return insert_statements
-                elif should_stop == 'skip':
-                    check_row += 1
-                    continue
-                elif should_stop == 'continue':
-                    current_seq = seq_counter
-                    row_values = []
-                    aoji_values = []  # Collect aoji values from all columns
-                    
-                    for col_info in columns_info:
-                        if column_value_processor:
-                            val, aoji = column_value_processor(col_info, ws, check_row, sheet_seq, current_seq)
-                        else:
-                            val, aoji = set_value_generic(col_info, ws, check_row, sheet_seq, current_seq)
-                        row_values.append(val)
-                        aoji_values.append(aoji)
-                    
-                    # Check if there's an AOJI column and set its value based on collected aoji values
-                    final_aoji = any(aoji_values)  # True if any column has non-black font
-                    for i, col_name in enumerate(column_names):
-                        if col_name == 'AOJI':
-                            row_values[i] = "'1'" if final_aoji else "'0'"
-                            break
-                    
-                    # Handle MIDASHI special case
-                    if len(row_values) > 0:
-                        # Find MIDASHI column index
-                        midashi_idx = None
-                        special_cols_indices = []
-                        for i, col_name in enumerate(column_names):
-                            if col_name == 'MIDASHI':
-                                midashi_idx = i
-                            elif col_name in ['IN_GAMEN_ID', 'IN_GAMEN_NAME', 'IN_BUHIN_CD', 'IN_BUHIN_NAME', 'OUT_BUHIN_CD', 'OUT_BUHIN_NAME', 'BIKOU']:
-                                special_cols_indices.append(i)
-                        
-                        if midashi_idx is not None and row_values[midashi_idx] == "'True'":
-                            for idx in special_cols_indices:
-                                row_values[idx] = 'NULL'
-                    logic_processed = False
-                    batch_data.append(row_values)
-                    seq_counter += 1
-                    print(f"    Created {table_name.split('_')[-1]} with Sheet SEQ {sheet_seq} {seq_prefix} {current_seq} at row {check_row}")
-                    check_row += 1
-                    continue
-                elif should_stop == 'create_logic' and logic_table_name and logic_processor and not logic_processed:
-                    # Process logic table if provided and logic processor available
-                    # Only process logic once per main entry
-                    logic_inserts, logic_end_row = logic_processor(
-                        ws, check_row, sheet_seq, seq_counter - 1, logic_columns_info
-                    )
-                    insert_statements.extend(logic_inserts)
-                    logic_processed = True  # Mark logic as processed
-                    # Skip to end of logic section to avoid reprocessing
-                    check_row = logic_end_row if logic_end_row > check_row else check_row + 1
-                    continue
-                elif should_stop == 'create_logic' and logic_processed:
-                    # Logic already processed, just skip this row
-                    check_row += 1
-                    continue
-                else:
-                    check_row += 1
-    
-    # Create INSERT statements from remaining batch data
-    if batch_data:
-        for values in batch_data:
-            values_str = join_sql_values(values)
-            sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({values_str});"
-            insert_statements.append(sql)
+    # Jump straight to each occurrence of cell_b_value and scan only up to the end of its
+    # section (the row before the next stop marker), both taken from the section index
+    max_row = get_sheet_max_row(session, ws)
+    stop_rows = get_section_stop_rows(session, ws, stop_values, cell_b_value)
+    for row_num in get_section_rows(session, ws, cell_b_value):
+        check_row = row_num + 1
+        logic_processed = False
+        section_end = get_section_end(stop_rows, check_row, max_row)
+        while check_row <= max_row:
+            if check_row > section_end + 1:
+                # A logic section ran past the stop row: continue up to the next one
+                section_end = get_section_end(stop_rows, check_row, max_row)
+            if check_row > section_end:
+                should_stop = 'stop'
+            else:
+                should_stop = should_stop_row(session, ws, check_row, stop_values, cell_b_value)
+            if should_stop == 'stop':
+                # Create INSERT rows from batch
+                for values in batch_data:
+                    yield insert_row(table_name, columns_str, values, ", ".join(str(v) for v in values))
+                return
+            elif should_stop == 'skip':
+                check_row += 1
+                continue
+            elif should_stop == 'continue':
+                current_seq = seq_counter
+                row_values = evaluate_plan_row(session, plan, ws, check_row, sheet_seq, current_seq)
+                
+                # Handle MIDASHI special case
+                if midashi_idx is not None and row_values[midashi_idx] == "'True'":
+                    for idx in plan['midashi_null_indices']:
+                        row_values[idx] = 'NULL'
+                logic_processed = False
+                batch_data.append(row_values)
+                seq_counter += 1
+                print(f"    Created {table_name.split('_')[-1]} with Sheet SEQ {sheet_seq} {seq_prefix} {current_seq} at row {check_row}")
+                check_row += 1
+                continue
+            elif should_stop == 'create_logic' and logic_table_name and logic_processor and not logic_processed:
+                # Process logic table if provided and logic processor available
+                # Only process logic once per main entry
+                logic_end_row = yield from logic_processor(
+                    session, ws, check_row, sheet_seq, seq_counter - 1, logic_columns_info
+                )
+                logic_processed = True  # Mark logic as processed
+                # Skip to end of logic section to avoid reprocessing
+                check_row = logic_end_row if logic_end_row > check_row else check_row + 1
+                continue
+            elif should_stop == 'create_logic' and logic_processed:
+                # Logic already processed, just skip this row
+                check_row += 1
+                continue
+            else:
+                check_row += 1
     
-    return insert_statements
+    # Create INSERT rows from remaining batch data
+    for values in batch_data:
+        yield insert_row(table_name, columns_str, values)
 
 
 def _get_processor_function(processor_name):
@@ -1553,7 +3162,7 @@ def create_row_processor(processor_type):
     
     config = ROW_PROCESSOR_CONFIG[processor_type]
     
-    def row_processor(sheet_idx, sheet_seq, stop_values=None, cell_b_value=None):
+    def row_processor(session, sheet_idx, sheet_seq, stop_values=None, cell_b_value=None):
         """Generic row processor function"""
         actual_cell_b_value = cell_b_value or config['cell_b_value']
         column_processor = _get_processor_function(config['column_value_processor'])
@@ -1562,7 +3171,8 @@ def create_row_processor(processor_type):
         if 'logic_processor' in config:
             logic_processor = _get_processor_function(config['logic_processor'])
         
-        return gen_row_single_sheet(
+        rows = gen_row_single_sheet(
+            session,
             sheet_idx=sheet_idx,
             sheet_seq=sheet_seq,
             table_name=config['table_name'],
@@ -1573,6 +3183,10 @@ def create_row_processor(processor_type):
             seq_prefix=config['seq_prefix'],
             stop_values=stop_values
         )
+        if session.metrics is not None:
+            # Includes the time of nested logic processors, which are also timed on their own
+            return metrics_timed_iter(session, f'row_processor.{processor_type}', rows)
+        return rows
     
     return row_processor
 
@@ -1583,12 +3197,13 @@ def create_logic_processor(processor_type):
     
     config = LOGIC_PROCESSOR_CONFIG[processor_type]
     
-    def logic_processor(ws, start_row, sheet_seq, parent_seq_value, logic_columns_info, cell_b_value=None):
+    def logic_processor(session, ws, start_row, sheet_seq, parent_seq_value, logic_columns_info, cell_b_value=None):
         """Generic logic processor function"""
         actual_cell_b_value = cell_b_value or config['cell_b_value']
         column_processor = _get_processor_function(config['column_value_processor'])
         
-        return logic_data_generic(
+        rows = logic_data_generic(
+            session,
             ws=ws,
             start_row=start_row,
             sheet_seq=sheet_seq,
@@ -1599,6 +3214,9 @@ def create_logic_processor(processor_type):
             seq_counter_name=config['seq_counter_name'],
             cell_b_value=actual_cell_b_value
         )
+        if session.metrics is not None:
+            return metrics_timed_iter(session, f'logic_processor.{processor_type}', rows)
+        return rows
     
     return logic_processor
 
@@ -1622,6 +3240,7 @@ csv_logic = create_logic_processor('csv_logic')
 
 
 def logic_data_generic(
+    session,
     ws, 
     start_row, 
     sheet_seq, 
@@ -1635,86 +3254,131 @@ def logic_data_generic(
 ):
     """
     Generic function to process logic table data with performance optimizations
+    Yields INSERT row records as rows are read and returns the last row of the logic section
     """
     if stop_values is None:
         stop_values = STOP_VALUES
         
-    insert_statements = []
     seq_counter = 1
     last_processed_row = start_row
     
-    # Pre-calculate column names and table type for better performance
-    column_names = [col_info.get('COLUMN_NAME', '') for col_info in logic_columns_info]
-    columns_str = ", ".join(column_names)
+    # Use compiled column plan, falling back to per-column processor calls for unplanned tables
+    plan = session.table_plans.get(table_name)
+    if plan is None:
+        plan = compile_processor_plan(table_name, logic_columns_info, column_value_processor)
+    columns_str = plan['columns_str']
+    youken_no_idx = plan['youken_no_idx']
+    youken_logic_idx = plan['youken_logic_idx']
     logic_type = table_name.split('_')[-1]  # Extract LOGIC type name
     
-    # Pre-load cell values for the range
-    preload_sheet_cell_values(ws, start_row, min(start_row + 100, ws.max_row), ['B', 'C', 'D', 'E'])
-    
-    # Batch data collection
-    batch_data = []
-    
-    for check_row in range(start_row, ws.max_row + 1):
+    for check_row in range(start_row, get_sheet_max_row(session, ws) + 1):
         # Use appropriate stopping condition
-        should_stop = should_stop_logic_row(ws, check_row, stop_values, cell_b_value)
+        should_stop = should_stop_logic_row(session, ws, check_row, stop_values, cell_b_value)
         if should_stop == 'stop':
-            # Process remaining batch
-            if batch_data:
-                for values in batch_data:
-                    values_str = join_sql_values(values)
-                    sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({values_str});"
-                    insert_statements.append(sql)
-            return insert_statements, check_row
+            return check_row
         elif should_stop == 'skip':
             continue
         elif should_stop == 'continue':
             # Collect row data
-            row_values = []
-            aoji_values = []
-            for col_info in logic_columns_info:
-                val, aoji = column_value_processor(col_info, ws, check_row, sheet_seq, parent_seq_value, seq_counter)
-                row_values.append(val)
-                aoji_values.append(aoji)
-            
-            # Check if there's an AOJI column and set its value based on collected aoji values
-            final_aoji = any(aoji_values)  # True if any column has non-black font
-            for i, col_name in enumerate(column_names):
-                if col_name == 'AOJI':
-                    row_values[i] = "'1'" if final_aoji else "'0'"
-                    break
+            row_values = evaluate_plan_row(session, plan, ws, check_row, sheet_seq, parent_seq_value, seq_counter)
             
             # Handle YOUKEN_NO special case
-            if len(row_values) > 0:
-                youken_no_idx = None
-                youken_logic_idx = None
-                for i, col_name in enumerate(column_names):
-                    if col_name == 'YOUKEN_NO':
-                        youken_no_idx = i
-                    elif col_name == 'YOUKEN_LOGIC':
-                        youken_logic_idx = i
-                
-                if (youken_no_idx is not None and youken_logic_idx is not None and 
-                    row_values[youken_no_idx] not in [None, '', "''"]):
-                    row_values[youken_logic_idx] = "''"
+            if (youken_no_idx is not None and youken_logic_idx is not None and 
+                row_values[youken_no_idx] not in [None, '', "''"]):
+                row_values[youken_logic_idx] = "''"
             
-            batch_data.append(row_values)
+            yield insert_row(table_name, columns_str, row_values)
             print(f"      Created {logic_type} with Sheet SEQ {sheet_seq} Parent SEQ {parent_seq_value} {seq_counter_name} {seq_counter} at row {check_row}")
             seq_counter += 1
             last_processed_row = check_row
     
-    # Process remaining batch
-    if batch_data:
-        for values in batch_data:
-            values_str = join_sql_values(values)
-            sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({values_str});"
-            insert_statements.append(sql)
+    return last_processed_row
+
+
+def systemid_arg(text):
+    """argparse type of --systemid: digits only, kept as text so leading zeros stay"""
+    if not text.isdigit():
+        raise argparse.ArgumentTypeError(f"SYSTEM_ID must be a non-negative integer, got {text!r}")
+    return text
+
+
+def build_arg_parser(parser=None):
+    """Arguments of the generate command; adds them to parser (e.g. a CLI subcommand) if given"""
+    if parser is None:
+        parser = argparse.ArgumentParser(description='Generate INSERT statements from design workbook')
+    parser.add_argument('--excel', default='docX.xlsx', help='Design workbook to convert')
+    parser.add_argument('--table-info', default='table_info.txt', help='table_info JSON file (see genjson)')
+    parser.add_argument('--output', default='insert_all.sql', help='SQL file the INSERT statements are written to')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes converting sheets in parallel (not with --batch or --watch)')
+    parser.add_argument('--rows-per-insert', type=int, default=1,
+                        help=f'Rows per INSERT statement (1-{MULTI_ROW_INSERT_LIMIT}); > 1 writes multi-row INSERTs')
+    parser.add_argument('--go', action='store_true', help='Write a GO batch separator after every statement')
+    parser.add_argument('--load-db', action='store_true',
+                        help='Insert rows straight into the database of connect_string.txt instead of writing --output')
+    parser.add_argument('--db-batch-size', type=int, default=DB_LOAD_BATCH_SIZE, help='Rows per table per load transaction')
+    parser.add_argument('--cache-dir', help='Directory of the per-sheet cache; unchanged sheets are reused from it')
+    parser.add_argument('--systemid', type=systemid_arg,
+                        help='SYSTEM_ID (digits) to use instead of the current time (first SYSTEM_ID in batch mode)')
+    parser.add_argument('--system-date', help='System date (YYYY-MM-DD) to use instead of today')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and regenerate --output whenever the workbook or table_info is saved')
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE_SECONDS,
+                        help='Seconds the watched files must stay unchanged before a --watch run starts')
+    parser.add_argument('--batch', metavar='DIR_OR_GLOB',
+                        help='Convert every workbook of a directory or glob. Book i (0-based, sorted by path) gets '
+                             'SYSTEM_ID --systemid + i, zero-padded to its width: n books use --systemid .. '
+                             '--systemid + n - 1, which must not overlap the SYSTEM_IDs of another release')
+    parser.add_argument('--output-dir', default='output_sql', help='Output directory of --batch')
+    parser.add_argument('--jobs', type=int, default=1, help='Workbooks converted concurrently in --batch mode')
+    parser.add_argument('--metrics', action='store_true',
+                        help=f'Write a JSON metrics report next to the output (also enabled by {METRICS_ENV_VAR}=1)')
+    parser.add_argument('--global-cache-size', type=int, default=GLOBAL_CACHE_MAX_ENTRIES,
+                        help='Maximum entries of each workbook-wide cache (regex patterns, B2 values, font AOJI)')
+    return parser
+
+
+def main(args):
+    """Run the generate command with arguments parsed by build_arg_parser"""
+    global systemid_value, system_date_value
+    if args.workers > 1 and (args.batch or args.watch):
+        # --batch parallelizes over books (--jobs); --watch reuses sheets kept in this process
+        raise SystemExit("--workers cannot be combined with --batch (use --jobs) or --watch")
+    configure_global_caches(args.global_cache_size)
+    metrics_enabled = args.metrics or metrics_enabled_by_env()
+    if args.systemid:
+        systemid_value = args.systemid
+    if args.system_date:
+        system_date_value = args.system_date
     
-    return insert_statements, last_processed_row
-
-
-if __name__ == "__main__":
     print("Starting processing all tables in sequence...")
-    all_inserts = all_tables_in_sequence('docX.xlsx', 'table_info.txt', 'insert_all.sql')
-    print(f"Generated {len(all_inserts)} INSERT statements in total.")
+    if args.batch:
+        batch_tables_in_sequence(
+            args.batch, args.table_info, args.output_dir, jobs=args.jobs,
+            rows_per_insert=args.rows_per_insert, go_separator=args.go, cache_dir=args.cache_dir,
+            metrics_enabled=metrics_enabled
+        )
+    elif args.watch:
+        watch_tables(
+            args.excel, args.table_info, args.output, rows_per_insert=args.rows_per_insert,
+            go_separator=args.go, cache_dir=args.cache_dir, debounce=args.debounce,
+            metrics_enabled=metrics_enabled
+        )
+    elif args.load_db:
+        load_tables_in_sequence(
+            args.excel, args.table_info, read_connect_string(),
+            workers=args.workers, batch_size=args.db_batch_size, cache_dir=args.cache_dir,
+            session=new_session(metrics_enabled)
+        )
+    else:
+        statement_count = all_tables_in_sequence(
+            args.excel, args.table_info, args.output,
+            workers=args.workers, collect=False,
+            rows_per_insert=args.rows_per_insert, go_separator=args.go, cache_dir=args.cache_dir,
+            session=new_session(metrics_enabled)
+        )
+        print(f"Generated {statement_count} INSERT statements in total.")
 
 
+if __name__ == "__main__":
+    main(build_arg_parser().parse_args())
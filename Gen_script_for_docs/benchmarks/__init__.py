@@ -0,0 +1,7 @@
+"""
+Offline benchmarks for app.py.
+
+make_docx.py builds synthetic design books (docX.xlsx) and run_benchmark.py times
+all_tables_in_sequence against them, appending results to a JSON history.
+Run from Gen_script_for_docs, e.g. python -m benchmarks.run_benchmark --sheets 50
+"""
@@ -0,0 +1,71 @@
+"""
+Startup benchmark of the command line tools. Every case runs in a fresh interpreter
+(startup cost is what is measured), the fastest of --repeat runs is reported.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from benchmarks.make_docx import build_workbook  # noqa: E402
+
+CLI = os.path.join(APP_DIR, 'cli.py')
+DEFAULT_TABLE_INFO = os.path.join(APP_DIR, 'TABLE_INFO.txt')
+
+
+def time_command(command, cwd, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(repeat, table_info_file=DEFAULT_TABLE_INFO):
+    work_dir = tempfile.mkdtemp(prefix='bench_startup_')
+    try:
+        excel_file = os.path.join(work_dir, 'tiny.xlsx')
+        build_workbook(excel_file, sheets=1, items=5)
+        cases = [
+            ('python -c pass', [sys.executable, '-c', 'pass']),
+            ('cli.py --help', [sys.executable, CLI, '--help']),
+            ('import cli', [sys.executable, '-c', 'import cli']),
+            ('import genjson', [sys.executable, '-c', 'import genjson']),
+            ('import app', [sys.executable, '-c', 'import app']),
+            ('cli.py generate (1 sheet)', [
+                sys.executable, CLI, 'generate', '--excel', excel_file,
+                '--table-info', table_info_file, '--output', os.path.join(work_dir, 'out.sql'),
+            ]),
+        ]
+        env_dir = os.path.join(work_dir, 'run')
+        os.makedirs(env_dir)
+        results = {}
+        for label, command in cases:
+            # Local imports resolve from APP_DIR, output files stay in the temporary directory
+            with open(os.path.join(env_dir, 'usernameID.txt'), 'w') as f:
+                f.write('0099')
+            if command[1] == '-c':
+                command = [sys.executable, '-c', f'import sys; sys.path.insert(0, {APP_DIR!r}); ' + command[2]]
+            results[label] = time_command(command, env_dir, repeat)
+            print(f"{label:<28}{results[label] * 1000:>10.1f} ms")
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark startup time of the command line tools')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the fastest is reported')
+    parser.add_argument('--table-info', default=DEFAULT_TABLE_INFO, help='TABLE_INFO.txt-shaped schema file')
+    args = parser.parse_args()
+    run(args.repeat, args.table_info)
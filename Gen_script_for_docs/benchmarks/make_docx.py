@@ -0,0 +1,213 @@
+"""
+Generate synthetic design books (docX.xlsx) for benchmarking.
+Sheets follow the layouts app.py reads: B2 sheet type, header cells, section markers
+in column B, merged item rows, logic rows merged across B..BN and coloured fonts.
+"""
+import argparse
+import random
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import MergedCell
+from openpyxl.styles import Font
+
+# Fonts used for item cells: mostly default, some black/blue/red (AOJI)
+COLOURED_FONTS = [Font(color='FF000000'), Font(color='FF0000FF'), Font(color='FFFF0000')]
+
+ITEM_VALUES = [
+    'ラベル', 'タイトルラベル', 'テキストボックス', 'コンボボックス', 'ボタン', 'チェックボックス',
+    '処理', 'レイアウト', '－', '得意先コード', '得意先名', 'YYYY/MM/DD', 'x,,y', 12, 0, None
+]
+
+# Sheet types in the order sheets are cycled through
+SHEET_TYPES = ['画面', '帳票', 'CSV', 'IPO図', 'ﾒﾆｭｰ']
+
+
+def _merge(ws, row, min_col, max_col):
+    ws.merge_cells(start_row=row, start_column=min_col, end_row=row, end_column=max_col)
+
+
+def _put(ws, rnd, row, col, value, colour_rate):
+    """Write value (and sometimes a coloured font) unless the cell is covered by a merged range"""
+    cell = ws.cell(row=row, column=col)
+    if isinstance(cell, MergedCell):
+        return
+    cell.value = value
+    if rnd.random() < colour_rate:
+        cell.font = rnd.choice(COLOURED_FONTS)
+
+
+def _header(ws, rnd, sheet_type):
+    ws['B2'] = f'項目定義書_{sheet_type}'
+    ws['S3'] = 'PJ%04d' % rnd.randint(1, 9999)
+    ws['W3'] = '設計担当'
+    ws['B7'] = 'G%04d' % rnd.randint(1, 9999)
+    ws['F7'] = '画面名%d' % rnd.randint(1, 999)
+    ws['F9'] = '1.0'
+
+
+def _reference_section(ws, rnd, row, marker, colour_rate):
+    """【抽出データ定義】-style block read through REF patterns (G/I/BJ columns)"""
+    ws.cell(row=row, column=2, value=marker)
+    for i in range(6):
+        _put(ws, rnd, row + 1 + i * 2, 7, rnd.choice(['カンマ', 'タブ', '得意先マスタ', 5]), colour_rate)
+        _put(ws, rnd, row + 1 + i * 2, 9, rnd.choice(['カンマ', 'タブ', 'あり']), colour_rate)
+        _put(ws, rnd, row + 1 + i * 2, 62, 'UTF-8', colour_rate)
+    return row + 14
+
+
+def _item_section(ws, rnd, row, marker, items, columns, max_logic_rows, colour_rate):
+    """Item rows (B:C merged number) each followed by 0..max_logic_rows logic rows merged B..BN"""
+    ws.cell(row=row, column=2, value=marker)
+    row += 1
+    _merge(ws, row, 2, 3)
+    ws.cell(row=row, column=2, value='画面')
+    row += 1
+    for i in range(items):
+        _merge(ws, row, 2, 3)
+        _put(ws, rnd, row, 2, i + 1, colour_rate)
+        for col in columns:
+            _put(ws, rnd, row, col, rnd.choice(ITEM_VALUES), colour_rate)
+        row += 1
+        for j in range(rnd.randint(0, max_logic_rows)):
+            _merge(ws, row, 2, 66)
+            if rnd.random() < 0.5:
+                _put(ws, rnd, row, 2, '(要件№%d-%d)要件ﾛｼﾞｯｸ：入力チェック %d' % (i + 1, j + 1, j), colour_rate)
+            else:
+                _put(ws, rnd, row, 2, '・%d行目の処理内容' % (j + 1), colour_rate)
+            row += 1
+    return row
+
+
+def _definition_section(ws, rnd, row, marker, header_value, min_col, max_col, items, colour_rate):
+    """Message/tab/position blocks: B:D merged code and a merged text range"""
+    ws.cell(row=row, column=2, value=marker)
+    row += 1
+    _merge(ws, row, 2, 4)
+    ws.cell(row=row, column=2, value=header_value)
+    _merge(ws, row, min_col, max_col)
+    row += 1
+    for i in range(items):
+        _merge(ws, row, 2, 4)
+        _merge(ws, row, min_col, max_col)
+        _put(ws, rnd, row, 2, 'M%04d' % (i + 1), colour_rate)
+        _put(ws, rnd, row, min_col, 'メッセージ本文 %d' % (i + 1), colour_rate)
+        for col in (53, 58, 64):
+            if col > max_col:
+                _put(ws, rnd, row, col, '区分%d' % col, colour_rate)
+        row += 1
+    return row + 1
+
+
+def _list_section(ws, rnd, row, marker, min_col, max_col, items, colour_rate):
+    """List/menu blocks: B:C merged number and a merged name range"""
+    ws.cell(row=row, column=2, value=marker)
+    row += 1
+    _merge(ws, row, 2, 3)
+    ws.cell(row=row, column=2, value='番号')
+    _merge(ws, row, min_col, max_col)
+    row += 1
+    for i in range(items):
+        _merge(ws, row, 2, 3)
+        _merge(ws, row, min_col, max_col)
+        _put(ws, rnd, row, 2, i + 1, colour_rate)
+        for col in (4, 15, 16, 18, 22, 29, 30, 32, 40, 43, 49, 54, 58):
+            if col != min_col and min_col < col <= max_col:
+                continue
+            _put(ws, rnd, row, col, '値%d' % col, colour_rate)
+        row += 1
+    return row + 1
+
+
+def _gamen_sheet(ws, rnd, items, max_logic_rows, colour_rate):
+    _header(ws, rnd, '画面')
+    row = _reference_section(ws, rnd, 12, '【抽出データ定義】', colour_rate)
+    row = _item_section(ws, rnd, row, '【項目定義】', items,
+                        [4, 16, 21, 23, 26, 30, 32, 34, 36, 38, 46, 53, 55, 68], max_logic_rows, colour_rate)
+    row = _item_section(ws, rnd, row, '【ファンクション定義】', items // 2 + 1,
+                        [4, 16, 18, 20, 22, 24, 26, 40, 53, 55, 68], max_logic_rows, colour_rate)
+    row = _definition_section(ws, rnd, row, '【メッセージ定義】', 'ﾒｯｾｰｼﾞ', 5, 52, items // 2 + 1, colour_rate)
+    row = _definition_section(ws, rnd, row, '【タブインデックス定義】', '定義場所', 5, 66, items // 3 + 1, colour_rate)
+    row = _list_section(ws, rnd, row, '【一覧定義】', 4, 15, items // 3 + 1, colour_rate)
+    row = _definition_section(ws, rnd, row, '【表示位置定義】', '定義区分', 5, 63, items // 3 + 1, colour_rate)
+    ws.cell(row=row, column=2, value='【備考】')
+
+
+def _report_sheet(ws, rnd, items, max_logic_rows, colour_rate):
+    _header(ws, rnd, '帳票')
+    row = _reference_section(ws, rnd, 12, '【帳票データ】', colour_rate)
+    row = _item_section(ws, rnd, row, '【項目定義】', items,
+                        [4, 16, 21, 24, 26, 28, 30, 32, 34, 36, 38, 45, 47, 57], max_logic_rows, colour_rate)
+    ws.cell(row=row, column=2, value='【備考】')
+
+
+def _csv_sheet(ws, rnd, items, max_logic_rows, colour_rate):
+    _header(ws, rnd, 'CSV')
+    row = _reference_section(ws, rnd, 12, '【CSVデータ】', colour_rate)
+    row = _item_section(ws, rnd, row, '【項目定義】', items, [4, 16, 24, 26, 47], max_logic_rows, colour_rate)
+    ws.cell(row=row, column=2, value='【運用上の注意点】')
+
+
+def _ipo_sheet(ws, rnd, items, max_logic_rows, colour_rate):
+    _header(ws, rnd, 'IPO図')
+    row = 12
+    ws.cell(row=row, column=2, value='入力画面')
+    row += 1
+    for _ in range(items):
+        # Heading rows are merged across the whole width (MIDASHI)
+        if rnd.random() < 0.2:
+            _merge(ws, row, 2, 66)
+        else:
+            _merge(ws, row, 2, 11)
+        for col in (2, 12, 22, 57):
+            _put(ws, rnd, row, col, 'IPO項目%d' % col, colour_rate)
+        row += 1
+    ws.cell(row=row, column=2, value='【備考】')
+
+
+def _menu_sheet(ws, rnd, items, max_logic_rows, colour_rate):
+    _header(ws, rnd, 'ﾒﾆｭｰ')
+    row = _list_section(ws, rnd, 12, '【メニュー定義】', 4, 14, items, colour_rate)
+    ws.cell(row=row, column=2, value='【備考】')
+
+
+SHEET_BUILDERS = {
+    '画面': _gamen_sheet,
+    '帳票': _report_sheet,
+    'CSV': _csv_sheet,
+    'IPO図': _ipo_sheet,
+    'ﾒﾆｭｰ': _menu_sheet,
+}
+
+
+def build_workbook(path, sheets=10, items=20, max_logic_rows=3, colour_rate=0.1, seed=1, sheet_types=None):
+    """
+    Write a synthetic design book to path with the given number of sheets,
+    cycling through sheet_types (default: all 5 types). Returns number of sheets written.
+    """
+    rnd = random.Random(seed)
+    sheet_types = sheet_types or SHEET_TYPES
+    wb = Workbook()
+    wb.active.title = 'はじめに'
+    for i in range(sheets):
+        sheet_type = sheet_types[i % len(sheet_types)]
+        ws = wb.create_sheet('%03d_%s' % (i + 1, sheet_type))
+        SHEET_BUILDERS[sheet_type](ws, rnd, items, max_logic_rows, colour_rate)
+    wb.create_sheet('改訂履歴')['B2'] = '改訂履歴'
+    wb.save(path)
+    return sheets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic docX.xlsx for benchmarking')
+    parser.add_argument('output', nargs='?', default='docX_bench.xlsx', help='Output workbook path')
+    parser.add_argument('--sheets', type=int, default=10, help='Number of design sheets')
+    parser.add_argument('--items', type=int, default=20, help='Item rows per main section')
+    parser.add_argument('--max-logic-rows', type=int, default=3, help='Maximum logic rows after each item row')
+    parser.add_argument('--colour-rate', type=float, default=0.1, help='Share of cells written with a coloured font')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    parser.add_argument('--types', default=','.join(SHEET_TYPES), help='Comma separated sheet types to cycle through')
+    args = parser.parse_args()
+
+    build_workbook(args.output, args.sheets, args.items, args.max_logic_rows, args.colour_rate, args.seed,
+                   args.types.split(','))
+    print(f"Wrote {args.sheets} sheets to {args.output}")
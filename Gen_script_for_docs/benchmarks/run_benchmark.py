@@ -0,0 +1,187 @@
+"""
+Time all_tables_in_sequence on a design book and append the result to a JSON history.
+Records the whole conversion, each stage (load, table_info, SEQ pre-pass, snapshots,
+convert, write), rows per second and peak RSS, and compares with the previous run
+of the same workbook.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import app  # noqa: E402
+from benchmarks.make_docx import build_workbook  # noqa: E402
+
+DEFAULT_TABLE_INFO = os.path.join(APP_DIR, 'TABLE_INFO.txt')
+DEFAULT_HISTORY = os.path.join(BENCHMARK_DIR, 'history.json')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if it cannot be measured"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux and bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memory_info = psutil.Process().memory_info()
+        return round(getattr(memory_info, 'peak_wset', memory_info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def time_whole(excel_file, table_info_file, output_file, workers):
+    """Time one complete all_tables_in_sequence run; returns (seconds, statement_count)"""
+    start = time.perf_counter()
+    statement_count = app.all_tables_in_sequence(excel_file, table_info_file, output_file, workers=workers, collect=False)
+    return time.perf_counter() - start, statement_count
+
+
+def time_stages(excel_file, table_info_file, output_file):
+    """Run the serial pipeline step by step and time each stage; returns ({stage: seconds}, row_count, sheet_count)"""
+    stages = {}
+    session = app.new_session()
+
+    start = time.perf_counter()
+    app.initialize_workbook(session, excel_file)
+    stages['load_workbook'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app.initialize_table_info(session, table_info_file)
+    stages['table_info'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sheet_tasks = app.assign_sheet_seqs(session)
+    stages['assign_seqs'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for sheet_idx, _ in sheet_tasks:
+        ws = session.wb[session.sheetnames[sheet_idx]]
+        app.get_sheet_snapshot(session, ws)
+        app.get_merged_range_index(session, ws)
+        app.get_section_index(session, ws)
+    stages['snapshot'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = []
+    if sheet_tasks:
+        rows.extend(app.generate_insert_rows_from_excel(session, sheet_tasks[0][0], 'T_KIHON_PJ'))
+    for sheet_idx, seq_value in sheet_tasks:
+        rows.extend(app.iter_sheet_rows(session, sheet_idx, seq_value))
+    stages['convert'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app.write_statements(app.iter_insert_sql(rows), output_file)
+    stages['write'] = time.perf_counter() - start
+
+    app.clear_performance_caches(session)
+    return stages, len(rows), len(sheet_tasks)
+
+
+def load_history(history_file):
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(history_file, history):
+    with open(history_file, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def run_benchmark(excel_file, table_info_file=DEFAULT_TABLE_INFO, workers=1, label='', stages=True):
+    """
+    Benchmark one workbook. Runs inside a temporary directory so usernameID.txt and
+    the SQL output of the run never touch the working tree. Returns the result record.
+    """
+    excel_file = os.path.abspath(excel_file)
+    table_info_file = os.path.abspath(table_info_file)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, 'w', encoding='utf-8') as devnull:
+        os.chdir(work_dir)
+        try:
+            output_file = os.path.join(work_dir, 'insert_all.sql')
+            with contextlib.redirect_stdout(devnull):
+                total_seconds, statement_count = time_whole(excel_file, table_info_file, output_file, workers)
+                rss = peak_rss_mb()
+                stage_seconds, row_count, sheet_count = (
+                    time_stages(excel_file, table_info_file, output_file) if stages else ({}, statement_count, None)
+                )
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'label': label,
+        'workbook': os.path.basename(excel_file),
+        'workbook_bytes': os.path.getsize(excel_file),
+        'sheets': sheet_count,
+        'rows': row_count,
+        'workers': workers,
+        'total_seconds': round(total_seconds, 3),
+        'rows_per_second': round(row_count / total_seconds, 1) if total_seconds else None,
+        'stages': {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+        'peak_rss_mb': rss,
+        'python': platform.python_version(),
+    }
+
+
+def _previous_result(history, result):
+    """Last recorded run of the same workbook and worker count"""
+    for record in reversed(history):
+        if (record.get('workbook'), record.get('workbook_bytes'), record.get('workers')) == (
+                result['workbook'], result['workbook_bytes'], result['workers']):
+            return record
+    return None
+
+
+def print_result(result, previous=None):
+    print(f"{result['workbook']}: {result['rows']} rows in {result['total_seconds']}s "
+          f"({result['rows_per_second']} rows/s), peak RSS {result['peak_rss_mb']} MB")
+    for stage, seconds in result['stages'].items():
+        print(f"  {stage:<14}{seconds:>9.3f}s")
+    if previous:
+        change = (result['total_seconds'] - previous['total_seconds']) / previous['total_seconds'] * 100
+        print(f"  vs {previous['timestamp']} {previous['label'] or ''}: "
+              f"{previous['total_seconds']}s -> {result['total_seconds']}s ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark all_tables_in_sequence on a design book')
+    parser.add_argument('workbook', nargs='?', help='Workbook to convert; omitted -> generate one with --sheets/--items')
+    parser.add_argument('--table-info', default=DEFAULT_TABLE_INFO, help='TABLE_INFO.txt-shaped schema file')
+    parser.add_argument('--sheets', type=int, default=50, help='Sheets of the generated workbook')
+    parser.add_argument('--items', type=int, default=40, help='Item rows per section of the generated workbook')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed of the generated workbook')
+    parser.add_argument('--workers', type=int, default=1, help='Workers passed to all_tables_in_sequence')
+    parser.add_argument('--label', default='', help='Free text stored with the result, e.g. a commit id')
+    parser.add_argument('--no-stages', action='store_true', help='Only time the whole conversion')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file results are appended to')
+    args = parser.parse_args()
+
+    if args.workbook:
+        result = run_benchmark(args.workbook, args.table_info, args.workers, args.label, not args.no_stages)
+    else:
+        with tempfile.TemporaryDirectory() as generated_dir:
+            workbook = os.path.join(generated_dir, f'docX_bench_s{args.sheets}_i{args.items}_r{args.seed}.xlsx')
+            build_workbook(workbook, args.sheets, args.items, seed=args.seed)
+            result = run_benchmark(workbook, args.table_info, args.workers, args.label, not args.no_stages)
+
+    history = load_history(args.history)
+    print_result(result, _previous_result(history, result))
+    history.append(result)
+    save_history(args.history, history)
@@ -0,0 +1,65 @@
+"""
+Command line entry point of the document tools:
+
+    python cli.py generate [--excel docX.xlsx --table-info table_info.txt --output insert_all.sql ...]
+    python cli.py genjson  [--input input.txt --mapping mapping.xlsx --output table_info.txt]
+    python cli.py export   [--output-dir output_scripts_update --connect-string-file connect_string.txt]
+
+Only the module of the chosen command is imported, so `--help` and the light commands do not
+pay for openpyxl/pandas/pyodbc.
+"""
+import argparse
+import importlib
+import importlib.util
+import os
+import sys
+
+CLI_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_SCRIPT = os.path.join(
+    os.path.dirname(CLI_DIR), 'Gen_script_master_shougunR', 'batch_python', 'export_update_script.py'
+)
+
+
+def _import_local(name):
+    if CLI_DIR not in sys.path:
+        sys.path.insert(0, CLI_DIR)
+    return importlib.import_module(name)
+
+
+def _import_export_script():
+    spec = importlib.util.spec_from_file_location('export_update_script', EXPORT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# command -> (module loader, help)
+COMMANDS = {
+    'generate': (lambda: _import_local('app'), 'Generate INSERT statements from the design workbook'),
+    'genjson': (lambda: _import_local('genjson'), 'Build table_info.txt from input.txt and mapping.xlsx'),
+    'export': (_import_export_script, 'Export UPDATE scripts for the M_ tables of a database'),
+}
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='Document generation tools')
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+    for name, (_, help_text) in COMMANDS.items():
+        # The real options are added once the command's module is imported
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    args, rest = build_arg_parser().parse_known_args(argv)
+    load_module, help_text = COMMANDS[args.command]
+    module = load_module()
+    command_parser = module.build_arg_parser(
+        argparse.ArgumentParser(prog=f'cli.py {args.command}', description=help_text)
+    )
+    return module.main(command_parser.parse_args(rest))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
+import argparse
 import re
-import pandas as pd
 import json
 
 def try_readlines(filename, encodings):
@@ -12,6 +12,9 @@ def try_readlines(filename, encodings):
     raise UnicodeDecodeError(f"Cannot decode {filename} with tried encodings: {encodings}")
 
 def read_excel_to_json(excel_file, output_file):
+    # pandas is only needed here, so importing genjson stays cheap
+    import pandas as pd
+
     # Read the Excel file
     df = pd.read_excel(excel_file)
 
@@ -70,29 +73,49 @@ def read_excel_to_json(excel_file, output_file):
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(json_str)
 
-# Existing code to read input.txt and extract unique table names
-encodings = ['utf-8', 'utf-8-sig', 'cp1252', 'latin-1']
-lines = try_readlines('input.txt', encodings)
+def extract_table_names(input_file):
+    """Unique table names of the INSERT statements in input_file, in order of appearance"""
+    encodings = ['utf-8', 'utf-8-sig', 'cp1252', 'latin-1']
+    lines = try_readlines(input_file, encodings)
+
+    table_names = []
+
+    # Chỉ focus vào các câu lệnh INSERT
+    pattern = re.compile(r'^\s*INSERT INTO\s+([A-Z0-9_]+)\s*\(', re.IGNORECASE)
 
-table_names = []
+    for line in lines:
+        match = pattern.search(line)
+        if match:
+            table_names.append(match.group(1))
 
-# Chỉ focus vào các câu lệnh INSERT
-pattern = re.compile(r'^\s*INSERT INTO\s+([A-Z0-9_]+)\s*\(', re.IGNORECASE)
+    # Loại bỏ trùng lặp, giữ nguyên thứ tự xuất hiện
+    return list(dict.fromkeys(table_names))
+
+def generate_table_info(input_file='input.txt', mapping_file='mapping.xlsx', output_file='table_info.txt'):
+    # Existing code to read input.txt and extract unique table names
+    unique_table_names = extract_table_names(input_file)
+
+    # Ghi danh sách bảng ra file output.txt, mỗi bảng trên một dòng
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for name in unique_table_names:
+            f.write(name + '\n')
 
-for line in lines:
-    match = pattern.search(line)
-    if match:
-        table_names.append(match.group(1))
+    print(unique_table_names)
 
-# Loại bỏ trùng lặp, giữ nguyên thứ tự xuất hiện
-unique_table_names = list(dict.fromkeys(table_names))
+    # New code to read mapping.xlsx and write JSON to output.txt
+    read_excel_to_json(mapping_file, output_file)
 
-# Ghi danh sách bảng ra file output.txt, mỗi bảng trên một dòng
-with open('table_info.txt', 'w', encoding='utf-8') as f:
-    for name in unique_table_names:
-        f.write(name + '\n')
+def build_arg_parser(parser=None):
+    """Arguments of the genjson command; adds them to parser (e.g. a CLI subcommand) if given"""
+    if parser is None:
+        parser = argparse.ArgumentParser(description='Build table_info.txt from input.txt and mapping.xlsx')
+    parser.add_argument('--input', default='input.txt', help='SQL file whose INSERT statements name the tables')
+    parser.add_argument('--mapping', default='mapping.xlsx', help='Column mapping workbook')
+    parser.add_argument('--output', default='table_info.txt', help='table_info JSON file to write')
+    return parser
 
-print(unique_table_names)
+def main(args):
+    generate_table_info(args.input, args.mapping, args.output)
 
-# New code to read mapping.xlsx and write JSON to output.txt
-read_excel_to_json('mapping.xlsx', 'table_info.txt')
+if __name__ == "__main__":
+    main(build_arg_parser().parse_args())
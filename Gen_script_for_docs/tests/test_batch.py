@@ -0,0 +1,45 @@
+"""Batch mode numbers the books' SYSTEM_IDs from --systemid"""
+import os
+
+import pytest
+
+import app
+from benchmarks.make_docx import build_workbook
+
+TABLE_INFO_FILE = os.path.join(os.path.dirname(app.__file__), 'TABLE_INFO.txt')
+
+
+@pytest.fixture
+def batch_settings(tmp_path, monkeypatch):
+    username_id_file = str(tmp_path / 'usernameID.txt')
+    with open(username_id_file, 'w', encoding='utf-8') as f:
+        f.write('0099')
+    monkeypatch.setattr(app, 'username_id_file', username_id_file)
+    monkeypatch.setattr(app, 'system_date_value', '2026-01-01')
+
+
+def test_books_get_consecutive_systemids(tmp_path, monkeypatch, batch_settings):
+    source = tmp_path / 'books'
+    source.mkdir()
+    for seed, name in enumerate(['b.xlsx', 'a.xlsx']):
+        build_workbook(str(source / name), sheets=2, items=3, seed=seed)
+    monkeypatch.setattr(app, 'systemid_value', '000998')
+
+    manifest = app.batch_tables_in_sequence(str(source), TABLE_INFO_FILE, str(tmp_path / 'out'), jobs=2)
+
+    assert [(os.path.basename(book['workbook']), book['systemid'], book['status']) for book in manifest['books']] == [
+        ('a.xlsx', '000998', 'ok'), ('b.xlsx', '000999', 'ok')
+    ]
+    with open(tmp_path / 'out' / 'b.sql', encoding='utf-8') as f:
+        assert "VALUES ('000999', " in f.readline()
+
+
+def test_non_numeric_systemid_is_rejected(tmp_path, monkeypatch, batch_settings):
+    monkeypatch.setattr(app, 'systemid_value', 'R2026')
+    with pytest.raises(ValueError, match='SYSTEM_ID must be a number'):
+        app.batch_tables_in_sequence(str(tmp_path), TABLE_INFO_FILE, str(tmp_path / 'out'))
+    assert not os.path.exists(tmp_path / 'out')
+
+    with pytest.raises(SystemExit):
+        app.build_arg_parser().parse_args(['--batch', str(tmp_path), '--systemid', 'R2026'])
+    assert app.build_arg_parser().parse_args(['--systemid', '000120']).systemid == '000120'
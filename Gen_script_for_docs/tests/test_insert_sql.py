@@ -0,0 +1,88 @@
+"""Grouping of row records into single-row and multi-row INSERT statements"""
+import os
+import re
+
+import pytest
+
+import app
+from benchmarks.make_docx import build_workbook
+
+TABLE_INFO_FILE = os.path.join(os.path.dirname(app.__file__), 'TABLE_INFO.txt')
+
+
+def make_rows(table_name, count, columns_str='ID, NAME'):
+    return [app.insert_row(table_name, columns_str, [str(i), f"N'{table_name}{i}'"]) for i in range(count)]
+
+
+def values_per_statement(statements):
+    return [sql.count('\n(') if sql.endswith(');') and '\n(' in sql else 1 for sql in statements if sql != 'GO']
+
+
+def test_blocks_are_split_at_the_values_limit():
+    rows = make_rows('M_A', 2500)
+    statements = list(app.iter_insert_sql(rows, app.MULTI_ROW_INSERT_LIMIT))
+    assert app.MULTI_ROW_INSERT_LIMIT == 1000
+    assert values_per_statement(statements) == [1000, 1000, 500]
+    assert statements[0].startswith("INSERT INTO M_A (ID, NAME) VALUES\n(0, N'M_A0'),\n(1, N'M_A1'),\n")
+    assert statements[2].endswith("(2499, N'M_A2499');")
+
+
+@pytest.mark.parametrize('rows_per_insert', [0, app.MULTI_ROW_INSERT_LIMIT + 1])
+def test_rows_per_insert_outside_the_limit_is_rejected(rows_per_insert):
+    with pytest.raises(ValueError):
+        list(app.iter_insert_sql(make_rows('M_A', 3), rows_per_insert))
+
+
+def test_blocks_break_on_table_or_column_change():
+    rows = make_rows('M_A', 3) + make_rows('M_B', 2) + make_rows('M_B', 2, 'ID, NAME2') + make_rows('M_A', 1)
+    statements = list(app.iter_insert_sql(rows, 2))
+    assert [re.match(r'INSERT INTO (\w+) \(([^)]*)\)', sql).groups() for sql in statements] == [
+        ('M_A', 'ID, NAME'), ('M_A', 'ID, NAME'), ('M_B', 'ID, NAME'), ('M_B', 'ID, NAME2'), ('M_A', 'ID, NAME')
+    ]
+    assert values_per_statement(statements) == [2, 1, 2, 2, 1]
+
+
+@pytest.mark.parametrize('rows_per_insert', [1, 2])
+def test_go_follows_every_statement(rows_per_insert):
+    rows = make_rows('M_A', 3) + make_rows('M_B', 1)
+    statements = list(app.iter_insert_sql(rows, rows_per_insert, go_separator=True))
+    assert statements[1::2] == ['GO'] * (len(statements) // 2)
+    assert 'GO' not in statements[0::2]
+    assert statements[-1] == 'GO'
+    assert statements[0::2] == list(app.iter_insert_sql(rows, rows_per_insert))
+
+
+def test_single_row_mode_matches_format_insert_row():
+    rows = make_rows('M_A', 3) + make_rows('M_B', 2)
+    assert list(app.iter_insert_sql(rows)) == [app.format_insert_row(row) for row in rows]
+    assert list(app.iter_insert_sql(rows, 1)) == [
+        "INSERT INTO M_A (ID, NAME) VALUES (0, N'M_A0');",
+        "INSERT INTO M_A (ID, NAME) VALUES (1, N'M_A1');",
+        "INSERT INTO M_A (ID, NAME) VALUES (2, N'M_A2');",
+        "INSERT INTO M_B (ID, NAME) VALUES (0, N'M_B0');",
+        "INSERT INTO M_B (ID, NAME) VALUES (1, N'M_B1');",
+    ]
+
+
+def test_workbook_rows_survive_grouping(tmp_path):
+    excel_file = str(tmp_path / 'docX.xlsx')
+    build_workbook(excel_file, sheets=4, items=10)
+
+    def generate(**options):
+        return app.all_tables_in_sequence(
+            excel_file, TABLE_INFO_FILE, str(tmp_path / 'out.sql'),
+            session=app.ConversionSession('120000', '2026-01-01'), **options
+        )
+
+    single = generate()
+    assert generate(rows_per_insert=1) == single
+    grouped = generate(rows_per_insert=5, go_separator=True)
+    # Same rows in the same order, only regrouped
+    single_rows = [re.match(r'INSERT INTO (\w+) .* VALUES \((.*)\);$', sql, re.S).groups() for sql in single]
+    grouped_rows = []
+    for sql in grouped[0::2]:
+        table_name, values_sql = re.match(r'INSERT INTO (\w+) \(.*?\) VALUES\n(.*);$', sql, re.S).groups()
+        grouped_rows.extend((table_name, values[1:-1]) for values in values_sql.split(',\n'))
+    assert grouped_rows == single_rows
+    assert grouped[1::2] == ['GO'] * len(grouped[0::2])
+    assert len(grouped[0::2]) < len(single)
@@ -0,0 +1,63 @@
+"""load_tables_in_sequence must load the same rows as the INSERT script, with typed values"""
+import os
+import re
+import sqlite3
+
+import pytest
+
+import app
+from benchmarks.make_docx import build_workbook
+
+TABLE_INFO_FILE = os.path.join(os.path.dirname(app.__file__), 'TABLE_INFO.txt')
+
+
+@pytest.fixture
+def excel_file(tmp_path):
+    path = str(tmp_path / 'docX.xlsx')
+    build_workbook(path, sheets=5, items=10)
+    return path
+
+
+# SQLite affinity of the SQL Server types in table_info; other types keep TEXT
+SQLITE_TYPES = {'int': 'INTEGER', 'bigint': 'INTEGER', 'smallint': 'INTEGER', 'tinyint': 'INTEGER', 'bit': 'INTEGER'}
+
+
+def create_tables(conn, table_info):
+    for table_name, columns_info in table_info.items():
+        columns = ", ".join(
+            f"{col_info['COLUMN_NAME']} {SQLITE_TYPES.get(col_info['DATA_TYPE'], 'TEXT')}"
+            for col_info in columns_info
+        )
+        conn.execute(f"CREATE TABLE {table_name} ({columns})")
+
+
+def test_load_into_sqlite_memory(excel_file, tmp_path):
+    table_info = app.read_table_info(TABLE_INFO_FILE)
+    conn = sqlite3.connect(':memory:')
+    create_tables(conn, table_info)
+    try:
+        row_counts = app.load_tables_in_sequence(
+            excel_file, TABLE_INFO_FILE, None, batch_size=7,
+            session=app.ConversionSession('120000', '2026-01-01'), conn=conn
+        )
+        statements = app.all_tables_in_sequence(
+            excel_file, TABLE_INFO_FILE, str(tmp_path / 'insert_all.sql'),
+            session=app.ConversionSession('120000', '2026-01-01')
+        )
+        script_counts = {}
+        for sql in statements:
+            table_name = re.match(r'INSERT INTO (\w+)', sql).group(1)
+            script_counts[table_name] = script_counts.get(table_name, 0) + 1
+        assert row_counts == script_counts
+        for table_name, count in row_counts.items():
+            assert conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0] == count
+        
+        system_id, pj_no, system_name, create_date = conn.execute(
+            "SELECT SYSTEM_ID, PJ_NO, SYSTEM_NAME, CREATE_DATE FROM T_KIHON_PJ"
+        ).fetchone()
+        assert system_id == 120000
+        assert isinstance(pj_no, str) and pj_no.startswith('PJ')
+        assert system_name is None
+        assert create_date == '2026-01-01'
+    finally:
+        conn.close()
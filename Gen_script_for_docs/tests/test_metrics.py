@@ -0,0 +1,31 @@
+"""Metrics are collected per session: a session without metrics writes no report"""
+import json
+import os
+
+import app
+from benchmarks.make_docx import build_workbook
+
+TABLE_INFO_FILE = os.path.join(os.path.dirname(app.__file__), 'TABLE_INFO.txt')
+
+
+def test_metrics_follow_the_session(tmp_path):
+    excel_file = str(tmp_path / 'docX.xlsx')
+    build_workbook(excel_file, sheets=3, items=5)
+    measured = app.ConversionSession('120000', '2026-01-01', metrics_enabled=True)
+    plain = app.ConversionSession('120000', '2026-01-01')
+    
+    measured_count = app.all_tables_in_sequence(
+        excel_file, TABLE_INFO_FILE, str(tmp_path / 'measured.sql'), collect=False, session=measured
+    )
+    plain_count = app.all_tables_in_sequence(
+        excel_file, TABLE_INFO_FILE, str(tmp_path / 'plain.sql'), collect=False, session=plain
+    )
+    
+    assert plain.metrics is None
+    assert not os.path.exists(str(tmp_path / 'plain.metrics.json'))
+    with open(str(tmp_path / 'measured.metrics.json'), encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['statements'] == measured_count == plain_count
+    assert sum(report['rows_per_table'].values()) == measured_count
+    assert report['counters']['cells_loaded'] > 0
+    assert 'output_write' in report['stages']
@@ -0,0 +1,53 @@
+"""Sheets converted in a process pool must give the same SQL file as the serial run"""
+import os
+
+import pytest
+
+import app
+from benchmarks.make_docx import build_workbook
+
+TABLE_INFO_FILE = os.path.join(os.path.dirname(app.__file__), 'TABLE_INFO.txt')
+
+
+@pytest.fixture(scope='module')
+def excel_file(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('parallel') / 'docX.xlsx')
+    build_workbook(path, sheets=6, items=12, colour_rate=0.2)
+    return path
+
+
+def generate(excel_file, output_file, workers, cache_dir=None, table_info=None):
+    """SQL file bytes of one run in a fresh session; table_info given: set up front, no table_info file"""
+    session = app.ConversionSession('120000', '2026-01-01')
+    table_info_file = TABLE_INFO_FILE
+    if table_info is not None:
+        app.set_table_info(session, table_info)
+        table_info_file = None
+    app.all_tables_in_sequence(
+        excel_file, table_info_file, str(output_file), workers=workers, collect=False,
+        cache_dir=cache_dir, session=session
+    )
+    with open(output_file, 'rb') as f:
+        return f.read()
+
+
+def test_workers_match_serial_output(excel_file, tmp_path):
+    serial = generate(excel_file, tmp_path / 'serial.sql', workers=1)
+    assert serial.count(b'INSERT INTO') > 50
+    assert generate(excel_file, tmp_path / 'parallel.sql', workers=2) == serial
+
+
+def test_workers_match_serial_output_with_cache(excel_file, tmp_path):
+    serial = generate(excel_file, tmp_path / 'serial.sql', workers=1)
+    serial_cache_dir = str(tmp_path / 'serial_cache')
+    parallel_cache_dir = str(tmp_path / 'parallel_cache')
+    assert generate(excel_file, tmp_path / 'serial_cached.sql', 1, serial_cache_dir) == serial
+    # Cold cache, then every sheet reused from it
+    assert generate(excel_file, tmp_path / 'parallel_cold.sql', 2, parallel_cache_dir) == serial
+    assert generate(excel_file, tmp_path / 'parallel_warm.sql', 2, parallel_cache_dir) == serial
+
+
+def test_workers_with_table_info_already_set(excel_file, tmp_path):
+    serial = generate(excel_file, tmp_path / 'serial.sql', workers=1)
+    table_info = app.read_table_info(TABLE_INFO_FILE)
+    assert generate(excel_file, tmp_path / 'parallel.sql', workers=2, table_info=table_info) == serial
@@ -0,0 +1,61 @@
+"""The fast snapshot readers (openpyxl internals) must read the same sheet as the public-API reader"""
+from openpyxl import load_workbook
+import pytest
+
+import app
+from benchmarks.make_docx import build_workbook
+
+
+@pytest.fixture(scope='module')
+def excel_file(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('snapshot') / 'docX.xlsx')
+    build_workbook(path, sheets=5, items=15, colour_rate=0.3)
+    return path
+
+
+def snapshot_view(session, ws, snapshot):
+    """Values, merged ranges and AOJI cell positions of a snapshot, independent of its font ids"""
+    aoji_cells = {
+        (row, col)
+        for row in range(1, snapshot['max_row'] + 1)
+        for col in range(snapshot['min_col'], snapshot['max_col'] + 1)
+        if app.snapshot_font_aoji(session, ws, snapshot, snapshot['font_ids'][row][col - snapshot['min_col']])
+    }
+    return snapshot['max_row'], snapshot['values'], sorted(snapshot['merged_bounds']), aoji_cells
+
+
+@pytest.mark.parametrize('read_only', [False, True])
+def test_fast_reader_matches_public_reader(excel_file, read_only):
+    session = app.new_session()
+    app.initialize_workbook(session, excel_file, read_only=read_only)
+    full_wb = load_workbook(excel_file, data_only=True)
+    min_col, max_col = app.SNAPSHOT_COL_RANGE
+    aoji_cell_count = 0
+    try:
+        for sheet_name in session.sheetnames:
+            ws = session.wb[sheet_name]
+            fast = app.build_sheet_snapshot(ws, min_col, max_col)
+            public = app.build_sheet_snapshot(full_wb[sheet_name], min_col, max_col, public_api=True)
+            assert fast['font_aoji'] is None
+            assert public['font_aoji'] == app.PUBLIC_READER_FONT_AOJI
+            fast_view = snapshot_view(session, ws, fast)
+            assert fast_view == snapshot_view(session, full_wb[sheet_name], public)
+            aoji_cell_count += len(fast_view[3])
+    finally:
+        app.end_session(session)
+    assert aoji_cell_count, 'workbook should contain AOJI cells'
+
+
+def test_snapshot_falls_back_to_public_reader(excel_file, monkeypatch):
+    session = app.new_session()
+    app.initialize_workbook(session, excel_file, read_only=True)
+    sheet_name = session.sheetnames[0]
+    ws = session.wb[sheet_name]
+    expected = snapshot_view(session, ws, app.build_sheet_snapshot(ws, *app.SNAPSHOT_COL_RANGE))
+    monkeypatch.setattr(app, 'WorkSheetParser', None)
+    try:
+        snapshot = app.get_sheet_snapshot(session, ws)
+        assert snapshot['font_aoji'] == app.PUBLIC_READER_FONT_AOJI
+        assert snapshot_view(session, ws, snapshot) == expected
+    finally:
+        app.end_session(session)
@@ -0,0 +1,36 @@
+"""SQL literal rules shared by the compiled column encoders and the header-cell path"""
+import pytest
+
+import app
+
+NON_NUMBERS = ['abc', '12x', '－', 'YYYY/MM/DD']
+NON_INTEGER_DATA_TYPES = [data_type for data_type in app.NUMERIC_DATA_TYPES if data_type not in app.INTEGER_DATA_TYPES]
+
+
+def encode_both_paths(value, data_type):
+    """Literal of the compiled encoder and of the header-cell path, which must agree"""
+    session = app.ConversionSession('120000', '2026-01-01')
+    encoded = app.sql_literal_encoder(data_type)(value)
+    assert app._format_value_by_data_type(session, value, data_type, 'SEISU_KETA') == encoded
+    return encoded
+
+
+@pytest.mark.parametrize('data_type', app.INTEGER_DATA_TYPES)
+@pytest.mark.parametrize('value', NON_NUMBERS + [None, ''])
+def test_integer_column_writes_non_number_as_empty_string(data_type, value):
+    assert encode_both_paths(value, data_type) == "''"
+
+
+@pytest.mark.parametrize('data_type', NON_INTEGER_DATA_TYPES)
+@pytest.mark.parametrize('value', NON_NUMBERS + [None, ''])
+def test_non_integer_column_writes_non_number_as_null(data_type, value):
+    # SQL Server rejects '' for decimal/numeric/float/money
+    assert encode_both_paths(value, data_type) == 'NULL'
+
+
+@pytest.mark.parametrize('data_type', ['int', 'decimal'])
+@pytest.mark.parametrize('value, expected', [
+    (12, '12'), ('1,000', '1000'), (' 7 ', '7'), (2.0, '2'), ('2.25', '2.25'), (True, '1'), ('NULL', 'NULL'),
+])
+def test_numeric_column_values(data_type, value, expected):
+    assert encode_both_paths(value, data_type) == expected
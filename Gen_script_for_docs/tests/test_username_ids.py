@@ -0,0 +1,67 @@
+"""USER_NAME ids reserved in blocks from usernameID.txt are never handed out twice"""
+import threading
+
+import pytest
+
+import app
+
+
+def new_allocator(username_id_file, block_size):
+    session = app.ConversionSession('120000', '2026-01-01', username_id_file=username_id_file)
+    session.username_id_block_size = block_size
+    return session
+
+
+def test_concurrent_allocators_get_disjoint_ids(tmp_path):
+    username_id_file = str(tmp_path / 'usernameID.txt')
+    with open(username_id_file, 'w', encoding='utf-8') as f:
+        f.write('10000')
+    allocated = [[], []]
+    start = threading.Barrier(2)
+
+    def allocate(ids):
+        session = new_allocator(username_id_file, block_size=3)
+        start.wait()
+        for _ in range(200):
+            ids.append(app.next_username_id(session))
+        app.release_username_ids(session)
+
+    threads = [threading.Thread(target=allocate, args=(ids,)) for ids in allocated]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(allocated[0])) == len(set(allocated[1])) == 200
+    assert not set(allocated[0]) & set(allocated[1])
+    # The counter ends below every id handed out
+    assert app.read_username_id_counter(username_id_file) < min(allocated[0] + allocated[1])
+
+
+def test_unwritten_reservation_hands_out_no_id(tmp_path, monkeypatch):
+    username_id_file = str(tmp_path / 'usernameID.txt')
+    with open(username_id_file, 'w', encoding='utf-8') as f:
+        f.write('0500')
+    session = new_allocator(username_id_file, block_size=10)
+
+    def fail_replace(src, dst):
+        raise PermissionError(13, 'Permission denied', dst)
+
+    monkeypatch.setattr(app.os, 'replace', fail_replace)
+    with pytest.raises(PermissionError):
+        app.next_username_id(session)
+    assert session.username_id_reserved == 0
+    assert session.username_id_counter is None
+    monkeypatch.undo()
+
+    assert app.next_username_id(session) == 500
+    assert app.read_username_id_counter(username_id_file) == 490
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_lock_wait_is_bounded(tmp_path):
+    username_id_file = str(tmp_path / 'usernameID.txt')
+    with app.username_id_file_lock(username_id_file):
+        with pytest.raises(TimeoutError):
+            with app.username_id_file_lock(username_id_file, timeout=0.2):
+                pass
@@ -1,86 +1,556 @@
-import pyodbc
+import argparse
+import datetime
+import decimal
+import itertools
+import json
 import os
+import queue
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 
 # Đọc chuỗi kết nối từ file connect_string.txt
-CONNECT_STRING_FILE = os.path.join(os.path.dirname(__file__), 'connect_string.txt')
+CONNECT_STRING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'connect_string.txt')
 def read_connect_string(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
         return f.read().strip()
 
-output_dir = 'output_scripts_update'  # Thư mục để lưu các file script UPDATE
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+OUTPUT_DIR = 'output_scripts_update'  # Thư mục để lưu các file script UPDATE
 
-conn_str = read_connect_string(CONNECT_STRING_FILE)
+# Output modes: one UPDATE per row, or one set-based UPDATE per chunk of rows
+UPDATE_MODES = ('row', 'bulk')
+UPDATE_CHUNK_SIZE = 1000  # Rows per set-based UPDATE in bulk mode
+FETCH_SIZE = 5000  # Rows fetched from DB A per fetchmany call
+OUTPUT_BUFFER_SIZE = 1024 * 1024  # Write buffer (bytes) of each script file
+SUMMARY_FILE = 'export_summary.json'  # Progress and per-table timings, written into the output directory
 
-try:
-    conn = pyodbc.connect(conn_str)
-    cursor = conn.cursor()
+TABLE_PATTERN = 'M_%'  # LIKE pattern of the exported tables
 
+# Cột cần UPDATE: tên cột khớp một mẫu include và không khớp mẫu exclude.
+# Regular expressions searched in the column name, case-insensitive like the SQL Server collation.
+COLUMN_RULES = {
+    'include': ['NAME', 'TEL', 'FAX', 'POST', 'ADDRESS', 'TANTOU', 'CREATE_USER', 'UPDATE_USER', 'FURIGANA'],
+    'exclude': ['CD'],
+}
 
-    # Lấy danh sách các bảng thực sự (BASE TABLE) bắt đầu bằng 'M_'
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE' AND TABLE_NAME LIKE 'M_%'")
-    tables = cursor.fetchall()
+# Columns of these types cannot be set by an UPDATE
+NON_UPDATABLE_DATA_TYPES = {'timestamp', 'rowversion'}
 
-    for table in tables:
-        table_name = table[0]
-        # Lấy danh sách các cột có chứa các từ khóa cần thiết trong tên cột
-        cursor.execute("""
-            SELECT COLUMN_NAME 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_NAME = ? AND (
-                (COLUMN_NAME LIKE '%NAME%' OR
-                COLUMN_NAME LIKE '%TEL%' OR
-                COLUMN_NAME LIKE '%FAX%' OR
-                COLUMN_NAME LIKE '%POST%' OR
-                COLUMN_NAME LIKE '%ADDRESS%' OR
-                COLUMN_NAME LIKE '%TANTOU%' OR
-                COLUMN_NAME LIKE '%CREATE_USER%' OR
-                COLUMN_NAME LIKE '%UPDATE_USER%' OR
-                COLUMN_NAME LIKE '%FURIGANA%')
-                AND COLUMN_NAME NOT LIKE '%CD%'
+def compile_column_rules(include=None, exclude=None):
+    """
+    Column rules with each pattern list compiled once into a single regex
+    (None lists take COLUMN_RULES). An empty include list selects no column.
+    """
+    include = COLUMN_RULES['include'] if include is None else include
+    exclude = COLUMN_RULES['exclude'] if exclude is None else exclude
+
+    def combine(patterns):
+        if not patterns:
+            return None
+        return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+    return {'include': include, 'exclude': exclude, 'include_re': combine(include), 'exclude_re': combine(exclude)}
+
+def read_table_metadata(cursor, table_pattern=TABLE_PATTERN):
+    """
+    Columns, data types and keys of every base table matching table_pattern, in one query:
+    {table_name: {'columns': {column_name: data_type}, 'key_columns': [...]}}, tables sorted by name
+    and columns in ordinal order. key_columns is the PRIMARY KEY, else the first UNIQUE constraint
+    (by name), in key order; [] when the table has neither.
+    """
+    cursor.execute("""
+        SELECT C.TABLE_NAME, C.COLUMN_NAME, C.DATA_TYPE, K.CONSTRAINT_TYPE, K.CONSTRAINT_NAME, K.ORDINAL_POSITION
+        FROM INFORMATION_SCHEMA.TABLES T
+        JOIN INFORMATION_SCHEMA.COLUMNS C
+            ON C.TABLE_SCHEMA = T.TABLE_SCHEMA AND C.TABLE_NAME = T.TABLE_NAME
+        LEFT JOIN (
+            SELECT TC.TABLE_SCHEMA, TC.TABLE_NAME, TC.CONSTRAINT_TYPE, TC.CONSTRAINT_NAME, KCU.COLUMN_NAME, KCU.ORDINAL_POSITION
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS TC
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE KCU
+                ON KCU.CONSTRAINT_SCHEMA = TC.CONSTRAINT_SCHEMA
+                AND KCU.CONSTRAINT_NAME = TC.CONSTRAINT_NAME
+                AND KCU.TABLE_NAME = TC.TABLE_NAME
+            WHERE TC.CONSTRAINT_TYPE IN ('PRIMARY KEY', 'UNIQUE')
+        ) K
+            ON K.TABLE_SCHEMA = C.TABLE_SCHEMA AND K.TABLE_NAME = C.TABLE_NAME AND K.COLUMN_NAME = C.COLUMN_NAME
+        WHERE T.TABLE_TYPE = 'BASE TABLE' AND T.TABLE_NAME LIKE ?
+        ORDER BY C.TABLE_NAME, C.ORDINAL_POSITION
+    """, (table_pattern,))
+    tables = {}
+    for table_name, column_name, data_type, constraint_type, constraint_name, key_position in cursor.fetchall():
+        table = tables.setdefault(table_name, {'columns': {}, 'keys': {}})
+        # A column in several constraints comes once per constraint
+        table['columns'].setdefault(column_name, data_type)
+        if constraint_name is not None:
+            # PRIMARY KEY sorts before UNIQUE, then by constraint name
+            key_id = (constraint_type != 'PRIMARY KEY', constraint_name)
+            table['keys'].setdefault(key_id, []).append((key_position, column_name))
+
+    metadata = {}
+    for table_name, table in tables.items():
+        key_columns = [column_name for _, column_name in sorted(table['keys'][min(table['keys'])])] if table['keys'] else []
+        metadata[table_name] = {'columns': table['columns'], 'key_columns': key_columns}
+    return metadata
+
+def sqlite_data_type(declared_type):
+    """INFORMATION_SCHEMA-style DATA_TYPE of a SQLite declared type: NVARCHAR(40) -> nvarchar"""
+    return declared_type.split('(')[0].strip().lower()
+
+def read_sqlite_table_metadata(cursor, table_pattern=TABLE_PATTERN):
+    """
+    read_table_metadata for a SQLite database (e.g. a local stand-in of DB A): tables from
+    sqlite_master, columns from pragma table_info. key_columns is the PRIMARY KEY, else the
+    first UNIQUE constraint (by index name), in key order.
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? AND name NOT LIKE 'sqlite%' ORDER BY name",
+        (table_pattern,)
+    )
+    metadata = {}
+    for (table_name,) in cursor.fetchall():
+        cursor.execute("SELECT name, type, pk FROM pragma_table_info(?) ORDER BY cid", (table_name,))
+        table_columns = cursor.fetchall()
+        columns = {column_name: sqlite_data_type(declared_type) for column_name, declared_type, _ in table_columns}
+        key_columns = [column_name for column_name, _, pk in sorted(table_columns, key=lambda col: col[2]) if pk]
+        if not key_columns:
+            cursor.execute(
+                "SELECT name FROM pragma_index_list(?) WHERE \"unique\" AND origin = 'u' ORDER BY name", (table_name,)
             )
-        """, table_name)
-        target_columns = [row[0] for row in cursor.fetchall()]
+            unique_indexes = cursor.fetchall()
+            if unique_indexes:
+                cursor.execute("SELECT name FROM pragma_index_info(?) ORDER BY seqno", (unique_indexes[0][0],))
+                key_columns = [column_name for (column_name,) in cursor.fetchall()]
+        metadata[table_name] = {'columns': columns, 'key_columns': key_columns}
+    return metadata
+
+def select_target_columns(columns, column_rules):
+    """Columns ({column_name: data_type}) selected by compiled column rules, in column order"""
+    include_re = column_rules['include_re']
+    exclude_re = column_rules['exclude_re']
+    if include_re is None:
+        return []
+    return [
+        column_name for column_name, data_type in columns.items()
+        if include_re.search(column_name)
+        and not (exclude_re is not None and exclude_re.search(column_name))
+        and (data_type or '').lower() not in NON_UPDATABLE_DATA_TYPES
+    ]
+
+def sql_update_literal(val):
+    """NULL or N'value' of an updated column; line breaks are flattened as before"""
+    if val is None:
+        return 'NULL'
+    # Escape dấu nháy đơn và xử lý ký tự đặc biệt
+    escaped_val = str(val).replace("'", "''").replace('\r', '').replace('\n', ' ')
+    return f"N'{escaped_val}'"
+
+def format_set_clauses(columns, values):
+    """col = N'value' list of an UPDATE"""
+    return ', '.join(f"{col} = {sql_update_literal(val)}" for col, val in zip(columns, values))
 
+# Key columns of these types compare with a non-Unicode '...' literal; N'...' would convert
+# the column side and turn the key index seek into a scan
+NON_UNICODE_DATA_TYPES = {'char', 'varchar', 'text'}
+
+def sql_key_literal(val, data_type=None):
+    """
+    Exact SQL literal of a key value of a data_type column (the WHERE clause must match the
+    stored value and keep using the key index). Datetimes are written in the ISO 8601
+    'YYYY-MM-DDTHH:MM:SS' form, which does not depend on SET DATEFORMAT/LANGUAGE, with the
+    fraction of the column type: none for smalldatetime, .fff for datetime, 7 digits otherwise
+    (datetime2, or an unknown type).
+    """
+    if isinstance(val, bool):
+        return '1' if val else '0'
+    if isinstance(val, (int, float, decimal.Decimal)):
+        return str(val)
+    if isinstance(val, (bytes, bytearray)):
+        return '0x' + bytes(val).hex()
+    if isinstance(val, datetime.datetime):
+        iso_val = val.strftime('%Y-%m-%dT%H:%M:%S')
+        if data_type == 'smalldatetime':
+            return f"'{iso_val}'"
+        if data_type == 'datetime':
+            # datetime stores 1/300 s, read back as whole milliseconds
+            return f"'{iso_val}.{val.microsecond // 1000:03d}'"
+        return f"'{iso_val}.{val.microsecond:06d}0'"
+    if isinstance(val, (datetime.date, datetime.time)):
+        return f"'{val.isoformat()}'"
+    escaped_val = str(val).replace("'", "''")
+    if data_type in NON_UNICODE_DATA_TYPES:
+        return f"'{escaped_val}'"
+    return f"N'{escaped_val}'"
+
+def format_key_condition(key_columns, key_values, key_types=None):
+    """
+    WHERE condition selecting one row by its key (a NULL of a UNIQUE key is matched with IS NULL).
+    key_types: DATA_TYPE of every key column (see sql_key_literal), None if unknown.
+    """
+    key_types = key_types or [None] * len(key_columns)
+    return ' AND '.join(
+        f"{col} IS NULL" if val is None else f"{col} = {sql_key_literal(val, data_type)}"
+        for col, val, data_type in zip(key_columns, key_values, key_types)
+    )
+
+def iter_fetched_rows(cursor, fetch_size=FETCH_SIZE):
+    """Rows of the executed query, fetched fetch_size at a time so only one batch is in memory"""
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield from rows
+
+def write_row_updates(f, table_name, key_columns, target_columns, rows, key_types=None):
+    """
+    One UPDATE per row: by key, or by ROW_NUMBER for tables without a key. Returns the row count.
+    key_types: DATA_TYPE of every key column (see sql_key_literal).
+    """
+    key_count = len(key_columns)
+    idx = -1
+    for idx, row in enumerate(rows):
+        if key_columns:
+            set_str = format_set_clauses(target_columns, row[key_count:])
+            where_str = format_key_condition(key_columns, row[:key_count], key_types)
+            f.write(f"UPDATE {table_name} SET {set_str} WHERE {where_str};\n\n")
+        else:
+            set_str = format_set_clauses(target_columns, row)
+            # Sử dụng ROW_NUMBER để update theo thứ tự dòng
+            update_sql = f";WITH T AS (SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT 1)) AS rn FROM {table_name})\n"
+            update_sql += f"UPDATE T SET {set_str} WHERE rn = {idx+1};\n\n"
+            f.write(update_sql)
+    return idx + 1
+
+def write_bulk_updates(f, table_name, key_columns, target_columns, rows, chunk_size=UPDATE_CHUNK_SIZE, key_types=None):
+    """
+    One set-based UPDATE per chunk of rows: the chunk is a VALUES row set joined to the
+    table on its key (on the row number for tables without a key, so the table is
+    numbered once per chunk instead of once per row). Every chunk is its own GO batch.
+    rows may be any iterable; only one chunk is held at a time. Returns the row count.
+    key_types: DATA_TYPE of every key column (see sql_key_literal).
+    """
+    key_count = len(key_columns)
+    key_types = key_types or [None] * key_count
+    set_str = ', '.join(f"T.{col} = S.{col}" for col in target_columns)
+    rows = iter(rows)
+    chunk_start = 0
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return chunk_start
+        if key_columns:
+            value_rows = [
+                [
+                    sql_key_literal(val, data_type) if val is not None else 'NULL'
+                    for val, data_type in zip(row[:key_count], key_types)
+                ]
+                + [sql_update_literal(val) for val in row[key_count:]]
+                for row in chunk
+            ]
+            # A UNIQUE key may hold NULL, which = never matches
+            join_conditions = []
+            for key_idx, col in enumerate(key_columns):
+                null_count = sum(1 for row in chunk if row[key_idx] is None)
+                if null_count == len(chunk):
+                    # An all-NULL VALUES column is typed int: do not compare it with the key column
+                    join_conditions.append(f"T.{col} IS NULL")
+                elif null_count:
+                    join_conditions.append(f"(T.{col} = S.{col} OR (T.{col} IS NULL AND S.{col} IS NULL))")
+                else:
+                    join_conditions.append(f"T.{col} = S.{col}")
+            join_str = ' AND '.join(join_conditions)
+            source_columns = key_columns + target_columns
+            update_sql = f"UPDATE T SET {set_str}\nFROM {table_name} AS T\n"
+        else:
+            value_rows = [
+                [str(chunk_start + idx + 1)] + [sql_update_literal(val) for val in row]
+                for idx, row in enumerate(chunk)
+            ]
+            join_str = "T.rn = S.rn"
+            source_columns = ['rn'] + target_columns
+            update_sql = f";WITH T AS (SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT 1)) AS rn FROM {table_name})\n"
+            update_sql += f"UPDATE T SET {set_str}\nFROM T\n"
+        values_str = ',\n'.join(f"    ({', '.join(values)})" for values in value_rows)
+        update_sql += f"JOIN (VALUES\n{values_str}\n) AS S ({', '.join(source_columns)}) ON {join_str};\nGO\n\n"
+        f.write(update_sql)
+        chunk_start += len(chunk)
+
+def write_update_script(
+    cursor,
+    table_name,
+    table_meta,
+    output_dir,
+    column_rules=None,
+    mode='row',
+    chunk_size=UPDATE_CHUNK_SIZE,
+    fetch_size=FETCH_SIZE
+):
+    """
+    Write output_dir/<table_name>_update.sql for the columns of one table selected by
+    column_rules (compile_column_rules; None: the default name/contact columns).
+    table_meta is the table's entry of read_table_metadata.
+    Rows are updated by their primary/unique key (UPDATE ... WHERE <key> = ...); tables
+    without a key fall back to numbering the rows with ROW_NUMBER.
+    mode 'bulk' writes one set-based UPDATE per chunk_size rows instead (see write_bulk_updates).
+    Rows are streamed from the cursor (fetch_size at a time) straight into the file, so memory
+    does not grow with the table; the row count is written in a trailer once the table is done.
+    Returns the table's summary entry: status 'ok' (with rows, script), 'skipped' or 'error'.
+    """
+    if column_rules is None:
+        column_rules = compile_column_rules()
+    # Lấy danh sách các cột có chứa các từ khóa cần thiết trong tên cột
+    target_columns = select_target_columns(table_meta['columns'], column_rules)
+
+    if not target_columns:
+        print(f"Bảng {table_name} không có cột nào chứa các từ khóa cần thiết")
+        return {'status': 'skipped', 'reason': 'no target columns'}
+
+    # Khóa chính (hoặc UNIQUE) để UPDATE theo khóa thay vì theo thứ tự dòng
+    key_columns = table_meta['key_columns']
+    # Key literals are written for the type of their column (see sql_key_literal)
+    key_types = [(table_meta['columns'].get(col) or '').lower() for col in key_columns]
+    if key_columns:
+        # Key columns identify the row, they are not updated
+        target_columns = [col for col in target_columns if col not in key_columns]
         if not target_columns:
-            print(f"Bảng {table_name} không có cột nào chứa các từ khóa cần thiết")
-            continue
+            print(f"Bảng {table_name} chỉ có cột khóa chứa các từ khóa cần thiết")
+            return {'status': 'skipped', 'reason': 'only key columns are target columns'}
+        select_columns = key_columns + target_columns
+    else:
+        select_columns = target_columns
+
+    # Lấy dữ liệu các cột đó từ DB A, bỏ qua bảng bị lỗi
+    select_query = f"SELECT {', '.join(select_columns)} FROM {table_name}"
+    if key_columns:
+        select_query += f" ORDER BY {', '.join(key_columns)}"
+    try:
+        cursor.execute(select_query)
+    except Exception as e:
+        print(f"Bảng {table_name} bị lỗi khi truy vấn dữ liệu: {e}")
+        return {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
 
-        # Lấy dữ liệu các cột đó từ DB A, bỏ qua bảng bị lỗi
-        select_query = f"SELECT {', '.join(target_columns)} FROM {table_name}"
+    # Sinh script UPDATE cho DB B, ghi từng lô dòng ngay khi đọc được
+    script_file = os.path.join(output_dir, f"{table_name}_update.sql")
+    try:
+        with open(script_file, 'w', encoding='utf-8-sig', buffering=OUTPUT_BUFFER_SIZE) as f:  # UTF-8 with BOM
+            f.write(f"-- UPDATE script for table {table_name} (columns containing {', '.join(column_rules['include'])})\n")
+            if key_columns:
+                f.write(f"-- Key: {', '.join(key_columns)}\n")
+            else:
+                f.write("-- Không có khóa chính/UNIQUE: UPDATE theo ROW_NUMBER\n")
+            f.write("\n")
+            rows = iter_fetched_rows(cursor, fetch_size)
+            if mode == 'bulk':
+                row_count = write_bulk_updates(f, table_name, key_columns, target_columns, rows, chunk_size, key_types)
+            else:
+                row_count = write_row_updates(f, table_name, key_columns, target_columns, rows, key_types)
+            # Số dòng chỉ biết được sau khi đọc hết bảng
+            f.write(f"-- Số dòng dữ liệu: {row_count}\n")
+    except Exception as e:
+        # Do not leave a truncated script that would update only part of the table
+        if os.path.exists(script_file):
+            os.remove(script_file)
+        print(f"Bảng {table_name} bị lỗi khi truy vấn dữ liệu: {e}")
+        return {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    print(f"Đã tạo file UPDATE: {script_file}")
+    return {'status': 'ok', 'rows': row_count, 'script': script_file}
+
+def read_table_row_estimates(cursor):
+    """
+    {table_name: estimated row count} from sys.dm_db_partition_stats (heap or clustered index).
+    Returns {} when the statistics cannot be read (e.g. without VIEW DATABASE STATE).
+    """
+    try:
+        cursor.execute("""
+            SELECT T.name, SUM(PS.row_count)
+            FROM sys.dm_db_partition_stats PS
+            JOIN sys.tables T ON T.object_id = PS.object_id
+            WHERE PS.index_id IN (0, 1)
+            GROUP BY T.name
+        """)
+        return {name: int(row_count or 0) for name, row_count in cursor.fetchall()}
+    except Exception as e:
+        print(f"Không đọc được số dòng ước tính, giữ nguyên thứ tự bảng: {e}")
+        return {}
+
+def read_sqlite_row_estimates(cursor):
+    """read_table_row_estimates for a SQLite database: exact counts, SQLite keeps no row statistics by default"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite%'")
+    row_estimates = {}
+    for (table_name,) in cursor.fetchall():
+        quoted_name = table_name.replace('"', '""')
+        cursor.execute(f'SELECT COUNT(*) FROM "{quoted_name}"')
+        row_estimates[table_name] = cursor.fetchone()[0]
+    return row_estimates
+
+def metadata_readers(conn):
+    """(metadata reader, row estimate reader) for the database of conn: SQLite or SQL Server"""
+    if isinstance(conn, sqlite3.Connection):
+        return read_sqlite_table_metadata, read_sqlite_row_estimates
+    return read_table_metadata, read_table_row_estimates
+
+def open_connection_pool(connect, size):
+    """Queue of size connections made by connect(); a connection is used by one thread at a time"""
+    pool = queue.Queue()
+    try:
+        for _ in range(size):
+            pool.put(connect())
+    except Exception:
+        close_connection_pool(pool)
+        raise
+    return pool
+
+def close_connection_pool(pool):
+    while True:
         try:
-            cursor.execute(select_query)
-            rows = cursor.fetchall()
-        except Exception as e:
-            print(f"Bảng {table_name} bị lỗi khi truy vấn dữ liệu: {e}")
-            continue
-
-        # Sinh script UPDATE cho DB B
-        script_file = os.path.join(output_dir, f"{table_name}_update.sql")
-        with open(script_file, 'w', encoding='utf-8-sig') as f:  # UTF-8 with BOM
-            f.write(f"-- UPDATE script for table {table_name} (columns containing NAME, TEL, FAX, POST, ADDRESS, TANTOU, CREATE_USER, UPDATE_USER, FURIGANA)\n")
-            f.write(f"-- Số dòng dữ liệu: {len(rows)}\n\n")
-            for idx, row in enumerate(rows):
-                set_clauses = []
-                for col, val in zip(target_columns, row):
-                    if val is None:
-                        set_clauses.append(f"{col} = NULL")
-                    else:
-                        # Escape dấu nháy đơn và xử lý ký tự đặc biệt
-                        escaped_val = str(val).replace("'", "''").replace('\r', '').replace('\n', ' ')
-                        set_clauses.append(f"{col} = N'{escaped_val}'")
-                set_str = ', '.join(set_clauses)
-                # Sử dụng ROW_NUMBER để update theo thứ tự dòng
-                update_sql = f";WITH T AS (SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT 1)) AS rn FROM {table_name})\n"
-                update_sql += f"UPDATE T SET {set_str} WHERE rn = {idx+1};\n\n"
-                f.write(update_sql)
-        print(f"Đã tạo file UPDATE: {script_file}")
-
-except pyodbc.Error as e:
-    print(f"Lỗi khi kết nối hoặc truy vấn SQL Server: {e}")
-finally:
-    if 'cursor' in locals() and cursor:
-        cursor.close()
-    if 'conn' in locals() and conn:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            return
         conn.close()
+
+def export_table(pool, table_name, table_meta, output_dir, options):
+    """Thread pool task: write one table's script on a pooled connection; returns its summary entry"""
+    entry = {'table': table_name}
+    start = time.perf_counter()
+    conn = pool.get()
+    try:
+        cursor = conn.cursor()
+        try:
+            entry.update(write_update_script(cursor, table_name, table_meta, output_dir, **options))
+        finally:
+            cursor.close()
+    except Exception as e:
+        print(f"Bảng {table_name} bị lỗi khi truy vấn dữ liệu: {e}")
+        entry.update({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+    finally:
+        pool.put(conn)
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+def write_summary(summary_file, summary):
+    """Write the summary atomically, so it can be read while the export is running"""
+    temp_file = f'{summary_file}.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, summary_file)
+
+def export_update_scripts(
+    conn_str,
+    output_dir=OUTPUT_DIR,
+    mode='row',
+    chunk_size=UPDATE_CHUNK_SIZE,
+    fetch_size=FETCH_SIZE,
+    jobs=1,
+    summary_file=SUMMARY_FILE,
+    connect=None,
+    column_rules=None,
+    table_pattern=TABLE_PATTERN,
+    metadata_reader=None,
+    row_estimate_reader=None
+):
+    """
+    Write one UPDATE script per M_ base table of the database of conn_str into output_dir.
+    Tables are exported by a pool of jobs threads, each on its own pooled connection, largest
+    table first (estimates from sys.dm_db_partition_stats, exact counts on SQLite) so a big
+    table does not finish last.
+    output_dir/summary_file holds progress and per-table timings; it is rewritten after every
+    table. connect is a zero-argument connection factory (default pyodbc.connect(conn_str)),
+    e.g. a local SQLite stand-in (connections are opened here and used by the pool threads, so
+    SQLite needs check_same_thread=False). Columns, types and keys of all tables are read with one
+    metadata query on SQL Server; column_rules (compile_column_rules) are applied locally. Returns the summary.
+    metadata_reader / row_estimate_reader replace read_table_metadata / read_table_row_estimates;
+    by default they are picked from the connection (see metadata_readers).
+    """
+    if connect is None:
+        # pyodbc is only needed when exporting, so importing this module stays cheap
+        import pyodbc
+        connect = partial(pyodbc.connect, conn_str)
+        database_error = pyodbc.Error
+    else:
+        database_error = Exception
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    summary_file = os.path.join(output_dir, summary_file)
+
+    if column_rules is None:
+        column_rules = compile_column_rules()
+    options = {'column_rules': column_rules, 'mode': mode, 'chunk_size': chunk_size, 'fetch_size': fetch_size}
+    summary = {'output_dir': output_dir, 'mode': mode, 'jobs': jobs, 'tables': []}
+    start = time.perf_counter()
+    pool = None
+    try:
+        pool = open_connection_pool(connect, max(1, jobs))
+        conn = pool.get()
+        cursor = conn.cursor()
+        try:
+            default_metadata_reader, default_row_estimate_reader = metadata_readers(conn)
+            # Lấy danh sách các bảng thực sự (BASE TABLE) bắt đầu bằng 'M_' cùng cột, kiểu dữ liệu và khóa
+            metadata = (metadata_reader or default_metadata_reader)(cursor, table_pattern)
+            tables = list(metadata)
+            row_estimates = (row_estimate_reader or default_row_estimate_reader)(cursor)
+        finally:
+            cursor.close()
+            pool.put(conn)
+
+        # Bảng lớn nhất chạy trước
+        tables.sort(key=lambda table_name: row_estimates.get(table_name, 0), reverse=True)
+        summary['total_tables'] = len(tables)
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {
+                executor.submit(export_table, pool, table_name, metadata[table_name], output_dir, options): table_name
+                for table_name in tables
+            }
+            for future in as_completed(futures):
+                entry = future.result()
+                entry['estimated_rows'] = row_estimates.get(entry['table'])
+                summary['tables'].append(entry)
+                print(f"[{entry['status']}] {entry['table']} ({entry['seconds']}s) {len(summary['tables'])}/{len(tables)}")
+                summary['total_seconds'] = round(time.perf_counter() - start, 3)
+                write_summary(summary_file, summary)
+
+    except database_error as e:
+        print(f"Lỗi khi kết nối hoặc truy vấn SQL Server: {e}")
+        summary['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if pool is not None:
+            close_connection_pool(pool)
+
+    summary['total_seconds'] = round(time.perf_counter() - start, 3)
+    write_summary(summary_file, summary)
+    failed = sum(1 for entry in summary['tables'] if entry['status'] == 'error')
+    print(f"Exported {len(summary['tables']) - failed}/{len(summary['tables'])} tables into {output_dir} in {summary['total_seconds']}s")
+    return summary
+
+def build_arg_parser(parser=None):
+    """Arguments of the export command; adds them to parser (e.g. a CLI subcommand) if given"""
+    if parser is None:
+        parser = argparse.ArgumentParser(description='Export UPDATE scripts for the M_ tables of a database')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='Directory the <table>_update.sql files are written to')
+    parser.add_argument('--mode', choices=UPDATE_MODES, default='row',
+                        help='row: one UPDATE per row; bulk: one set-based UPDATE per chunk of rows')
+    parser.add_argument('--chunk-size', type=int, default=UPDATE_CHUNK_SIZE, help='Rows per UPDATE in bulk mode')
+    parser.add_argument('--include', action='append', metavar='REGEX',
+                        help='Update columns whose name matches REGEX (repeatable; replaces the default NAME/TEL/... rules)')
+    parser.add_argument('--exclude', action='append', metavar='REGEX',
+                        help='Skip columns whose name matches REGEX (repeatable; replaces the default CD rule)')
+    parser.add_argument('--jobs', type=int, default=1, help='Tables exported concurrently, each on its own connection')
+    parser.add_argument('--fetch-size', type=int, default=FETCH_SIZE, help='Rows fetched from the database per round trip')
+    parser.add_argument('--connect-string-file', default=CONNECT_STRING_FILE, help='File holding the ODBC connection string')
+    return parser
+
+def main(args):
+    if min(args.chunk_size, args.fetch_size, args.jobs) < 1:
+        raise SystemExit("--chunk-size, --fetch-size and --jobs must be at least 1")
+    try:
+        column_rules = compile_column_rules(args.include, args.exclude)
+    except re.error as e:
+        raise SystemExit(f"Invalid --include/--exclude pattern: {e}")
+    export_update_scripts(
+        read_connect_string(args.connect_string_file), args.output_dir, args.mode, args.chunk_size, args.fetch_size,
+        jobs=args.jobs, column_rules=column_rules
+    )
+
+if __name__ == "__main__":
+    main(build_arg_parser().parse_args())
@@ -0,0 +1,86 @@
+"""Set-based UPDATE script of bulk mode (VALUES row set joined to the table)"""
+import io
+
+import export_update_script as export
+
+
+def bulk_sql(*args, **kwargs):
+    f = io.StringIO()
+    count = export.write_bulk_updates(f, *args, **kwargs)
+    return count, f.getvalue()
+
+
+def batches(sql):
+    return [batch for batch in sql.split('GO\n\n') if batch]
+
+
+def test_keyed_chunk_joins_on_key():
+    count, sql = bulk_sql(
+        'M_TOKUISAKI', ['TOKUISAKI_CD'], ['TOKUISAKI_NAME', 'TEL'],
+        [('T001', "O'Brien", None), ('T002', '山田\r\n商店', '03')],
+        key_types=['varchar']
+    )
+    assert count == 2
+    assert sql == (
+        "UPDATE T SET T.TOKUISAKI_NAME = S.TOKUISAKI_NAME, T.TEL = S.TEL\n"
+        "FROM M_TOKUISAKI AS T\n"
+        "JOIN (VALUES\n"
+        "    ('T001', N'O''Brien', NULL),\n"
+        "    ('T002', N'山田 商店', N'03')\n"
+        ") AS S (TOKUISAKI_CD, TOKUISAKI_NAME, TEL) ON T.TOKUISAKI_CD = S.TOKUISAKI_CD;\n"
+        "GO\n\n"
+    )
+
+
+def test_null_keys_are_matched_null_safe():
+    rows = [('S001', 1, 'A'), ('S002', None, 'B')]
+    _, sql = bulk_sql('M_SHOUHIN', ['SHOUHIN_CD', 'EDA_NO'], ['SHOUHIN_NAME'], rows)
+    assert "    (N'S002', NULL, N'B')" in sql
+    assert sql.count(' ON ') == 1
+    assert sql.endswith(
+        " ON T.SHOUHIN_CD = S.SHOUHIN_CD AND (T.EDA_NO = S.EDA_NO OR (T.EDA_NO IS NULL AND S.EDA_NO IS NULL));\nGO\n\n"
+    )
+
+
+def test_all_null_key_column_is_not_compared():
+    # An all-NULL VALUES column is typed int by SQL Server, so it must not be compared
+    rows = [('S001', None, 'A'), ('S002', None, 'B')]
+    _, sql = bulk_sql('M_SHOUHIN', ['SHOUHIN_CD', 'EDA_NO'], ['SHOUHIN_NAME'], rows)
+    assert " ON T.SHOUHIN_CD = S.SHOUHIN_CD AND T.EDA_NO IS NULL;\n" in sql
+    assert 'S.EDA_NO' not in sql
+
+
+def test_null_safe_join_is_decided_per_chunk():
+    rows = [('S001', 1, 'A'), ('S002', 2, 'B'), ('S003', None, 'C'), ('S004', None, 'D')]
+    _, sql = bulk_sql('M_SHOUHIN', ['SHOUHIN_CD', 'EDA_NO'], ['SHOUHIN_NAME'], iter(rows), chunk_size=2)
+    first, second = batches(sql)
+    assert first.endswith(" ON T.SHOUHIN_CD = S.SHOUHIN_CD AND T.EDA_NO = S.EDA_NO;\n")
+    assert second.endswith(" ON T.SHOUHIN_CD = S.SHOUHIN_CD AND T.EDA_NO IS NULL;\n")
+
+
+def test_every_chunk_is_its_own_go_batch():
+    rows = [('T%03d' % i, 'name%d' % i) for i in range(5)]
+    count, sql = bulk_sql('M_TOKUISAKI', ['TOKUISAKI_CD'], ['TOKUISAKI_NAME'], iter(rows), chunk_size=2)
+    assert count == 5
+    assert sql.count('GO\n') == 3
+    assert [batch.count('\n    (') for batch in batches(sql)] == [2, 2, 1]
+    assert all(batch.startswith('UPDATE T SET ') for batch in batches(sql))
+
+
+def test_no_rows_writes_nothing():
+    assert bulk_sql('M_TOKUISAKI', ['TOKUISAKI_CD'], ['TOKUISAKI_NAME'], []) == (0, '')
+
+
+def test_keyless_table_joins_on_row_number():
+    rows = [('A',), ('B',), ('C',)]
+    count, sql = bulk_sql('T_JUCHU', [], ['TOKUISAKI_NAME'], iter(rows), chunk_size=2)
+    assert count == 3
+    first, second = batches(sql)
+    header = (
+        ";WITH T AS (SELECT *, ROW_NUMBER() OVER (ORDER BY (SELECT 1)) AS rn FROM T_JUCHU)\n"
+        "UPDATE T SET T.TOKUISAKI_NAME = S.TOKUISAKI_NAME\n"
+        "FROM T\n"
+    )
+    assert first == header + "JOIN (VALUES\n    (1, N'A'),\n    (2, N'B')\n) AS S (rn, TOKUISAKI_NAME) ON T.rn = S.rn;\n"
+    # Row numbers continue across chunks
+    assert second == header + "JOIN (VALUES\n    (3, N'C')\n) AS S (rn, TOKUISAKI_NAME) ON T.rn = S.rn;\n"
@@ -0,0 +1,117 @@
+"""Export against a SQLite stand-in of DB A, on a pool of two connections"""
+import json
+import os
+import sqlite3
+from functools import partial
+
+import pytest
+
+import export_update_script as export
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'db_a.sqlite')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE M_TOKUISAKI (
+            TOKUISAKI_CD NVARCHAR(10) PRIMARY KEY,
+            TOKUISAKI_NAME NVARCHAR(40),
+            TEL NVARCHAR(20),
+            UPDATE_DATE DATETIME
+        );
+        CREATE TABLE M_SHOUHIN (
+            SHOUHIN_CD NVARCHAR(10),
+            EDA_NO INT,
+            SHOUHIN_NAME NVARCHAR(40),
+            TANKA DECIMAL(10, 2),
+            CONSTRAINT UQ_SHOUHIN UNIQUE (SHOUHIN_CD, EDA_NO)
+        );
+        CREATE TABLE T_JUCHU (JUCHU_NO INT PRIMARY KEY, TOKUISAKI_NAME NVARCHAR(40));
+    """)
+    conn.executemany(
+        "INSERT INTO M_TOKUISAKI VALUES (?, ?, ?, ?)",
+        [('T001', "O'Brien商事", '03-1111-2222', '2026-01-02 03:04:05'), ('T002', '山田商店', None, None)]
+    )
+    conn.executemany(
+        "INSERT INTO M_SHOUHIN VALUES (?, ?, ?, ?)",
+        [('S%03d' % i, i % 2, '商品%d' % i, 100) for i in range(1, 6)]
+    )
+    conn.execute("INSERT INTO T_JUCHU VALUES (1, '対象外')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_sqlite_metadata(database):
+    conn = sqlite3.connect(database)
+    try:
+        metadata = export.read_sqlite_table_metadata(conn.cursor())
+    finally:
+        conn.close()
+    assert metadata == {
+        'M_SHOUHIN': {
+            'columns': {'SHOUHIN_CD': 'nvarchar', 'EDA_NO': 'int', 'SHOUHIN_NAME': 'nvarchar', 'TANKA': 'decimal'},
+            'key_columns': ['SHOUHIN_CD', 'EDA_NO'],
+        },
+        'M_TOKUISAKI': {
+            'columns': {'TOKUISAKI_CD': 'nvarchar', 'TOKUISAKI_NAME': 'nvarchar', 'TEL': 'nvarchar', 'UPDATE_DATE': 'datetime'},
+            'key_columns': ['TOKUISAKI_CD'],
+        },
+    }
+
+
+@pytest.mark.parametrize('mode', export.UPDATE_MODES)
+def test_export_two_tables_with_two_jobs(database, tmp_path, mode):
+    output_dir = str(tmp_path / 'out')
+    summary = export.export_update_scripts(
+        None, output_dir, mode=mode, jobs=2, fetch_size=2,
+        connect=partial(sqlite3.connect, database, check_same_thread=False)
+    )
+
+    with open(os.path.join(output_dir, export.SUMMARY_FILE), encoding='utf-8') as f:
+        assert json.load(f) == summary
+    assert 'error' not in summary
+    assert summary['jobs'] == 2 and summary['total_tables'] == 2
+    entries = {entry['table']: entry for entry in summary['tables']}
+    assert set(entries) == {'M_TOKUISAKI', 'M_SHOUHIN'}
+    assert entries['M_TOKUISAKI']['status'] == entries['M_SHOUHIN']['status'] == 'ok'
+    assert entries['M_TOKUISAKI']['rows'] == entries['M_TOKUISAKI']['estimated_rows'] == 2
+    assert entries['M_SHOUHIN']['rows'] == entries['M_SHOUHIN']['estimated_rows'] == 5
+    assert sorted(os.listdir(output_dir)) == sorted(
+        [export.SUMMARY_FILE, 'M_SHOUHIN_update.sql', 'M_TOKUISAKI_update.sql']
+    )
+
+    with open(entries['M_TOKUISAKI']['script'], encoding='utf-8-sig') as f:
+        tokuisaki_script = f.read()
+    with open(entries['M_SHOUHIN']['script'], encoding='utf-8-sig') as f:
+        shouhin_script = f.read()
+    assert '-- Key: TOKUISAKI_CD\n' in tokuisaki_script
+    assert '-- Key: SHOUHIN_CD, EDA_NO\n' in shouhin_script
+    assert tokuisaki_script.endswith('-- Số dòng dữ liệu: 2\n')
+    assert shouhin_script.endswith('-- Số dòng dữ liệu: 5\n')
+    if mode == 'row':
+        assert (
+            "UPDATE M_TOKUISAKI SET TOKUISAKI_NAME = N'O''Brien商事', TEL = N'03-1111-2222' "
+            "WHERE TOKUISAKI_CD = N'T001';"
+        ) in tokuisaki_script
+        assert "UPDATE M_TOKUISAKI SET TOKUISAKI_NAME = N'山田商店', TEL = NULL WHERE TOKUISAKI_CD = N'T002';" in tokuisaki_script
+        assert "UPDATE M_SHOUHIN SET SHOUHIN_NAME = N'商品3' WHERE SHOUHIN_CD = N'S003' AND EDA_NO = 1;" in shouhin_script
+    else:
+        assert "    (N'T001', N'O''Brien商事', N'03-1111-2222'),\n    (N'T002', N'山田商店', NULL)\n" in tokuisaki_script
+        assert ") AS S (SHOUHIN_CD, EDA_NO, SHOUHIN_NAME) ON T.SHOUHIN_CD = S.SHOUHIN_CD AND T.EDA_NO = S.EDA_NO;" in shouhin_script
+    # Table names not matching TABLE_PATTERN are not exported
+    assert 'T_JUCHU' not in tokuisaki_script + shouhin_script
+
+
+def test_injected_readers(database, tmp_path):
+    def read_metadata(cursor, table_pattern):
+        return {'M_TOKUISAKI': export.read_sqlite_table_metadata(cursor, table_pattern)['M_TOKUISAKI']}
+
+    summary = export.export_update_scripts(
+        None, str(tmp_path / 'out'), connect=partial(sqlite3.connect, database, check_same_thread=False),
+        metadata_reader=read_metadata, row_estimate_reader=lambda cursor: {'M_TOKUISAKI': 42}
+    )
+    assert [(entry['table'], entry['status'], entry['estimated_rows']) for entry in summary['tables']] == [
+        ('M_TOKUISAKI', 'ok', 42)
+    ]
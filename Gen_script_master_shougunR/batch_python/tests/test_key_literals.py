@@ -0,0 +1,49 @@
+import datetime
+import decimal
+
+import pytest
+
+import export_update_script as export
+
+STAMP = datetime.datetime(2026, 1, 2, 3, 4, 5, 678901)
+
+
+@pytest.mark.parametrize('val, data_type, expected', [
+    (STAMP, 'datetime2', "'2026-01-02T03:04:05.6789010'"),
+    (STAMP, None, "'2026-01-02T03:04:05.6789010'"),
+    (datetime.datetime(2026, 1, 2, 3, 4, 5, 3000), 'datetime', "'2026-01-02T03:04:05.003'"),
+    (STAMP, 'datetime', "'2026-01-02T03:04:05.678'"),
+    (datetime.datetime(2026, 1, 2, 3, 4), 'smalldatetime', "'2026-01-02T03:04:00'"),
+    (datetime.date(2026, 1, 2), 'date', "'2026-01-02'"),
+    (datetime.time(3, 4, 5), 'time', "'03:04:05'"),
+    (True, 'bit', '1'),
+    (12, 'int', '12'),
+    (decimal.Decimal('1.50'), 'decimal', '1.50'),
+    (b'\x00\xff', 'varbinary', '0x00ff'),
+    ("O'Brien", 'nvarchar', "N'O''Brien'"),
+    ("O'Brien", 'nchar', "N'O''Brien'"),
+    ("O'Brien", None, "N'O''Brien'"),
+    ("O'Brien", 'varchar', "'O''Brien'"),
+    ('A1', 'char', "'A1'"),
+])
+def test_sql_key_literal(val, data_type, expected):
+    assert export.sql_key_literal(val, data_type) == expected
+
+
+def test_format_key_condition_uses_key_types():
+    condition = export.format_key_condition(
+        ['CD', 'UPDATE_DATE', 'SUB_CD'], ['A1', STAMP, None], ['varchar', 'datetime2', 'nvarchar']
+    )
+    assert condition == "CD = 'A1' AND UPDATE_DATE = '2026-01-02T03:04:05.6789010' AND SUB_CD IS NULL"
+
+
+def test_datetime2_key_with_microseconds(tmp_path):
+    rows = [(STAMP, 'Name A')]
+    with open(tmp_path / 'row.sql', 'w', encoding='utf-8') as f:
+        export.write_row_updates(f, 'M_LOG', ['LOG_TIME'], ['USER_NAME'], rows, ['datetime2'])
+    with open(tmp_path / 'bulk.sql', 'w', encoding='utf-8') as f:
+        export.write_bulk_updates(f, 'M_LOG', ['LOG_TIME'], ['USER_NAME'], rows, key_types=['datetime2'])
+    assert (tmp_path / 'row.sql').read_text(encoding='utf-8') == (
+        "UPDATE M_LOG SET USER_NAME = N'Name A' WHERE LOG_TIME = '2026-01-02T03:04:05.6789010';\n\n"
+    )
+    assert "    ('2026-01-02T03:04:05.6789010', N'Name A')\n" in (tmp_path / 'bulk.sql').read_text(encoding='utf-8')